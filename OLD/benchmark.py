@@ -0,0 +1,199 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+import harv_titles_votes
+from driver_pool import DriverPool
+from fake_editfest import FakeEditfest
+from http_session import build_session
+from listing import ListingClient
+from readiness import ReadinessEngine
+
+try:
+    import resource  # Unix only: the process's resident memory high-water mark
+except ImportError:
+    resource = None
+
+try:
+    import psutil  # Optional: peak memory on Windows
+except ImportError:
+    psutil = None
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_BROWSER_LIMIT = 200   # Browser extraction is benchmarked on a prefix of the listing
+BENCHMARKS = ('listing', 'extract-http', 'extract-browser')
+
+def max_rss_mb():
+    """
+    The process's peak resident memory in megabytes, or None where neither
+    `resource` nor psutil can tell.
+    """
+    if resource is not None:
+        # Kilobytes on Linux
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    if psutil is not None:
+        memory = psutil.Process().memory_info()
+        # Windows reports the peak working set; elsewhere only the current RSS is known
+        return round(getattr(memory, 'peak_wset', memory.rss) / (1024 * 1024), 1)
+    return None
+
+def measure(name, size, latency=0.0, error_rate=0.0, browser_limit=DEFAULT_BROWSER_LIMIT, memory=True):
+    """
+    Runs one benchmark twice: once in this process for throughput, and once
+    in a fresh process with tracemalloc on for memory. Tracing slows every
+    allocation, and the RSS high-water mark only ever grows within a process,
+    so neither measurement can share a run with the other or with an earlier size.
+
+    Args:
+        name (str): One of `BENCHMARKS`.
+        size (int): Number of submissions on the fake site.
+        latency (float): Seconds the fake server adds to each response.
+        error_rate (float): Fraction of fake responses that fail with a 500.
+        browser_limit (int): Submissions extracted in 'extract-browser'.
+        memory (bool): Run the memory pass; without it the memory figures are None.
+
+    Returns:
+        dict: name, size, count, seconds, per_second, peak_mb (traced Python
+            allocations) and max_rss_mb (the memory pass's process, high-water
+            mark; see `max_rss_mb`).
+    """
+    options = dict(latency=latency, error_rate=error_rate, browser_limit=browser_limit)
+    count, elapsed, _ = run_benchmark(name, size, **options)
+    peak_mb = rss_mb = None
+    if memory:
+        # Spawned rather than forked, so the pass starts from a clean interpreter
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            _, _, (peak_mb, rss_mb) = executor.submit(run_benchmark, name, size, trace_memory=True, **options).result()
+    return {
+        'name': name,
+        'size': size,
+        'count': count,
+        'seconds': round(elapsed, 3),
+        'per_second': round(count / elapsed, 1) if elapsed else None,
+        'peak_mb': peak_mb,
+        'max_rss_mb': rss_mb,
+    }
+
+def run_benchmark(name, size, latency=0.0, error_rate=0.0, browser_limit=DEFAULT_BROWSER_LIMIT, trace_memory=False):
+    """
+    Runs one benchmark against a fresh fake site; only the benchmark itself is timed.
+
+    Returns:
+        tuple: (submissions processed, seconds, memory) where memory is
+            (traced peak MB, max RSS MB) with `trace_memory`, else None.
+    """
+    if name not in BENCHMARKS:
+        raise ValueError(f"Unknown benchmark '{name}'; expected one of {', '.join(BENCHMARKS)}")
+    # Browser extraction gets pages that only show their data once a script has run, as on the real site
+    render = 'js' if name == 'extract-browser' else 'html'
+    with FakeEditfest(total=size, latency=latency, error_rate=error_rate, render=render) as site:
+        session = build_session({'User-Agent': 'Mozilla/5.0'}, pool_size=harv_titles_votes.MAX_HTTP_THREADS)
+        pool = DriverPool(size=harv_titles_votes.MAX_EXTRACT_THREADS) if name == 'extract-browser' else None
+        try:
+            if trace_memory:
+                tracemalloc.start()
+            started = time.perf_counter()
+            try:
+                if name == 'listing':
+                    count = bench_listing(site, session, harv_titles_votes.MAX_FETCH_THREADS)
+                elif name == 'extract-http':
+                    count = bench_extraction(site, session, 'http')
+                else:
+                    count = bench_extraction(site, session, 'browser', pool, ReadinessEngine(), limit=browser_limit)
+            finally:
+                elapsed = time.perf_counter() - started
+                memory = None
+                if trace_memory:
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    memory = (round(peak / (1024 * 1024), 2), max_rss_mb())
+        finally:
+            if pool is not None:
+                pool.close()
+            session.close()
+    return count, elapsed, memory
+
+def bench_listing(site, session, threads):
+    """
+    Streams the whole listing and counts submissions.
+    """
+    client = ListingClient(session, url_template=site.listing_url_template, max_threads=threads)
+    return sum(1 for _ in client.iter_submissions())
+
+def bench_extraction(site, session, mode, pool=None, readiness=None, limit=None):
+    """
+    Streams the listing into extraction with the given mode and counts rows written.
+    """
+    client = ListingClient(session, url_template=site.listing_url_template,
+                           max_threads=harv_titles_votes.MAX_FETCH_THREADS)
+    submissions = client.iter_submissions()
+    if limit:
+        submissions = (submission for _, submission in zip(range(limit), submissions))
+    written = []
+    harv_titles_votes.stream_submission_details(
+        submissions, lambda submission: written.append(submission.get('votes') is not None),
+        max_threads=harv_titles_votes.MAX_EXTRACT_THREADS, pool=pool, readiness=readiness,
+        mode=mode, session=session, url_template=site.submission_url_template,
+    )
+    if not all(written):
+        logging.warning("%d of %d submissions came back without votes", written.count(False), len(written))
+    return len(written)
+
+def run_benchmarks(sizes, modes, latency=0.0, error_rate=0.0, browser_limit=DEFAULT_BROWSER_LIMIT, memory=True):
+    """
+    Runs the listing benchmark and every extraction mode against a fresh fake
+    site of each size.
+
+    Returns:
+        list: One result dict per benchmark (see `measure`).
+    """
+    names = ['listing'] + [f"extract-{mode}" for mode in ('http', 'browser') if mode in modes]
+    results = []
+    for size in sizes:
+        for name in names:
+            results.append(measure(name, size, latency, error_rate, browser_limit, memory))
+            report(results[-1])
+    return results
+
+def report(result):
+    print(
+        f"{result['name']:<16} {result['size']:>7}  {result['count']:>7} done  {result['seconds']:>8.2f}s  "
+        f"{result['per_second'] or 0:>9.1f}/s  peak {format_mb(result['peak_mb'])} MB  "
+        f"rss {format_mb(result['max_rss_mb'])} MB"
+    )
+
+def format_mb(value):
+    return f"{value:>7.2f}" if value is not None else f"{'-':>7}"
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark listing and extraction throughput against a local fake Editfest site.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="Submission counts to benchmark (default: 1000 10000 100000).")
+    parser.add_argument('--modes', nargs='+', choices=['http', 'browser'], default=['http'],
+                        help="Extraction paths to benchmark (default: http). 'browser' needs Chrome.")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds the fake server adds to each response.")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of fake responses that fail with a 500.")
+    parser.add_argument('--browser-limit', type=int, default=DEFAULT_BROWSER_LIMIT,
+                        help=f"Submissions extracted per size in browser mode (default: {DEFAULT_BROWSER_LIMIT}).")
+    parser.add_argument('--no-memory', action='store_true',
+                        help="Skip the memory pass, which runs every benchmark a second time in its own process.")
+    parser.add_argument('--json', metavar='PATH', help="Also write the results to PATH as JSON.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    # Per-submission records would dominate the measurement; keep warnings only
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s - %(message)s')
+    results = run_benchmarks(args.sizes, args.modes, args.latency, args.error_rate, args.browser_limit,
+                             memory=not args.no_memory)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to '{args.json}'.")
+
+if __name__ == "__main__":
+    main()
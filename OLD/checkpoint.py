@@ -0,0 +1,125 @@
+import json
+import sqlite3
+import threading
+import time
+
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+
+class CheckpointStore:
+    """
+    Durable per-submission extraction state in a local SQLite file, keyed by hash.
+
+    Every state change is committed immediately, so a crashed run loses at most
+    the submissions that were in flight. A resumed run skips `done` hashes and
+    retries `pending` and `failed` ones.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): SQLite database file; created if missing.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS submissions (
+                hash TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                updated_at REAL NOT NULL
+            )
+        ''')
+
+    def reset(self):
+        """
+        Forgets every recorded submission, for a fresh (non-resumed) run.
+        """
+        with self._lock:
+            self._conn.execute('DELETE FROM submissions')
+
+    def mark_pending(self, submission_hash):
+        """
+        Records that a submission has been queued for extraction.
+        """
+        with self._lock:
+            self._conn.execute('''
+                INSERT INTO submissions (hash, state, attempts, updated_at) VALUES (?, ?, 1, ?)
+                ON CONFLICT(hash) DO UPDATE SET
+                    state = excluded.state, attempts = attempts + 1, updated_at = excluded.updated_at
+            ''', (submission_hash, PENDING, time.time()))
+
+    def mark_done(self, submission):
+        """
+        Stores a successfully extracted submission.
+
+        Args:
+            submission (dict): The updated submission; must contain 'hash'.
+        """
+        self._finish(submission, DONE, None)
+
+    def mark_failed(self, submission, error=None):
+        """
+        Stores a submission whose extraction produced no votes, so it is retried on resume.
+
+        Args:
+            submission (dict): The submission as written; must contain 'hash'.
+            error (str): Optional description of the failure.
+        """
+        self._finish(submission, FAILED, error)
+
+    def record(self, submission):
+        """
+        Marks a written submission done if it has votes and failed otherwise.
+        """
+        if submission.get('votes') is None:
+            self.mark_failed(submission, "no votes extracted")
+        else:
+            self.mark_done(submission)
+
+    def done_hashes(self):
+        """
+        Returns:
+            set: Hashes of submissions that do not need extracting again.
+        """
+        with self._lock:
+            rows = self._conn.execute('SELECT hash FROM submissions WHERE state = ?', (DONE,)).fetchall()
+        return {row[0] for row in rows}
+
+    def iter_done(self):
+        """
+        Yields the stored result of every finished submission.
+        """
+        with self._lock:
+            rows = self._conn.execute('SELECT result FROM submissions WHERE state = ? ORDER BY rowid', (DONE,)).fetchall()
+        for (result,) in rows:
+            yield json.loads(result)
+
+    def counts(self):
+        """
+        Returns:
+            dict: State -> number of submissions in that state.
+        """
+        with self._lock:
+            rows = self._conn.execute('SELECT state, COUNT(*) FROM submissions GROUP BY state').fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _finish(self, submission, state, error):
+        result = json.dumps(submission, default=str)
+        with self._lock:
+            self._conn.execute('''
+                INSERT INTO submissions (hash, state, attempts, result, error, updated_at) VALUES (?, ?, 1, ?, ?, ?)
+                ON CONFLICT(hash) DO UPDATE SET
+                    state = excluded.state, result = excluded.result,
+                    error = excluded.error, updated_at = excluded.updated_at
+            ''', (submission['hash'], state, result, error, time.time()))
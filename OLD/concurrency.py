@@ -0,0 +1,213 @@
+import logging
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import requests
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+# Statuses meaning "slow down" rather than "this request is wrong"
+OVERLOAD_STATUSES = {429, 500, 502, 503, 504}
+
+# Exceptions that indicate the site (or the browser) is struggling to keep up
+OVERLOAD_ERRORS = (requests.Timeout, requests.ConnectionError, TimeoutException, TimeoutError)
+
+def parse_retry_after(value):
+    """
+    Parses a `Retry-After` header, given either in seconds or as an HTTP date.
+
+    Returns:
+        float: Seconds to wait, or None if the header is missing or malformed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class AimdLimiter:
+    """
+    Caps how many requests (or page loads) run at once and adapts the cap to
+    what the site tolerates, the way TCP congestion control does.
+
+    Every `limit` healthy completions raise the limit by one (additive
+    increase). A 429/5xx, a timeout or a completion slower than
+    `latency_ceiling` halves it (multiplicative decrease), at most once per
+    `cooldown` so a burst of failures from one round counts once. A
+    `Retry-After` header pauses every new acquisition until it expires.
+
+    Worker threads are sized for `max_limit`; the limiter decides how many of
+    them may be inside a slot at a time.
+    """
+
+    def __init__(self, name, initial, min_limit=1, max_limit=None, decrease=0.5,
+                 latency_ceiling=None, cooldown=2.0, max_retry_after=300.0):
+        """
+        Args:
+            name (str): Label used in log messages, e.g. 'listing'.
+            initial (int): Starting limit.
+            min_limit (int): The limit never drops below this.
+            max_limit (int): The limit never grows past this; defaults to `initial`.
+            decrease (float): Factor applied to the limit on overload.
+            latency_ceiling (float): Seconds after which a completion counts as overload.
+            cooldown (float): Minimum seconds between two decreases.
+            max_retry_after (float): Upper bound on a single Retry-After pause.
+        """
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit or initial
+        self.limit = max(min_limit, min(initial, self.max_limit))
+        self.decrease = decrease
+        self.latency_ceiling = latency_ceiling
+        self.cooldown = cooldown
+        self.max_retry_after = max_retry_after
+        self._in_flight = 0
+        self._healthy = 0
+        self._last_decrease = 0.0
+        self._paused_until = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Blocks until a slot is free and no Retry-After pause is in effect.
+        """
+        with self._condition:
+            while True:
+                wait = self._paused_until - time.monotonic()
+                if wait <= 0 and self._in_flight < self.limit:
+                    self._in_flight += 1
+                    return
+                self._condition.wait(timeout=wait if wait > 0 else None)
+
+    def try_acquire(self):
+        """
+        Takes a slot if one is free right now, for callers that cannot block
+        a thread (see `devtools_engine`).
+
+        Returns:
+            bool: True if a slot was taken; release it with `release`.
+        """
+        with self._condition:
+            if self._paused_until > time.monotonic() or self._in_flight >= self.limit:
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self):
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify()
+
+    def slot(self):
+        """
+        Context manager holding one slot. The outcome is recorded on exit: a
+        success timed from entry unless the block reported otherwise via the
+        yielded `Slot`, or an overload if it raised one of `OVERLOAD_ERRORS`.
+        """
+        return Slot(self)
+
+    def succeeded(self, latency=None):
+        """
+        Records a healthy completion; a slow one counts as overload instead.
+        """
+        if self.latency_ceiling and latency is not None and latency > self.latency_ceiling:
+            self.overloaded(f"slow response ({latency:.1f}s)")
+            return
+        with self._condition:
+            self._healthy += 1
+            if self._healthy >= self.limit and self.limit < self.max_limit:
+                self._healthy = 0
+                self._set_limit(self.limit + 1, "healthy")
+
+    def overloaded(self, reason, retry_after=None):
+        """
+        Records a sign of overload and backs off.
+
+        Args:
+            reason (str): What happened, for the log.
+            retry_after (float): Seconds the site asked us to wait, if any.
+        """
+        now = time.monotonic()
+        with self._condition:
+            self._healthy = 0
+            if retry_after:
+                pause = min(retry_after, self.max_retry_after)
+                if now + pause > self._paused_until:
+                    self._paused_until = now + pause
+                    logging.warning("%s: pausing %.1fs as asked by Retry-After", self.name, pause)
+            if now - self._last_decrease >= self.cooldown:
+                self._last_decrease = now
+                self._set_limit(max(self.min_limit, int(self.limit * self.decrease)), reason)
+            self._condition.notify_all()
+
+    def observe_response(self, response, latency=None):
+        """
+        Classifies an HTTP response as healthy or overloaded.
+        """
+        if response.status_code in OVERLOAD_STATUSES:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            self.overloaded(f"status {response.status_code}", retry_after)
+        else:
+            self.succeeded(latency)
+
+    def _set_limit(self, limit, reason):
+        if limit != self.limit:
+            logging.info("%s concurrency %d -> %d (%s)", self.name, self.limit, limit, reason)
+            self.limit = limit
+            self._condition.notify_all()
+
+class Slot:
+    """
+    One held slot of an `AimdLimiter`; see `AimdLimiter.slot`.
+    """
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.reported = False
+        self.started = None
+
+    def __enter__(self):
+        if self.limiter is not None:
+            self.limiter.acquire()
+        self.started = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.limiter is None:
+            return False
+        try:
+            if not self.reported:
+                if exc is None:
+                    self.limiter.succeeded(self.elapsed())
+                elif isinstance(exc, OVERLOAD_ERRORS):
+                    self.limiter.overloaded(type(exc).__name__)
+                elif isinstance(exc, WebDriverException) and 'timeout' in str(exc).lower():
+                    self.limiter.overloaded("renderer timeout")
+        finally:
+            self.limiter.release()
+        return False
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def response(self, response):
+        """
+        Records the outcome from an HTTP response (429/5xx and Retry-After aware).
+        """
+        self.reported = True
+        if self.limiter is not None:
+            self.limiter.observe_response(response, self.elapsed())
+
+    def overloaded(self, reason):
+        self.reported = True
+        if self.limiter is not None:
+            self.limiter.overloaded(reason)
+
+def slot(limiter):
+    """
+    `limiter.slot()`, or a slot that never blocks when `limiter` is None.
+    """
+    return Slot(limiter)
@@ -0,0 +1,532 @@
+import itertools
+import json
+import logging
+import math
+import time
+import urllib.request
+from contextlib import contextmanager
+from functools import partial
+from concurrency import OVERLOAD_ERRORS
+from driver_pool import HIDE_WEBDRIVER_SCRIPT
+from errors import DriverInitError, NetworkError, SelectorMissError, classify
+from extractor_spec import COLLECT_SCRIPT, TITLE_VOTES_SPEC
+from log_setup import log_summary
+from readiness import READY_SCRIPT, ReadinessEngine
+from retry import DEFAULT_POLICIES, NO_RETRY
+from timing import span
+
+try:
+    # Optional: both are installed with selenium, which uses them for its own DevTools support
+    import trio
+    from trio_websocket import ConnectionClosed, HandshakeError, open_websocket_url
+except ImportError:
+    trio = None
+
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024   # DevTools replies can carry whole documents
+LIMITER_POLL_SECONDS = 0.05            # How often a page waiting for a limiter slot checks again
+
+# The rendered document, for the snapshot archive
+OUTER_HTML_SCRIPT = "return document.documentElement.outerHTML;"
+
+# Marks the end of the submissions iterator
+_DONE = object()
+
+class DevToolsError(Exception):
+    """
+    A DevTools command answered with an error, or the connection closed under it.
+    """
+
+def browser_websocket_url(driver):
+    """
+    Finds the browser-level DevTools websocket of a Selenium-launched Chrome.
+
+    Args:
+        driver (WebDriver): A running Chrome driver.
+
+    Returns:
+        str: The `ws://` URL of the browser target.
+    """
+    address = driver.capabilities['goog:chromeOptions']['debuggerAddress']
+    with urllib.request.urlopen(f'http://{address}/json/version', timeout=10) as response:
+        return json.load(response)['webSocketDebuggerUrl']
+
+def call_expression(script, args):
+    """
+    Turns a WebDriver-style script body (reading `arguments`, ending in
+    `return`) into an expression for `Runtime.evaluate`, so the scripts used
+    with `execute_script` run unchanged.
+    """
+    return f"(function () {{ {script} }}).apply(null, {json.dumps(list(args))})"
+
+class DevToolsConnection:
+    """
+    One websocket to a browser, carrying the flattened sessions of all its pages.
+
+    Commands are matched to their replies by id and events are routed to
+    whoever `listen`s for them; `run` must be running in the background for
+    either to arrive.
+    """
+
+    def __init__(self, websocket):
+        self._websocket = websocket
+        self._ids = itertools.count(1)
+        self._replies = {}     # Command id -> channel awaiting the reply
+        self._listeners = []   # (session id, method, channel) for events
+        self._closed = False
+
+    async def send(self, method, params=None, session_id=None):
+        """
+        Sends one command and waits for its reply.
+
+        Returns:
+            dict: The command's result.
+
+        Raises:
+            DevToolsError: The command failed or the connection closed.
+        """
+        if self._closed:
+            raise DevToolsError(f"{method}: connection closed")
+        message = {'id': next(self._ids), 'method': method, 'params': params or {}}
+        if session_id:
+            message['sessionId'] = session_id
+        send_channel, receive_channel = trio.open_memory_channel(1)
+        self._replies[message['id']] = send_channel
+        try:
+            await self._websocket.send_message(json.dumps(message))
+            reply = await receive_channel.receive()
+        except ConnectionClosed as e:
+            self._closed = True
+            raise DevToolsError(f"{method}: connection closed") from e
+        finally:
+            self._replies.pop(message['id'], None)
+        if 'error' in reply:
+            raise DevToolsError(f"{method}: {reply['error'].get('message')}")
+        return reply.get('result', {})
+
+    @contextmanager
+    def listen(self, session_id, method):
+        """
+        Collects the `method` events of one session while the block runs.
+
+        Yields:
+            trio.MemoryReceiveChannel: The events' params, in arrival order.
+        """
+        send_channel, receive_channel = trio.open_memory_channel(math.inf)
+        listener = (session_id, method, send_channel)
+        self._listeners.append(listener)
+        try:
+            yield receive_channel
+        finally:
+            self._listeners.remove(listener)
+
+    @property
+    def closed(self):
+        return self._closed
+
+    async def run(self):
+        """
+        Reads messages until the connection closes, handing out replies and events.
+        """
+        try:
+            while True:
+                message = json.loads(await self._websocket.get_message())
+                if 'id' in message:
+                    channel = self._replies.get(message['id'])
+                    if channel is not None:
+                        channel.send_nowait(message)
+                    continue
+                for session_id, method, channel in self._listeners:
+                    if session_id == message.get('sessionId') and method == message.get('method'):
+                        channel.send_nowait(message.get('params', {}))
+        except ConnectionClosed:
+            self._closed = True
+            for channel in list(self._replies.values()):
+                channel.send_nowait({'error': {'message': 'connection closed'}})
+
+class DevToolsPage:
+    """
+    One tab of a browser, driven through its own DevTools session.
+    """
+
+    def __init__(self, connection, target_id, session_id):
+        self.connection = connection
+        self.target_id = target_id
+        self.session_id = session_id
+
+    @classmethod
+    async def open(cls, connection, resource_policy=None):
+        """
+        Opens a blank tab and prepares it like a pooled browser: the webdriver
+        flag hidden, lifecycle events on, and the resource policy applied.
+        """
+        target = await connection.send('Target.createTarget', {'url': 'about:blank'})
+        attached = await connection.send('Target.attachToTarget', {'targetId': target['targetId'], 'flatten': True})
+        page = cls(connection, target['targetId'], attached['sessionId'])
+        await page.send('Page.enable')
+        await page.send('Page.setLifecycleEventsEnabled', {'enabled': True})
+        await page.send('Page.addScriptToEvaluateOnNewDocument', {'source': HIDE_WEBDRIVER_SCRIPT})
+        for method, params in (resource_policy.cdp_commands() if resource_policy else []):
+            await page.send(method, params)
+        return page
+
+    async def send(self, method, params=None):
+        return await self.connection.send(method, params, self.session_id)
+
+    async def navigate(self, url, event='DOMContentLoaded'):
+        """
+        Navigates and waits for the new document's lifecycle `event`
+        ('DOMContentLoaded' or 'load').
+
+        Raises:
+            NetworkError: The navigation itself failed, e.g. net::ERR_CONNECTION_RESET.
+        """
+        with self.connection.listen(self.session_id, 'Page.lifecycleEvent') as events:
+            result = await self.send('Page.navigate', {'url': url})
+            if result.get('errorText'):
+                raise NetworkError(f"{result['errorText']} loading {url}")
+            loader_id = result.get('loaderId')
+            async for params in events:
+                if params.get('name') == event and params.get('loaderId') == loader_id:
+                    return
+
+    async def evaluate(self, script, *args):
+        """
+        The `execute_script` of this page: runs a script body with `arguments`.
+
+        Returns:
+            The script's return value, as JSON.
+        """
+        result = await self.send('Runtime.evaluate', {
+            'expression': call_expression(script, args),
+            'returnByValue': True,
+        })
+        if 'exceptionDetails' in result:
+            raise DevToolsError(f"Script failed: {result['exceptionDetails'].get('text')}")
+        return result.get('result', {}).get('value')
+
+    async def close(self):
+        try:
+            await self.connection.send('Target.closeTarget', {'targetId': self.target_id})
+        except DevToolsError as e:
+            logging.debug("Error closing page %s: %s", self.target_id, e)
+
+async def wait_ready(readiness, page, started):
+    """
+    `ReadinessEngine.wait` for a `DevToolsPage`: polls without blocking the
+    event loop, and records latencies in the same engine.
+
+    Returns:
+        dict: Selector -> seconds until ready, or None if it timed out.
+    """
+    timeouts = readiness.timeouts()
+    pending = list(readiness.selectors)
+    latencies = {}
+    while pending:
+        ready = await page.evaluate(READY_SCRIPT, pending)
+        pending = readiness.observe(pending, ready, time.monotonic() - started, timeouts, latencies)
+        if pending:
+            await trio.sleep(readiness.poll_interval)
+    return latencies
+
+class _Submissions:
+    """
+    The submissions channel shared by every tab, in front of which sit the
+    submissions handed back by tabs whose browser was lost or retired.
+    """
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.returned = []
+        self.ended = False
+
+    async def next(self):
+        """
+        Returns:
+            dict: The next submission, or `_DONE` once there are none left.
+        """
+        if not self.returned and not self.ended:
+            try:
+                return await self.channel.receive()
+            except trio.EndOfChannel:
+                self.ended = True
+        return self.returned.pop() if self.returned else _DONE
+
+    def put_back(self, submission):
+        self.returned.append(submission)
+
+class _Browser:
+    """
+    One browser leased from the pool: its connection, the pages its tabs have
+    served, and whether it is being retired.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.connection = None
+        self.pages = 0
+        self.retiring = False
+
+class DevToolsEngine:
+    """
+    Extracts submissions from many pages at once on a single trio event loop,
+    speaking DevTools over one websocket per browser instead of going through
+    chromedriver's HTTP protocol from a blocking thread per browser.
+
+    Browsers are still launched (and recycled afterwards) by a `DriverPool`,
+    which takes care of chromedriver, the Chrome options and the resource
+    policy. Each browser then hosts `pages_per_browser` tabs, and every tab
+    runs its own loop: navigate, wait for readiness, read every spec field in
+    one evaluation. Failures are retried in place with the `RetryLane`
+    policies; a tab that failed is replaced by a fresh one. With a `limiter`,
+    only as many tabs as it allows load pages at a time.
+
+    A browser is handed back to the pool and replaced by a fresh one once the
+    pool finds it worn out (`max_pages` pages, or its RSS ceiling), or when its
+    connection closes, e.g. because it crashed. The submissions its tabs were
+    working on go to the replacement rather than being counted as failures.
+    """
+
+    def __init__(self, pool, url_template, pages_per_browser=16, readiness=None, spec=TITLE_VOTES_SPEC,
+                 load_timeout=30.0, retry=None, archive=None, limiter=None):
+        """
+        Args:
+            pool (DriverPool): Launches the browsers; `pool.size` of them are used.
+            url_template (str): Submission page URL with a `{submission_hash}` field.
+            pages_per_browser (int): Tabs, and so pages in flight, per browser.
+            readiness (ReadinessEngine): Shared page readiness waits.
+            spec (ExtractorSpec): Fields to extract.
+            load_timeout (float): Seconds to wait for a page's document to load.
+            retry (RetryLane): Supplies the retry policies, and receives permanent
+                failures in its `failures` report; `DEFAULT_POLICIES` otherwise.
+            archive (SnapshotArchive): Keeps the rendered pages of failed (or all) submissions.
+            limiter (AimdLimiter): Adapts the number of pages loading at once.
+        """
+        if trio is None:
+            raise RuntimeError("The DevTools engine needs trio and trio-websocket (installed with selenium).")
+        self.pool = pool
+        self.pages_per_browser = pages_per_browser
+        self.readiness = readiness or ReadinessEngine()
+        self.spec = spec
+        self.url_template = url_template
+        self.load_timeout = load_timeout
+        self.archive = archive
+        self.limiter = limiter
+        self.policies = retry.policies if retry is not None else DEFAULT_POLICIES
+        self.failures = retry.failures if retry is not None else []
+        self.describe = retry.describe if retry is not None else repr
+        policy = pool.resource_policy
+        self.event = 'DOMContentLoaded' if policy and policy.eager else 'load'
+
+    def run(self, submissions, write, on_error=None):
+        """
+        Extracts every submission and hands each result to `write` as it completes.
+
+        Args:
+            submissions (iterable): Submission dictionaries; consumed on a worker thread.
+            write (callable): Called with each updated submission, one at a time on a
+                worker thread, so a slow write does not hold up the pages.
+            on_error (callable): (submission, exception) -> result to write for a
+                submission that failed for good; dropped if omitted or None.
+
+        Returns:
+            int: The number of submissions written.
+        """
+        return trio.run(self._run, submissions, write, on_error)
+
+    async def _run(self, submissions, write, on_error):
+        drivers = []
+        counts = {'written': 0, 'failed': 0, 'relaunched': 0}
+        async with trio.open_nursery() as nursery:
+            for _ in range(self.pool.size):
+                nursery.start_soon(self._acquire, drivers)
+        if not drivers:
+            raise DriverInitError("No browser could be launched for the DevTools engine")
+
+        pages = len(drivers) * self.pages_per_browser
+        send_channel, receive_channel = trio.open_memory_channel(pages)
+        result_channel, results = trio.open_memory_channel(pages)
+        source = _Submissions(receive_channel)
+        async with trio.open_nursery() as workers:
+            workers.start_soon(self._write, results, write, counts)
+            workers.start_soon(self._produce, submissions, send_channel)
+            async with result_channel, receive_channel:
+                async with trio.open_nursery() as browsers:
+                    for driver in drivers:
+                        browsers.start_soon(self._browse, driver, source, result_channel, on_error, counts)
+        if not source.ended or source.returned:
+            raise DriverInitError("Every browser of the DevTools engine was lost before the submissions ran out")
+        log_summary('devtools_engine', browsers=len(drivers), pages=pages, **counts)
+        return counts['written']
+
+    async def _acquire(self, drivers):
+        driver = await self._launch()
+        if driver is not None:
+            drivers.append(driver)
+
+    async def _launch(self):
+        try:
+            with span('driver.acquire'):
+                return await trio.to_thread.run_sync(self.pool.acquire)
+        except Exception as e:
+            logging.error("Error launching a browser for the DevTools engine: %s", e)
+            return None
+
+    async def _browse(self, driver, source, result_channel, on_error, counts):
+        # One browser slot: its tabs run until the submissions run out, and a browser
+        # that is lost or worn out is handed back to the pool and replaced
+        while driver is not None:
+            browser = _Browser(driver)
+            try:
+                await self._drive(browser, source, result_channel, on_error, counts)
+            except (OSError, HandshakeError) as e:
+                logging.error("Error connecting to a browser's DevTools: %s", e)
+            finally:
+                lost = browser.connection is None or browser.connection.closed
+                with span('driver.release'):
+                    self.pool.release(driver, discard=lost or browser.retiring)
+            if source.ended and not source.returned:
+                return
+            if not browser.retiring and browser.pages == 0:
+                # A browser lost before serving a single page would most likely be lost again
+                logging.error("Giving up on a DevTools browser that was lost before serving a page")
+                return
+            driver = await self._launch()
+            if driver is not None:
+                counts['relaunched'] += 1
+
+    async def _drive(self, browser, source, result_channel, on_error, counts):
+        url = await trio.to_thread.run_sync(browser_websocket_url, browser.driver)
+        async with open_websocket_url(url, max_message_size=MAX_MESSAGE_BYTES) as websocket:
+            browser.connection = DevToolsConnection(websocket)
+            async with trio.open_nursery() as nursery:
+                nursery.start_soon(self._listen, browser, nursery.cancel_scope)
+                async with trio.open_nursery() as tabs:
+                    for _ in range(self.pages_per_browser):
+                        tabs.start_soon(self._work, browser, source, result_channel, on_error, counts)
+                nursery.cancel_scope.cancel()
+
+    async def _listen(self, browser, cancel_scope):
+        await browser.connection.run()
+        # The connection closed under the tabs: stop them, handing their submissions back
+        logging.warning("Lost the DevTools connection to a browser after %d pages", browser.pages)
+        cancel_scope.cancel()
+
+    async def _produce(self, submissions, send_channel):
+        iterator = iter(submissions)
+        async with send_channel:
+            while True:
+                # The iterator usually fetches listing pages, so it runs off the event loop
+                submission = await trio.to_thread.run_sync(next, iterator, _DONE)
+                if submission is _DONE:
+                    return
+                try:
+                    await send_channel.send(submission)
+                except trio.BrokenResourceError:
+                    # Every browser was lost; `_run` reports it
+                    return
+
+    async def _write(self, results, write, counts):
+        # Writes may commit to SQLite, so they run off the event loop, one at a time
+        async with results:
+            async for result in results:
+                await trio.to_thread.run_sync(write, result)
+                counts['written'] += 1
+
+    async def _work(self, browser, source, result_channel, on_error, counts):
+        page = None
+        submission = None
+        try:
+            while not browser.retiring:
+                submission = await source.next()
+                if submission is _DONE or browser.retiring:
+                    return
+                attempts = 0
+                while True:
+                    attempts += 1
+                    try:
+                        if page is None:
+                            page = await DevToolsPage.open(browser.connection, self.pool.resource_policy)
+                        result = await self._limited_extract(page, submission)
+                    except Exception as e:
+                        if browser.connection.closed:
+                            # Not the submission's fault; it goes to the browser's replacement
+                            return
+                        kind = classify(e)
+                        policy = self.policies.get(kind, NO_RETRY)
+                        if page is not None and not isinstance(e, SelectorMissError):
+                            await page.close()
+                            page = None
+                        if attempts < policy.max_attempts:
+                            delay = policy.delay(attempts)
+                            logging.warning("devtools: %s failed (%s: %s); retry %d/%d in %.1fs",
+                                            self.describe(submission), kind, e, attempts,
+                                            policy.max_attempts - 1, delay)
+                            await trio.sleep(delay)
+                            continue
+                        self.failures.append({'item': self.describe(submission), 'kind': kind,
+                                              'attempts': attempts, 'error': str(e)})
+                        counts['failed'] += 1
+                        result = on_error(submission, e) if on_error else None
+                    break
+                if result is not None:
+                    await result_channel.send(result)
+                submission = None
+                browser.pages += 1
+                if not browser.retiring and await trio.to_thread.run_sync(
+                        self.pool.worn_out, browser.driver, browser.pages):
+                    browser.retiring = True
+        finally:
+            if submission is not None and submission is not _DONE:
+                source.put_back(submission)
+            if page is not None:
+                # Closing must not hang on a connection that is going away
+                with trio.CancelScope(deadline=trio.current_time() + 5, shield=True):
+                    await page.close()
+
+    async def _limited_extract(self, page, submission):
+        if self.limiter is None:
+            return await self._extract(page, submission)
+        # The limiter's `acquire` blocks a thread, so the loop polls for a slot instead
+        while not self.limiter.try_acquire():
+            await trio.sleep(LIMITER_POLL_SECONDS)
+        started = time.monotonic()
+        try:
+            result = await self._extract(page, submission)
+        except (NetworkError,) + OVERLOAD_ERRORS as e:
+            self.limiter.overloaded(type(e).__name__)
+            raise
+        finally:
+            self.limiter.release()
+        self.limiter.succeeded(time.monotonic() - started)
+        return result
+
+    async def _extract(self, page, submission):
+        started = time.monotonic()
+        submission_hash = submission.get('hash')
+        submission_url = self.url_template.format(submission_hash=submission_hash)
+        submission['url'] = submission_url
+
+        with span('page.get'):
+            with trio.move_on_after(self.load_timeout) as load:
+                await page.navigate(submission_url, self.event)
+        if load.cancelled_caught:
+            raise NetworkError(f"Timed out loading {submission_url}")
+        with span('page.ready'):
+            await wait_ready(self.readiness, page, started)
+        with span('page.extract'):
+            raw = await page.evaluate(COLLECT_SCRIPT, [[field.name, field.selector] for field in self.spec.fields])
+            result = self.spec.parse(raw or {})
+        if self.archive and self.archive.wants(result.ok):
+            html = await page.evaluate(OUTER_HTML_SCRIPT)
+            await trio.to_thread.run_sync(partial(
+                self.archive.capture, submission_hash, submission_url, lambda: html, ok=result.ok, source='devtools'))
+
+        if not result.ok:
+            raise SelectorMissError(submission_url, result.errors, result.values)
+        submission.update(result.values)
+        log_summary(
+            'submission', hash=submission_hash, via='devtools',
+            title=submission.get('title'), votes=submission.get('votes'),
+            ms=round((time.monotonic() - started) * 1000),
+        )
+        return submission
@@ -0,0 +1,254 @@
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+from timing import span
+
+try:
+    import psutil  # Optional: only needed for the RSS recycling ceiling
+except ImportError:
+    psutil = None
+
+# Redefine navigator.webdriver to undefined to avoid detection
+HIDE_WEBDRIVER_SCRIPT = '''
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined
+    })
+'''
+
+def build_chrome_options(headless=True):
+    """
+    Builds the Chrome options shared by every pooled browser.
+
+    Args:
+        headless (bool): Run Chrome without a window. Set to False for debugging.
+
+    Returns:
+        Options: Selenium Chrome options.
+    """
+    options = Options()
+    if headless:
+        # `options.headless = True` is a no-op on Selenium 4.13+, so pass the flag explicitly
+        options.add_argument("--headless=new")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    # Anti-detection options
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    return options
+
+class DriverPool:
+    """
+    A bounded pool of long-lived Chrome WebDriver sessions.
+
+    The chromedriver binary is resolved once, browsers are launched lazily (or
+    ahead of time via `warm_up`) and handed out with `acquire`/`release`. A browser
+    is recycled after `max_pages` navigations or once its process tree grows past
+    `max_rss_mb` (requires psutil), so per-submission cost is a page load rather
+    than a process launch. With a `resource_policy`, every browser is launched
+    with it applied; with a `network_capture`, with the event log it reads.
+    """
+
+    def __init__(self, size=3, options=None, max_pages=100, max_rss_mb=None, resource_policy=None,
+                 network_capture=None):
+        """
+        Args:
+            size (int): Maximum number of live browsers.
+            options (Options): Chrome options; defaults to `build_chrome_options()`.
+            max_pages (int): Navigations served by a browser before it is replaced.
+            max_rss_mb (int): Resident memory ceiling per browser, in megabytes.
+            resource_policy (ResourcePolicy): Load strategy and request blocking for every browser.
+            network_capture (NetworkCapture): Reads fields from the pages' own responses.
+        """
+        self.size = size
+        self.options = options or build_chrome_options()
+        self.resource_policy = resource_policy
+        if resource_policy:
+            resource_policy.configure(self.options)
+        # Applied last: capture needs the 'none' load strategy
+        self.network_capture = network_capture
+        if network_capture:
+            network_capture.configure(self.options)
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self._driver_path = None
+        self._path_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._idle = queue.Queue()
+        self._live = 0
+        self._pages = {}
+        self._closed = False
+
+        if max_rss_mb and psutil is None:
+            logging.warning("psutil is not installed; the browser RSS ceiling will not be enforced.")
+
+    def driver_path(self):
+        """
+        Resolves the chromedriver binary, downloading it at most once per pool.
+
+        Returns:
+            str: Path to the chromedriver executable.
+        """
+        with self._path_lock:
+            if self._driver_path is None:
+                with span('driver.install'):
+                    self._driver_path = ChromeDriverManager().install()
+                logging.info("Resolved chromedriver at %s", self._driver_path)
+            return self._driver_path
+
+    def warm_up(self):
+        """
+        Launches every browser in the background so they are ready by the time
+        extraction starts. Returns immediately.
+        """
+        def launch_into_pool():
+            if not self._reserve_slot():
+                return
+            try:
+                driver = self._launch()
+            except Exception as e:
+                self._free_slot()
+                logging.error("Error warming up WebDriver: %s", e)
+                return
+            if self._closed:
+                self._retire(driver)
+            else:
+                self._idle.put(driver)
+
+        for _ in range(self.size):
+            threading.Thread(target=launch_into_pool, name="driver-warm-up", daemon=True).start()
+
+    def acquire(self):
+        """
+        Leases a browser, launching one if the pool is below its size limit and
+        otherwise waiting for one to be released.
+
+        Returns:
+            WebDriver: A ready-to-use Chrome driver.
+        """
+        while True:
+            if self._closed:
+                raise RuntimeError("DriverPool is closed")
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            if self._reserve_slot():
+                try:
+                    return self._launch()
+                except Exception:
+                    self._free_slot()
+                    raise
+            try:
+                # Poll so a browser discarded elsewhere frees a slot we can use
+                return self._idle.get(timeout=1.0)
+            except queue.Empty:
+                continue
+
+    def release(self, driver, discard=False):
+        """
+        Returns a leased browser to the pool, or quits it if it is due for recycling.
+
+        Args:
+            driver (WebDriver): The driver obtained from `acquire`.
+            discard (bool): Quit the browser instead of reusing it (e.g. after a failure).
+        """
+        pages = self._pages.get(id(driver), 0) + 1
+        self._pages[id(driver)] = pages
+        if discard or self._closed or self.worn_out(driver, pages):
+            self._retire(driver)
+        else:
+            self._idle.put(driver)
+
+    def worn_out(self, driver, pages):
+        """
+        Tells whether a browser is due for recycling, for callers that count the
+        pages of a leased browser themselves (one lease can serve many pages).
+
+        Args:
+            driver (WebDriver): A driver obtained from `acquire`.
+            pages (int): Pages it has served.
+
+        Returns:
+            bool: True once `max_pages` or the RSS ceiling is reached.
+        """
+        return pages >= self.max_pages or self._over_rss_ceiling(driver)
+
+    @contextmanager
+    def lease(self):
+        """
+        Context manager around `acquire`/`release`; the browser is discarded if the
+        block raises.
+        """
+        driver = self.acquire()
+        failed = False
+        try:
+            yield driver
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.release(driver, discard=failed)
+
+    def close(self):
+        """
+        Quits every idle browser. Browsers still leased are quit when released.
+        """
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._retire(driver)
+
+    def _reserve_slot(self):
+        with self._lock:
+            if self._closed or self._live >= self.size:
+                return False
+            self._live += 1
+            return True
+
+    def _free_slot(self):
+        with self._lock:
+            self._live -= 1
+
+    def _launch(self):
+        service = Service(self.driver_path())
+        with span('driver.launch'):
+            driver = webdriver.Chrome(service=service, options=self.options)
+            driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': HIDE_WEBDRIVER_SCRIPT})
+            if self.resource_policy:
+                self.resource_policy.apply(driver)
+        self._pages[id(driver)] = 0
+        logging.info("Launched pooled WebDriver (pid %s)", driver.service.process.pid)
+        return driver
+
+    def _retire(self, driver):
+        self._pages.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception as e:
+            logging.error("Error closing pooled WebDriver: %s", e)
+        finally:
+            self._free_slot()
+
+    def _over_rss_ceiling(self, driver):
+        if not self.max_rss_mb or psutil is None:
+            return False
+        try:
+            root = psutil.Process(driver.service.process.pid)
+            processes = [root] + root.children(recursive=True)
+            rss = sum(process.memory_info().rss for process in processes)
+        except (psutil.Error, AttributeError):
+            return False
+        if rss > self.max_rss_mb * 1024 * 1024:
+            logging.info("Recycling WebDriver at %.0f MB RSS", rss / (1024 * 1024))
+            return True
+        return False
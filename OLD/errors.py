@@ -0,0 +1,78 @@
+import requests
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+# Error classes, each with its own retry policy (see retry.DEFAULT_POLICIES)
+NETWORK = 'network'                # Connection failures and timeouts
+HTTP_STATUS = 'http_status'        # The server answered, but not with a 200
+WEBDRIVER_INIT = 'webdriver_init'  # No browser could be launched or leased
+SELECTOR_MISS = 'selector_miss'    # The page loaded but a required node never held a value
+CACHE_MISS = 'cache_miss'          # Replaying from the HTTP cache and the URL was never recorded
+OTHER = 'other'                    # Anything else, e.g. a browser crashing mid-page
+
+class ExtractionError(Exception):
+    """
+    Base class for failures that carry their error class in `kind`.
+    """
+    kind = OTHER
+
+class NetworkError(ExtractionError):
+    kind = NETWORK
+
+class HttpStatusError(ExtractionError):
+    """
+    A non-200 response. `retry_after` holds the parsed `Retry-After` header, if any.
+    """
+    kind = HTTP_STATUS
+
+    def __init__(self, url, status, retry_after=None):
+        super().__init__(f"Status code {status} for {url}")
+        self.url = url
+        self.status = status
+        self.retry_after = retry_after
+
+class DriverInitError(ExtractionError):
+    kind = WEBDRIVER_INIT
+
+class CacheMissError(ExtractionError):
+    """
+    A URL missing from the cache of a replaying session. Retrying cannot help,
+    and no retry policy covers it.
+    """
+    kind = CACHE_MISS
+
+    def __init__(self, url):
+        super().__init__(f"Not in replay cache: {url}")
+        self.url = url
+
+class SelectorMissError(ExtractionError):
+    """
+    Required fields that stayed empty. `values` holds whatever was extracted,
+    so a final failure can still record the fields that were found.
+    """
+    kind = SELECTOR_MISS
+
+    def __init__(self, url, errors, values=None):
+        super().__init__(f"Missing {', '.join(sorted(errors))} on {url}")
+        self.url = url
+        self.errors = errors
+        self.values = values or {}
+
+def classify(error):
+    """
+    Maps an exception to one of the error classes above.
+
+    Args:
+        error (Exception): The failure.
+
+    Returns:
+        str: NETWORK, HTTP_STATUS, WEBDRIVER_INIT, SELECTOR_MISS, CACHE_MISS or OTHER.
+    """
+    if isinstance(error, ExtractionError):
+        return error.kind
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, TimeoutException, ConnectionError, TimeoutError)):
+        return NETWORK
+    if isinstance(error, requests.HTTPError):
+        return HTTP_STATUS
+    if isinstance(error, WebDriverException) and 'net::ERR_' in str(error):
+        return NETWORK
+    return OTHER
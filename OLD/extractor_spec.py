@@ -0,0 +1,322 @@
+import re
+from html.parser import HTMLParser
+
+# Tags that never have a closing tag
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+
+# `tag.class#id` selectors, the only kind the static HTML parser matches
+SIMPLE_SELECTOR_RE = re.compile(r'^([a-zA-Z][\w-]*)?((?:[.#][\w-]+)*)$')
+
+# Collects the trimmed text of every node matching each field's selector in one call
+COLLECT_SCRIPT = '''
+    var out = {};
+    arguments[0].forEach(function (field) {
+        out[field[0]] = Array.from(document.querySelectorAll(field[1])).map(function (el) {
+            return (el.innerText || el.textContent || '').trim();
+        });
+    });
+    return out;
+'''
+
+def parse_text(texts):
+    """
+    Parse rule 'text': the first non-empty text.
+
+    Returns:
+        tuple: (value, error) where exactly one is None.
+    """
+    for text in texts:
+        if isinstance(text, str) and text.strip():
+            return text.strip(), None
+    return None, 'empty'
+
+def parse_int(texts):
+    """
+    Parse rule 'int': the first number found in any text, e.g. 123 from '123 Votes'.
+
+    Returns:
+        tuple: (value, error) where exactly one is None.
+    """
+    for text in texts:
+        value = parse_votes(text)
+        if value is not None:
+            return value, None
+    return None, 'no number'
+
+def parse_texts(texts):
+    """
+    Parse rule 'texts': every non-empty text, in document order.
+
+    Returns:
+        tuple: (value, error) where exactly one is None.
+    """
+    values = [text.strip() for text in texts if isinstance(text, str) and text.strip()]
+    return (values, None) if values else (None, 'empty')
+
+PARSE_RULES = {
+    'text': parse_text,
+    'int': parse_int,
+    'texts': parse_texts,
+}
+
+def parse_votes(value):
+    """
+    Converts a vote count from embedded state or node text into an int.
+
+    Args:
+        value: An int, or text such as '123 Votes'.
+
+    Returns:
+        int: The vote count, or None if there is no number.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if not isinstance(value, str):
+        return None
+    match = re.search(r'(\d+)', value)
+    return int(match.group(1)) if match else None
+
+class Field:
+    """
+    One field of an extractor spec: where to find it and how to parse it.
+    """
+
+    def __init__(self, name, selector, parse='text', required=True):
+        """
+        Args:
+            name (str): Key of the value in the result.
+            selector (str): CSS selector of the node(s) holding the value.
+            parse (str): Parse rule: 'text', 'int' or 'texts'.
+            required (bool): Whether a missing value makes the result not ok.
+        """
+        if parse not in PARSE_RULES:
+            raise ValueError(f"Unknown parse rule '{parse}' for field '{name}'")
+        self.name = name
+        self.selector = selector
+        self.parse = parse
+        self.required = required
+
+    def __repr__(self):
+        return f"Field({self.name!r}, {self.selector!r}, parse={self.parse!r})"
+
+class ExtractionResult:
+    """
+    Typed outcome of running a spec against one page.
+
+    Attributes:
+        values (dict): Field name -> parsed value (None when it failed).
+        errors (dict): Field name -> reason ('missing', 'empty', 'no number', ...).
+        raw (dict): Field name -> the texts the selector matched.
+    """
+
+    def __init__(self, values, errors, raw, required):
+        self.values = values
+        self.errors = errors
+        self.raw = raw
+        self._required = required
+
+    @property
+    def ok(self):
+        """
+        True when every required field parsed.
+        """
+        return not any(name in self.errors for name in self._required)
+
+    def get(self, name, default=None):
+        value = self.values.get(name)
+        return default if value is None else value
+
+    def __repr__(self):
+        return f"ExtractionResult(values={self.values!r}, errors={self.errors!r})"
+
+class ExtractorSpec:
+    """
+    A declarative set of fields (field -> selector -> parse rule).
+
+    `run` evaluates all of them in the browser with a single `execute_script`
+    round trip; `run_html` applies the same spec to static HTML, for specs whose
+    selectors are all `tag.class#id`. Adding a field
+    adds no round trips, and parse failures are reported per field instead of
+    raising.
+    """
+
+    def __init__(self, fields):
+        """
+        Args:
+            fields (list): `Field` instances; names must be unique.
+        """
+        self.fields = list(fields)
+        names = [field.name for field in self.fields]
+        if len(names) != len(set(names)):
+            raise ValueError(f"Duplicate field names in spec: {names}")
+
+    @classmethod
+    def from_config(cls, fields):
+        """
+        Builds a spec from a config's 'fields' list, e.g.
+        `[{"name": "votes", "selector": "div.css-tumkbo", "parse": "int"}]`;
+        'parse' defaults to 'text' and 'required' to true.
+        """
+        return cls([
+            Field(field['name'], field['selector'], parse=field.get('parse', 'text'), required=field.get('required', True))
+            for field in fields
+        ])
+
+    @property
+    def selectors(self):
+        """
+        Selectors of every field, e.g. for readiness waits.
+        """
+        return [field.selector for field in self.fields]
+
+    def run(self, driver):
+        """
+        Extracts every field from the page the driver is on.
+
+        Args:
+            driver (WebDriver): A driver that has loaded the page.
+
+        Returns:
+            ExtractionResult: Values and per-field errors.
+        """
+        raw = driver.execute_script(COLLECT_SCRIPT, [[field.name, field.selector] for field in self.fields])
+        return self.parse(raw or {})
+
+    def run_html(self, html):
+        """
+        Extracts every field from static HTML, without a browser.
+
+        Args:
+            html (str): The page HTML.
+
+        Returns:
+            ExtractionResult: Values and per-field errors.
+
+        Raises:
+            ValueError: A selector is not a simple `tag.class#id` selector.
+        """
+        parser = PageParser(self.selectors)
+        parser.feed(html)
+        parser.close()
+        return self.parse({field.name: parser.texts[field.selector] for field in self.fields})
+
+    def parse(self, raw):
+        """
+        Applies each field's parse rule to the texts its selector matched.
+
+        Args:
+            raw (dict): Field name -> list of texts.
+
+        Returns:
+            ExtractionResult: Values and per-field errors.
+        """
+        values = {}
+        errors = {}
+        for field in self.fields:
+            texts = raw.get(field.name)
+            if not isinstance(texts, list):
+                texts = [] if texts is None else [texts]
+            if not texts:
+                value, error = None, 'missing'
+            else:
+                value, error = PARSE_RULES[field.parse](texts)
+            values[field.name] = value
+            if error:
+                errors[field.name] = error
+        required = [field.name for field in self.fields if field.required]
+        return ExtractionResult(values, errors, raw, required)
+
+def parse_simple_selector(selector):
+    """
+    Parses a `tag.class#id` style CSS selector (no combinators).
+
+    Args:
+        selector (str): The selector, e.g. 'div.css-tumkbo'.
+
+    Returns:
+        tuple: (tag or None, id or None, set of classes).
+
+    Raises:
+        ValueError: The selector has combinators, attributes, pseudo-classes or
+            several ids, which only the browser can match.
+    """
+    match = SIMPLE_SELECTOR_RE.match(selector.strip())
+    if not match or not selector.strip():
+        raise ValueError(f"Selector '{selector}' is not a simple tag.class#id selector; "
+                         f"only the browser modes can match it")
+    tag, parts = match.groups()
+    element_ids = re.findall(r'#([\w-]+)', parts)
+    if len(element_ids) > 1:
+        raise ValueError(f"Selector '{selector}' has more than one id")
+    classes = set(re.findall(r'\.([\w-]+)', parts))
+    return (tag.lower() if tag else None, element_ids[0] if element_ids else None, classes)
+
+class PageParser(HTMLParser):
+    """
+    Single-pass HTML scan that collects the text of nodes matching simple
+    selectors, the bodies of inline scripts and `<meta>` properties.
+
+    Raises ValueError for a selector that is not `tag.class#id`, rather than
+    matching it loosely; see `parse_simple_selector`.
+    """
+
+    def __init__(self, selectors):
+        super().__init__(convert_charrefs=True)
+        self.selectors = {selector: parse_simple_selector(selector) for selector in selectors}
+        self.texts = {selector: [] for selector in selectors}
+        self.scripts = []
+        self.meta = {}
+        self._open = []
+        self._script = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'meta':
+            key = attrs.get('property') or attrs.get('name')
+            if key and attrs.get('content') is not None:
+                self.meta[key] = attrs['content']
+        if tag in VOID_TAGS:
+            return
+        if tag == 'script':
+            self._script = (attrs, [])
+        classes = set((attrs.get('class') or '').split())
+        matches = [
+            selector for selector, (want_tag, want_id, want_classes) in self.selectors.items()
+            if (want_tag is None or want_tag == tag)
+            and (want_id is None or want_id == attrs.get('id'))
+            and want_classes <= classes
+        ]
+        self._open.append((tag, matches, []))
+
+    def handle_endtag(self, tag):
+        if tag == 'script' and self._script is not None:
+            attrs, chunks = self._script
+            self.scripts.append((attrs, ''.join(chunks)))
+            self._script = None
+        if not any(open_tag == tag for open_tag, _, _ in self._open):
+            return
+        # Pop until the matching start tag, closing anything left unclosed
+        while self._open:
+            open_tag, matches, chunks = self._open.pop()
+            if matches:
+                text = ' '.join(''.join(chunks).split())
+                for selector in matches:
+                    self.texts[selector].append(text)
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self._script is not None:
+            self._script[1].append(data)
+            return
+        for _, matches, chunks in self._open:
+            if matches:
+                chunks.append(data)
+
+# Title and votes of a submission page
+TITLE_VOTES_SPEC = ExtractorSpec([
+    Field('title', 'div.css-1w984ju', parse='text'),
+    Field('votes', 'div.css-tumkbo', parse='int'),
+])
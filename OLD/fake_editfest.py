@@ -0,0 +1,276 @@
+import argparse
+import html
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+CATEGORIES = ['Title Sequence', 'Trailer', 'Music Video', 'Commercial', 'Short Film']
+DEFAULT_PAGE_SIZE = 15   # Page size when the client does not ask for one
+MAX_PAGE_SIZE = 100      # Larger per_page values are capped, as on the real API
+HASH_ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+
+# Rendering styles for submission pages:
+#   'html'  - title and votes nodes are in the served HTML
+#   'js'    - the nodes start empty and an inline script fills them in after `render_delay`
+#   'state' - only a `window.__STATE__ = {...};` blob carries the submission
+RENDER_MODES = ('html', 'js', 'state')
+
+PAGE_TEMPLATE = '''<!DOCTYPE html>
+<html>
+<head>
+<meta property="og:title" content="{title}">
+<title>{title} | Editfest</title>
+</head>
+<body>
+<div class="css-1w984ju">{title_text}</div>
+<div class="css-tumkbo">{votes_text}</div>
+{script}
+</body>
+</html>
+'''
+
+RENDER_SCRIPT = '''<script>
+setTimeout(function () {{
+    document.querySelector('div.css-1w984ju').textContent = {title};
+    document.querySelector('div.css-tumkbo').textContent = {votes};
+}}, {delay});
+</script>'''
+
+def submission_hash(index):
+    """
+    Stable six-character hash for the submission at `index`.
+    """
+    value = index * 2654435761 % 56800235584  # 62 ** 6
+    chars = []
+    for _ in range(6):
+        value, digit = divmod(value, 62)
+        chars.append(HASH_ALPHABET[digit])
+    return ''.join(chars)
+
+class FakeEditfest:
+    """
+    Local stand-in for editfest.filmsupply.com, serving generated data in the
+    same shapes the scrapers read: `/api/submissions?page=N` returns
+    `{"data": [...], "meta": {"last_page": ...}}` and `/submissions/<hash>`
+    returns a page with `div.css-1w984ju` (title) and `div.css-tumkbo` (votes).
+
+    Submissions are derived from their index rather than stored, so a
+    100k-submission site costs no memory. Latency and error rate apply to every
+    request.
+    """
+
+    def __init__(self, total=1000, latency=0.0, error_rate=0.0, render='html', render_delay=0.2,
+                 categories=None, host='127.0.0.1', port=0, seed=0):
+        """
+        Args:
+            total (int): Number of submissions.
+            latency (float): Seconds added to every response.
+            error_rate (float): Fraction of requests answered with a 500.
+            render (str): How submission pages expose their data; see `RENDER_MODES`.
+            render_delay (float): Seconds before the 'js' render fills in the nodes.
+            categories (list): Category names, assigned round-robin.
+            host (str): Interface to bind.
+            port (int): Port to bind; 0 picks a free one.
+            seed (int): Seed for votes and injected errors.
+        """
+        if render not in RENDER_MODES:
+            raise ValueError(f"Unknown render mode '{render}'; expected one of {', '.join(RENDER_MODES)}")
+        self.total = total
+        self.latency = latency
+        self.error_rate = error_rate
+        self.render = render
+        self.render_delay = render_delay
+        self.categories = list(categories or CATEGORIES)
+        self.seed = seed
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._index_by_hash = None
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def listing_url_template(self):
+        """
+        Drop-in replacement for `listing.API_URL_TEMPLATE`.
+        """
+        return self.base_url + '/api/submissions?page={page}'
+
+    @property
+    def submission_url_template(self):
+        """
+        Drop-in replacement for the scrapers' `SUBMISSION_URL_TEMPLATE`.
+        """
+        return self.base_url + '/submissions/{submission_hash}'
+
+    def submission(self, index):
+        """
+        The listing record for the submission at `index`.
+        """
+        return {
+            'hash': submission_hash(index),
+            'title': f"Submission {index}",
+            'name': f"Editor {index % 997}",
+            'category': self.categories[index % len(self.categories)],
+            'votes': (index * 7919 + self.seed) % 5000,
+        }
+
+    def listing(self, page, per_page=None, category=None):
+        """
+        Builds the listing payload for one page.
+        """
+        per_page = min(per_page or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+        if category in self.categories:
+            # Indices of one category are every len(categories)-th submission
+            offset = self.categories.index(category)
+            step = len(self.categories)
+            count = max(0, (self.total - offset + step - 1) // step)
+            index_of = lambda position: offset + position * step
+        else:
+            count = self.total
+            index_of = lambda position: position
+        last_page = max(1, (count + per_page - 1) // per_page)
+        first = (page - 1) * per_page
+        # Like the real API, the listing does not carry vote counts
+        data = [
+            {key: value for key, value in self.submission(index_of(position)).items() if key != 'votes'}
+            for position in range(first, min(first + per_page, count))
+        ]
+        return {
+            'data': data,
+            'meta': {'current_page': page, 'last_page': last_page, 'per_page': per_page, 'total': count},
+        }
+
+    def submission_page(self, hash_value):
+        """
+        Renders the submission page for `hash_value`, or returns None if unknown.
+        """
+        index = self._lookup(hash_value)
+        if index is None:
+            return None
+        record = self.submission(index)
+        title = html.escape(record['title'])
+        votes_text = f"{record['votes']} votes"
+        if self.render == 'html':
+            return PAGE_TEMPLATE.format(title=title, title_text=title, votes_text=votes_text, script='')
+        if self.render == 'js':
+            script = RENDER_SCRIPT.format(
+                title=json.dumps(record['title']), votes=json.dumps(votes_text),
+                delay=int(self.render_delay * 1000),
+            )
+            return PAGE_TEMPLATE.format(title=title, title_text='', votes_text='', script=script)
+        script = f"<script>window.__STATE__ = {json.dumps({'submission': record})};</script>"
+        return PAGE_TEMPLATE.format(title=title, title_text='', votes_text='', script=script)
+
+    def start(self):
+        """
+        Serves on a background thread.
+
+        Returns:
+            str: The base URL.
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-editfest", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def serve_forever(self):
+        """
+        Serves on the calling thread until interrupted.
+        """
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _lookup(self, hash_value):
+        if self._index_by_hash is None:
+            # Built on the first page request only; listing-only runs never pay for it
+            self._index_by_hash = {submission_hash(index): index for index in range(self.total)}
+        return self._index_by_hash.get(hash_value)
+
+    def _should_fail(self):
+        if not self.error_rate:
+            return False
+        with self._random_lock:
+            return self._random.random() < self.error_rate
+
+    def _handler_class(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                if site.latency:
+                    time.sleep(site.latency)
+                if site._should_fail():
+                    return self._send(500, 'text/plain', b'Injected error')
+
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path == '/api/submissions':
+                    try:
+                        page = int(query.get('page', ['1'])[0])
+                        per_page = int(query['per_page'][0]) if 'per_page' in query else None
+                    except ValueError:
+                        return self._send(422, 'text/plain', b'Invalid page')
+                    payload = site.listing(page, per_page, query.get('category', [None])[0])
+                    return self._send(200, 'application/json', json.dumps(payload).encode('utf-8'))
+                if url.path.startswith('/submissions/'):
+                    page = site.submission_page(url.path.rsplit('/', 1)[-1])
+                    if page is None:
+                        return self._send(404, 'text/plain', b'Not found')
+                    return self._send(200, 'text/html; charset=utf-8', page.encode('utf-8'))
+                self._send(404, 'text/plain', b'Not found')
+
+            def _send(self, status, content_type, body):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve a fake Editfest site with generated submissions.")
+    parser.add_argument('--total', type=int, default=1000, help="Number of submissions (default: 1000).")
+    parser.add_argument('--port', type=int, default=8000, help="Port to listen on (default: 8000).")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response.")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests that fail with a 500.")
+    parser.add_argument('--render', choices=RENDER_MODES, default='html', help="How submission pages expose their data.")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    site = FakeEditfest(total=args.total, latency=args.latency, error_rate=args.error_rate,
+                        render=args.render, port=args.port)
+    print(f"Serving {args.total} submissions at {site.base_url}")
+    print(f"  Listing:    {site.listing_url_template}")
+    print(f"  Submission: {site.submission_url_template}")
+    try:
+        site.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -1,273 +1,287 @@
-import requests
 import time
-import csv
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import re
 import logging
+from driver_pool import DriverPool
+from readiness import ReadinessEngine
+from extractor_spec import ExtractorSpec, Field
+from log_setup import log_summary, setup_queue_logging
+from timing import span, tracer
+from concurrency import AimdLimiter, slot
+from errors import DriverInitError, SelectorMissError
+from retry import RetryLane, log_failures
+from http_session import build_session
+from listing import ListingClient
+from pipeline import run_pipeline
+from resource_policy import DEFAULT_BLOCKED_DOMAINS, ResourcePolicy
+from sinks import open_sink
+from network_capture import NetworkCapture, page_source
+from snapshot_archive import SNAPSHOT_DIR, SnapshotArchive
 
 # Configuration
 API_URL_TEMPLATE = 'https://editfest.filmsupply.com/api/submissions?page={page}'
 SUBMISSION_URL_TEMPLATE = 'https://editfest.filmsupply.com/submissions/{submission_hash}'
-MAX_FETCH_THREADS = 5    # Number of concurrent threads for fetching pages
-MAX_VOTES_THREADS = 3    # Number of concurrent threads for votes extraction
-
-# Initialize lists
-submission_urls = []
-submissions_data = []
-
-# Setup Logging
-logging.basicConfig(
-    filename='scraping.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-console = logging.StreamHandler()
-console.setLevel(logging.INFO)
-formatter = logging.Formatter('%(levelname)s - %(message)s')
-console.setFormatter(formatter)
-logging.getLogger().addHandler(console)
+MAX_FETCH_THREADS = 5    # Starting number of concurrent threads for fetching pages
+MAX_FETCH_CEILING = 20   # Page fetching concurrency never grows past this
+MAX_VOTES_THREADS = 3    # Maximum number of concurrent threads for votes extraction
+SLOW_RENDER_SECONDS = 10 # A page render slower than this counts as overload
+RETRY_THREADS = 1        # Threads retrying failed submissions next to the votes threads
+MAX_PAGES_PER_DRIVER = 100   # Recycle a browser after this many submissions
+MAX_DRIVER_RSS_MB = 1024     # Recycle a browser whose process tree exceeds this (needs psutil)
+VOTES_TIMEOUT = 15       # Seconds to wait for the votes node to hold text
+CACHE_MODE = None        # 'record', 'replay' or 'refresh' to cache listing responses on disk
+CACHE_DIR = 'http_cache'
+TRACE_PATH = None            # e.g. 'harv_trace.json' to write a Chrome trace of every stage
+BLOCK_RESOURCES = True       # Skip images, media, fonts and third-party scripts; read pages at DOMContentLoaded
+BLOCKED_DOMAINS = DEFAULT_BLOCKED_DOMAINS  # Third-party domains never requested while BLOCK_RESOURCES is on
+CAPTURE_NETWORK = False      # Read votes from the JSON the page fetches instead of its rendered nodes
+NETWORK_CAPTURE_TIMEOUT = 10 # Seconds to wait for that response before falling back to the rendered nodes
+SINK_BACKEND = 'csv'         # 'csv', 'jsonl' or 'sqlite' storage for results until 'submissions.csv' is written
+SNAPSHOT_EVERY_PAGE = False  # Archive every page for offline re-extraction, not only failed ones
+
+# Votes node of a submission page, and the readiness waits for it shared by all votes threads
+VOTES_SPEC = ExtractorSpec([Field('votes', 'div.css-tumkbo', parse='int')])
+readiness = ReadinessEngine({'div.css-tumkbo': VOTES_TIMEOUT})
 
 # Headers to mimic a browser request
 headers = {
     'User-Agent': 'Mozilla/5.0',
 }
 
-logging.info("Starting to scrape submission URLs...")
-
-def fetch_page(page_number):
-    """
-    Fetches a single submission page from the API.
-
-    Args:
-        page_number (int): The page number to fetch.
-
-    Returns:
-        list: A list of submission dictionaries.
-    """
-    api_url = API_URL_TEMPLATE.format(page=page_number)
-    try:
-        response = requests.get(api_url, headers=headers)
-        if response.status_code != 200:
-            logging.error(f"Failed to retrieve page {page_number}: Status code {response.status_code}")
-            return []
-        data = response.json()
-        submissions = data.get('data', [])
-        logging.info(f"Page {page_number}: Retrieved {len(submissions)} submissions.")
-        return submissions
-    except Exception as e:
-        logging.error(f"Exception while fetching page {page_number}: {e}")
-        return []
-
-def fetch_all_submissions(total_pages):
-    """
-    Fetches all submissions across multiple pages concurrently.
-
-    Args:
-        total_pages (int): The total number of pages to fetch.
-
-    Returns:
-        list: A combined list of all submissions.
-    """
-    all_submissions = []
-    with ThreadPoolExecutor(max_workers=MAX_FETCH_THREADS) as executor:
-        future_to_page = {executor.submit(fetch_page, page): page for page in range(1, total_pages + 1)}
-        for future in as_completed(future_to_page):
-            page = future_to_page[future]
-            try:
-                submissions = future.result()
-                all_submissions.extend(submissions)
-            except Exception as e:
-                logging.error(f"Error processing page {page}: {e}")
-    return all_submissions
-
-def extract_votes(submission):
+def extract_votes(submission, pool, limiter=None, archive=None):
     """
     Extracts the number of votes for a given submission using Selenium.
 
     Args:
         submission (dict): A dictionary containing submission details.
+        pool (DriverPool): Pool of browsers to lease a WebDriver from.
+        limiter (AimdLimiter): Adapts the number of concurrent page loads.
+        archive (SnapshotArchive): Keeps the rendered page of failed (or all) submissions.
 
     Returns:
         dict: The updated submission dictionary with 'votes' key added.
+
+    Raises:
+        DriverInitError: No browser could be leased.
+        SelectorMissError: The page loaded but held no numerical votes.
+        WebDriverException: Navigation or the page scripts failed.
     """
     title = submission.get('title', 'No Title')
     name = submission.get('name', 'No Name')
     url = submission.get('url')
-    votes = None
-
-    logging.info(f"Fetching votes for '{title}' by {name}...")
-
-    # Initialize Selenium WebDriver for each thread
-    options = Options()
-    options.headless = True  # Set to False for debugging
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    # Anti-detection options
-    options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    options.add_experimental_option('useAutomationExtension', False)
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    
+
+    started = time.monotonic()
+
+    # Lease a long-lived browser instead of launching one per submission
     try:
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
-        # Redefine navigator.webdriver to undefined to avoid detection
-        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
-            'source': '''
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => undefined
-                })
-            '''
-        })
+        with span('driver.acquire'):
+            driver = pool.acquire()
     except Exception as e:
-        logging.error(f"Error initializing WebDriver for '{title}': {e}")
-        submission['votes'] = votes
-        return submission
+        raise DriverInitError(f"Error initializing WebDriver for '{title}': {e}") from e
 
+    failed = False
+    policy = pool.resource_policy
+    capture = pool.network_capture
+    page_cost = None
     try:
-        driver.get(url)
-        logging.info(f" - Navigated to {url}")
-
-        # Wait for a few seconds to let the page load fully
-        time.sleep(5)
-
-        # Use JavaScript to get all 'div.css-tumkbo' texts
-        votes_texts = driver.execute_script('return Array.from(document.querySelectorAll("div.css-tumkbo")).map(el => el.textContent.trim());')
-        logging.info(f"Votes Texts via JavaScript: {votes_texts}")
-
-        for idx, votes_text in enumerate(votes_texts, start=1):
-            logging.info(f" - Element {idx}: '{votes_text}'")
-            # Extract number from text
-            match = re.search(r'(\d+)', votes_text)
-            if match:
-                votes = int(match.group(1))
-                logging.info(f"   - Extracted Votes: {votes}")
-                break  # Assuming the first match is the desired one
-            else:
-                logging.warning("   - No numerical votes found in this element.")
-        
+        with slot(limiter) as held:
+            baseline = policy.start_page(driver) if policy else None
+            if capture:
+                capture.drain(driver)
+            page_started = time.monotonic()
+            with span('page.get'):
+                if capture:
+                    capture.navigate(driver, url)
+                else:
+                    driver.get(url)
+            logging.debug("Navigated to %s", url)
+
+            # Take the votes from the page's own data responses as soon as they arrive
+            result = None
+            if capture:
+                with span('page.capture'):
+                    result = capture.wait(driver, submission.get('hash'), VOTES_SPEC, page_started)
+
+            if result is None:
+                if capture:
+                    # `driver.get` did not wait; the previous submission may still be showing
+                    with span('page.get'):
+                        capture.wait_for_document(driver, url)
+                # Wait until the votes node holds text instead of a fixed sleep
+                with span('page.ready'):
+                    latencies = readiness.wait(driver, page_started)
+                if None in latencies.values():
+                    held.overloaded("render timeout")
+            render_seconds = time.monotonic() - page_started
+
+        if result is None:
+            # Read and parse the votes nodes in a single round trip
+            with span('page.extract'):
+                result = VOTES_SPEC.run(driver)
+        votes = result.values['votes']
         if votes is None:
-            logging.warning(f"No numerical votes found for '{title}'.")
-    
+            logging.debug("No numerical votes found for '%s': %s (texts: %s)", title, result.errors['votes'], result.raw.get('votes'))
+        if policy:
+            page_cost = policy.finish_page(driver, baseline, render_seconds)
+        if archive:
+            archive.capture(submission.get('hash'), url, lambda: page_source(driver, url, capture), ok=votes is not None)
+
     except Exception as e:
-        logging.error(f" - Could not fetch votes for '{title}': {e}")
-        # Optionally, save the page source for debugging
-        try:
-            with open('page_source_error.html', 'w', encoding='utf-8') as f:
-                f.write(driver.page_source)
-            logging.info("   - Page source saved to 'page_source_error.html' for debugging.")
-        except Exception as save_error:
-            logging.error(f"   - Failed to save page source: {save_error}")
-    
+        failed = True
+        logging.debug("Could not fetch votes for '%s': %s", title, e)
+        # Keep the page for debugging and later re-extraction
+        if archive:
+            archive.capture(submission.get('hash'), url, lambda: page_source(driver, url, capture), ok=False)
+        raise
+
     finally:
-        try:
-            driver.quit()
-            logging.info(f" - Closed WebDriver for '{title}'.")
-        except Exception as e_quit:
-            logging.error(f" - Error closing WebDriver for '{title}': {e_quit}")
+        with span('driver.release'):
+            pool.release(driver, discard=failed)
 
+    if votes is None:
+        raise SelectorMissError(url, result.errors)
     submission['votes'] = votes
+    log_summary('submission', hash=submission.get('hash'), title=title, name=name, votes=votes,
+                ms=round((time.monotonic() - started) * 1000), **(page_cost or {}))
+    return submission
+
+def prepare_submission(submission):
+    """
+    Reduces a listing entry to the fields used for votes extraction.
+
+    Args:
+        submission (dict): A submission from the listing.
+
+    Returns:
+        dict: The prepared submission, or None if it has no hash.
+    """
+    submission_hash = submission.get('hash')
+    title = submission.get('title', 'No Title')
+    name = submission.get('name', 'No Name')
+    category = submission.get('category', 'No Category')
+    if not submission_hash:
+        logging.warning("Submission without hash found: %s", submission)
+        return None
+    logging.debug("Added submission: %s by %s", title, name)
+    return {
+        'url': SUBMISSION_URL_TEMPLATE.format(submission_hash=submission_hash),
+        'title': title,
+        'name': name,
+        'category': category,
+        'hash': submission_hash
+    }
+
+def mark_failed(submission, error):
+    """
+    Result written for a submission whose votes extraction failed for good.
+    """
+    submission['votes'] = None
     return submission
 
-def extract_all_votes(submissions):
+def extract_all_votes(submissions, pool, write, retry=None, archive=None):
     """
-    Extracts votes for all submissions concurrently.
+    Extracts votes concurrently as `submissions` are produced, handing each
+    finished submission to `write` straight away.
 
     Args:
-        submissions (list): A list of submission dictionaries.
+        submissions (iterable): Prepared submission dictionaries; may be a generator.
+        pool (DriverPool): Browsers shared by the worker threads.
+        write (callable): Called with each updated submission, in completion order.
+        retry (RetryLane): Retries failed submissions alongside first attempts.
+        archive (SnapshotArchive): Keeps the pages of failed (or all) submissions.
 
     Returns:
-        list: The updated list of submissions with 'votes' added.
+        int: The number of submissions written.
     """
-    updated_submissions = []
-    with ThreadPoolExecutor(max_workers=MAX_VOTES_THREADS) as executor:
-        future_to_submission = {executor.submit(extract_votes, submission): submission for submission in submissions}
-        for future in as_completed(future_to_submission):
-            submission = future_to_submission[future]
-            try:
-                updated_submission = future.result()
-                updated_submissions.append(updated_submission)
-            except Exception as e:
-                logging.error(f"Exception occurred while fetching votes for '{submission.get('title', 'No Title')}': {e}")
-                submission['votes'] = None
-                updated_submissions.append(submission)
-    return updated_submissions
+    # Starts at half the browsers and grows to all of them while renders stay fast;
+    # backs off when they slow down or time out
+    limiter = AimdLimiter('votes extraction', initial=max(1, MAX_VOTES_THREADS // 2), max_limit=MAX_VOTES_THREADS,
+                          latency_ceiling=SLOW_RENDER_SECONDS)
+    return run_pipeline(
+        submissions,
+        lambda submission: extract_votes(submission, pool, limiter, archive),
+        write,
+        workers=MAX_VOTES_THREADS,
+        on_error=mark_failed,
+        retry=retry,
+    )
 
 def main():
-    # Step 1: Fetch the first page to determine total pages
+    # Setup Logging: records are queued and written as JSON lines by a background thread
+    setup_queue_logging('scraping.jsonl')
+    logging.info("Starting to scrape submission URLs...")
+    session = build_session(headers, pool_size=MAX_FETCH_CEILING, cache_dir=CACHE_DIR, cache_mode=CACHE_MODE)
+
+    # Start the browsers now so they are ready once the first listing page arrives
+    policy = ResourcePolicy(block_domains=BLOCKED_DOMAINS) if BLOCK_RESOURCES else None
+    capture = NetworkCapture(timeout=NETWORK_CAPTURE_TIMEOUT) if CAPTURE_NETWORK else None
+    pool = DriverPool(size=MAX_VOTES_THREADS, max_pages=MAX_PAGES_PER_DRIVER, max_rss_mb=MAX_DRIVER_RSS_MB,
+                      resource_policy=policy, network_capture=capture)
+    # Compressed page snapshots, re-extractable with snapshot_archive.py
+    archive = SnapshotArchive(SNAPSHOT_DIR, every_page=SNAPSHOT_EVERY_PAGE)
+    tracer.keep_events = bool(TRACE_PATH)
+    pool.warm_up()
     try:
-        response = requests.get(API_URL_TEMPLATE.format(page=1), headers=headers)
-        if response.status_code != 200:
-            logging.error(f"Failed to retrieve page 1: Status code {response.status_code}")
-            return
-        data = response.json()
-        meta = data.get('meta', {})
-        last_page = meta.get('last_page', 1)
-        logging.info(f"Total pages to fetch: {last_page}")
-    except Exception as e:
-        logging.error(f"Exception while fetching the first page: {e}")
+        with span('run'):
+            run(pool, session, archive)
+    finally:
+        pool.close()
+        archive.close()
+        # Where the time went, per stage
+        tracer.log_report()
+        if TRACE_PATH:
+            tracer.write_chrome_trace(TRACE_PATH)
+
+def run(pool, session, archive):
+    # Step 1: Fetch the first page to determine total pages (its payload is reused in step 2)
+    client = ListingClient(session, url_template=API_URL_TEMPLATE, max_threads=MAX_FETCH_CEILING,
+                           limiter=AimdLimiter('listing', initial=MAX_FETCH_THREADS, max_limit=MAX_FETCH_CEILING))
+    last_page = client.last_page()
+    if last_page is None:
+        logging.error("Failed to retrieve page 1.")
         return
+    logging.info("Total pages to fetch: %s", last_page)
 
-    # Step 2: Fetch all submissions concurrently
-    logging.info("Fetching all submissions...")
-    all_submissions = fetch_all_submissions(last_page)
-    logging.info(f"Total submissions collected: {len(all_submissions)}")
-
-    # Step 3: Prepare submissions data
-    for submission in all_submissions:
-        submission_hash = submission.get('hash')
-        title = submission.get('title', 'No Title')
-        name = submission.get('name', 'No Name')
-        category = submission.get('category', 'No Category')
-        if submission_hash:
-            submission_url = SUBMISSION_URL_TEMPLATE.format(submission_hash=submission_hash)
-            submissions_data.append({
-                'url': submission_url,
-                'title': title,
-                'name': name,
-                'category': category,
-                'hash': submission_hash
-            })
-            submission_urls.append(submission_url)
-            logging.info(f" - Added submission: {title} by {name}")
-        else:
-            logging.warning(f"Submission without hash found: {submission}")
-
-    logging.info(f"\nTotal submissions prepared for votes extraction: {len(submissions_data)}")
-
-    # Step 4: Extract votes concurrently
-    logging.info("\nStarting to fetch votes using threading...")
-    updated_submissions = extract_all_votes(submissions_data)
-    logging.info("\nAll votes have been fetched.")
-
-    # Step 5: Save submission data to CSV file
-    logging.info("\nSaving submission data to 'submissions.csv'...")
+    # Step 2: Stream prepared submissions from the listing into votes extraction
+    logging.info("\nStreaming submissions into votes extraction...")
+    prepared = (prepare_submission(submission) for submission in client.iter_submissions())
+    submissions = (submission for submission in prepared if submission is not None)
+
+    # Step 3: Append each submission to the partial results as it completes
     keys = ['url', 'title', 'name', 'category', 'votes']
+    retry = RetryLane('votes extraction', workers=RETRY_THREADS, describe=lambda submission: submission['url'])
+    sink = open_sink(SINK_BACKEND, 'submissions', keys, key='url')
     try:
-        with open('submissions.csv', 'w', newline='', encoding='utf-8') as output_file:
-            dict_writer = csv.DictWriter(output_file, keys)
-            dict_writer.writeheader()
-            dict_writer.writerows(updated_submissions)
-        logging.info("Submission data has been saved to 'submissions.csv'.")
-    except Exception as e:
-        logging.error(f"Error writing to CSV: {e}")
+        def write_submission(submission):
+            with span('output.write'):
+                sink.write(submission)
+
+        written = extract_all_votes(submissions, pool, write_submission, retry, archive)
+        logging.info("Extracted %s submissions into '%s'.", written, sink.path)
+    except OSError as e:
+        # A failed listing request lands here too; 'submissions.csv' is only replaced by a complete run
+        logging.error("Run stopped before it was complete, keeping the partial results: %s", e)
+        return
+    finally:
+        sink.close()
 
-    # Step 6: Save submission URLs to a text file
-    logging.info("\nSaving submission URLs to 'submission_urls.txt'...")
+    # Step 4: Turn the partial results into 'submissions.csv' and 'submission_urls.txt' in one atomic step
     try:
-        with open('submission_urls.txt', 'w') as f:
-            for url in submission_urls:
-                f.write(url + '\n')
-        logging.info("Submission URLs have been saved to 'submission_urls.txt'.")
-    except Exception as e:
-        logging.error(f"Error writing submission URLs to text file: {e}")
+        total = sink.finalize('submissions.csv', urls_path='submission_urls.txt')
+        logging.info("Saved %s submissions to 'submissions.csv' and 'submission_urls.txt'.", total)
+    except OSError as e:
+        logging.error("Error writing output files: %s", e)
+    readiness.log_summary()
+    if pool.resource_policy:
+        pool.resource_policy.log_summary()
+    if pool.network_capture:
+        pool.network_capture.log_summary()
+    archive.log_summary()
+
+    # Everything that is still missing after its retries, listed one by one
+    log_failures('listing', client.failures)
+    retry.log_report()
 
     logging.info("\nScraping completed successfully!")
 
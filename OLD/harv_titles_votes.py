@@ -1,305 +1,887 @@
-import requests
+import argparse
+import glob
+import multiprocessing
+import os
+import threading
 import time
-import csv
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.common.by import By
 import logging
-from logging.handlers import RotatingFileHandler  # Import RotatingFileHandler directly
-from tqdm import tqdm  # Importing tqdm for progress bars
-import re  # Import the 're' module for regular expressions
+from driver_pool import DriverPool, build_chrome_options
+from readiness import ReadinessEngine
+from extractor_spec import TITLE_VOTES_SPEC
+from log_setup import log_summary, setup_queue_logging
+from timing import span, tracer
+from concurrency import AimdLimiter, slot
+from errors import DriverInitError, SelectorMissError
+from retry import RetryLane, log_failures
+from http_session import build_session
+from http_extract import extract_submission_details_http
+from listing import ListingClient
+from listing_state import ListingState
+from pipeline import run_pipeline
+from checkpoint import CheckpointStore
+from http_cache import CACHE_MODES, REPLAY
+from vote_poll import PollScheduler, VoteSeriesStore, poll_votes
+from work_queue import LeaseQueue
+from resource_policy import DEFAULT_BLOCKED_DOMAINS, ResourcePolicy
+from network_capture import NetworkCapture, page_source
+from tab_pool import BACKGROUND_TAB_ARGUMENTS, TabPool
+from devtools_engine import DevToolsEngine
+from snapshot_archive import SNAPSHOT_DIR, SnapshotArchive
+from results_store import RESULTS_DB_PATH, ResultsStore
+from sinks import SINK_BACKENDS, open_sink
 
-def setup_logging():
+SUBMISSION_URL_TEMPLATE = 'https://editfest.filmsupply.com/submissions/{submission_hash}'
+MAX_EXTRACT_THREADS = 3      # Number of concurrent browsers for title and votes extraction
+MAX_HTTP_THREADS = 16        # Number of concurrent requests for the browser-free fast path
+MAX_FETCH_THREADS = 5        # Starting number of concurrent listing page requests
+MAX_FETCH_CEILING = 20       # Listing concurrency never grows past this
+SLOW_RESPONSE_SECONDS = 5    # A plain HTTP response slower than this counts as overload
+SLOW_RENDER_SECONDS = 10     # A page render slower than this counts as overload
+RETRY_THREADS = 2            # Threads retrying failed submissions next to the main workers
+MAX_PAGES_PER_DRIVER = 100   # Recycle a browser after this many submissions
+MAX_DRIVER_RSS_MB = 1024     # Recycle a browser whose process tree exceeds this (needs psutil)
+MAX_TAB_DRIVER_RSS_MB = 4096  # The same ceiling for a browser hosting several tabs
+CHECKPOINT_PATH = 'titles_votes_checkpoint.sqlite3'
+CACHE_DIR = 'http_cache'
+DEFAULT_CATEGORIES = ['Title Sequence']
+POLL_DB_PATH = 'vote_series.sqlite3'
+LISTING_STATE_PATH = 'listing_state.sqlite3'
+LISTING_NEWEST_FIRST = True  # The API lists the newest submissions on page 1
+QUEUE_PATH = 'titles_votes_queue.sqlite3'
+OUTPUT_BASE = 'titles_votes'  # Partial results go to e.g. 'titles_votes.partial.csv' until finalized
+SHARD_OUTPUT_TEMPLATE = 'titles_votes.shard-{shard}'
+SHARD_LEASE_BATCH = 20       # Submissions a worker process leases at a time
+SHARD_LEASE_SECONDS = 120    # A lease not renewed for this long goes back to the other workers
+MAX_WORKER_RESTARTS = 3      # Crashed worker processes replaced before giving up
+NETWORK_CAPTURE_TIMEOUT = 10  # Seconds to wait for the page's own data response before reading the DOM
+OUTPUT_KEYS = ['url', 'title', 'votes', 'name', 'category', 'hash']
+DEVTOOLS_PAGES_PER_BROWSER = 16  # Pages in flight per browser in devtools mode
+BROWSER_MODES = ('browser', 'network', 'devtools')  # Modes that render every page in Chrome
+
+def build_resource_policy(args):
     """
-    Sets up logging to file and console with rotation to prevent large log files.
+    Builds the resource policy applied to every browser, or None with --load-all-resources.
     """
-    logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
-    
-    # Rotating file handler
-    handler = RotatingFileHandler('title_votes_scraping.log', maxBytes=5*1024*1024, backupCount=2)  # 5MB per file, 2 backups
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
-    
-    # Console handler
-    console = logging.StreamHandler()
-    console.setLevel(logging.INFO)
-    console.setFormatter(formatter)
-    logger.addHandler(console)
+    if args.load_all_resources:
+        return None
+    return ResourcePolicy(block_domains=DEFAULT_BLOCKED_DOMAINS + (args.block_domains or []))
 
-def fetch_page(page_number, headers):
+def build_network_capture(args):
     """
-    Fetches a single submission page from the API.
-
-    Args:
-        page_number (int): The page number to fetch.
-        headers (dict): Headers to include in the request.
+    Builds the network capture for --mode network, or None for the other modes.
+    """
+    if args.mode != 'network':
+        return None
+    return NetworkCapture(timeout=NETWORK_CAPTURE_TIMEOUT)
 
-    Returns:
-        list: A list of submission dictionaries.
+def build_pool(args, network_capture=None, devtools=False):
     """
-    API_URL_TEMPLATE = 'https://editfest.filmsupply.com/api/submissions?page={page}'
-    api_url = API_URL_TEMPLATE.format(page=page_number)
-    try:
-        response = requests.get(api_url, headers=headers)
-        if response.status_code != 200:
-            logging.error(f"Failed to retrieve page {page_number}: Status code {response.status_code}")
-            return []
-        data = response.json()
-        submissions = data.get('data', [])
-        logging.info(f"Page {page_number}: Retrieved {len(submissions)} submissions.")
-        return submissions
-    except Exception as e:
-        logging.error(f"Exception while fetching page {page_number}: {e}")
-        return []
+    Builds the browser pool: one page per browser, or with --tabs, a few
+    browsers (--browsers, default 1) each loading that many pages in its own tabs.
+    For the DevTools engine (`devtools`), the pool only launches the browsers
+    the engine opens its tabs in.
+    """
+    resource_policy = build_resource_policy(args)
+    if devtools:
+        options = build_chrome_options()
+        for argument in BACKGROUND_TAB_ARGUMENTS:
+            options.add_argument(argument)
+        return DriverPool(size=args.browsers or 1, options=options,
+                          max_pages=MAX_PAGES_PER_DRIVER * (args.tabs or DEVTOOLS_PAGES_PER_BROWSER),
+                          max_rss_mb=MAX_TAB_DRIVER_RSS_MB, resource_policy=resource_policy)
+    if args.tabs and args.tabs > 1:
+        return TabPool(browsers=args.browsers or 1, tabs_per_browser=args.tabs,
+                       max_pages=MAX_PAGES_PER_DRIVER * args.tabs, max_rss_mb=MAX_TAB_DRIVER_RSS_MB,
+                       resource_policy=resource_policy, network_capture=network_capture)
+    return DriverPool(size=args.browsers or MAX_EXTRACT_THREADS, max_pages=MAX_PAGES_PER_DRIVER,
+                      max_rss_mb=MAX_DRIVER_RSS_MB, resource_policy=resource_policy, network_capture=network_capture)
 
-def fetch_all_submissions(total_pages, headers, max_threads=5):
+def build_snapshot_archive(args):
+    """
+    Builds the page snapshot archive: failed pages always, every page with --snapshots.
     """
-    Fetches all submissions across multiple pages concurrently.
+    return SnapshotArchive(args.snapshot_dir, every_page=args.snapshots)
 
-    Args:
-        total_pages (int): The total number of pages to fetch.
-        headers (dict): Headers to include in the requests.
-        max_threads (int): Maximum number of concurrent threads.
+def setup_logging():
+    """
+    Sets up non-blocking logging: worker threads only enqueue records, and a
+    background thread writes them as JSON lines to a rotating file and as
+    readable lines to the console.
+    """
+    setup_queue_logging('title_votes_scraping.jsonl')  # 5MB per file, 2 backups
 
-    Returns:
-        list: A combined list of all submissions.
-    """
-    all_submissions = []
-    with ThreadPoolExecutor(max_workers=max_threads) as executor:
-        # Submit all page fetch tasks
-        futures = {executor.submit(fetch_page, page, headers): page for page in range(1, total_pages + 1)}
-        
-        # Initialize tqdm progress bar for fetching submissions
-        for future in tqdm(as_completed(futures), total=len(futures), desc="Fetching Submissions", unit="page"):
-            page = futures[future]
-            try:
-                submissions = future.result()
-                all_submissions.extend(submissions)
-            except Exception as e:
-                logging.error(f"Error processing page {page}: {e}")
-    return all_submissions
-
-def extract_submission_details(submission, options):
+def extract_submission_details(submission, pool, readiness, spec=TITLE_VOTES_SPEC, limiter=None, url_template=None,
+                               archive=None, capture=None):
     """
     Extracts the title and votes from a given submission using Selenium.
 
     Args:
         submission (dict): A dictionary containing submission details.
-        options (Options): Selenium Chrome options.
+        pool (DriverPool): Pool of browsers (or a `TabPool` of tabs) to lease a WebDriver from.
+        readiness (ReadinessEngine): Decides when the page has rendered.
+        spec (ExtractorSpec): Fields to extract; all are read in one round trip.
+        limiter (AimdLimiter): Adapts the number of concurrent page loads.
+        url_template (str): Submission page URL with a `{submission_hash}`
+            field; defaults to `SUBMISSION_URL_TEMPLATE`.
+        archive (SnapshotArchive): Keeps the rendered page of failed (or all) submissions.
+        capture (NetworkCapture): Reads the fields from the page's own responses
+            before falling back to the DOM; the pool must have been built with it.
+            A pool built with one loads pages without waiting, so navigation waits
+            for the new document even when this submission does not use it.
 
     Returns:
-        dict: The updated submission dictionary with 'title' and 'votes' keys added.
+        dict: The updated submission dictionary with a key per spec field
+            ('title' and 'votes' by default).
+
+    Raises:
+        DriverInitError: No browser could be leased.
+        SelectorMissError: The page loaded but a required field stayed empty.
+        WebDriverException: Navigation or the page scripts failed.
     """
-    title = None
-    votes = None
     submission_hash = submission.get('hash')
-    submission_url = f"https://editfest.filmsupply.com/submissions/{submission_hash}"
-
-    logging.info(f"Processing submission: {submission_url}")
+    submission_url = (url_template or SUBMISSION_URL_TEMPLATE).format(submission_hash=submission_hash)
+    submission['url'] = submission_url  # Ensure the URL is included
 
     try:
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
-        # Redefine navigator.webdriver to undefined to avoid detection
-        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
-            'source': '''
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => undefined
-                })
-            '''
-        })
+        with span('driver.acquire'):
+            driver = pool.acquire()
     except Exception as e:
-        logging.error(f"Error initializing WebDriver for {submission_url}: {e}")
-        submission['title'] = None
-        submission['votes'] = None
-        return submission
+        raise DriverInitError(f"Error initializing WebDriver for {submission_url}: {e}") from e
 
+    failed = False
+    policy = pool.resource_policy
+    # The browsers' load strategy, not this target's mode, decides whether `driver.get` waits
+    loader = pool.network_capture
     try:
-        driver.get(submission_url)
-        logging.info(f" - Navigated to {submission_url}")
-        
-        # Wait for the page to load
-        time.sleep(5)  # Adjust based on page load speed or replace with explicit waits
+        with slot(limiter) as held:
+            baseline = policy.start_page(driver) if policy else None
+            if capture:
+                capture.drain(driver)
+            started = time.monotonic()
+            with span('page.get'):
+                if loader:
+                    loader.navigate(driver, submission_url)
+                else:
+                    driver.get(submission_url)
+            logging.debug("Navigated to %s", submission_url)
 
-        # Extract Title
-        try:
-            title_element = driver.find_element(By.CSS_SELECTOR, 'div.css-1w984ju')
-            title_text = title_element.text.strip()
-            logging.info(f" - Title Text Found: '{title_text}'")
-            if title_text:
-                title = title_text
-                logging.info(f"   - Extracted Title: {title}")
-            else:
-                logging.warning(f"   - Title text is empty for {submission_url}")
-        except Exception as e_title:
-            logging.error(f"   - Error extracting title for {submission_url}: {e_title}")
-            title = None
+            # Take the fields from the page's own data responses as soon as they arrive
+            result = None
+            if capture:
+                with span('page.capture'):
+                    result = capture.wait(driver, submission_hash, spec, started)
 
-        # Extract Votes
-        try:
-            votes_elements = driver.find_elements(By.CSS_SELECTOR, 'div.css-tumkbo')
-            votes_texts = [elem.text.strip() for elem in votes_elements]
-            logging.info(f" - Votes Texts Found: {votes_texts}")
-            for idx, votes_text in enumerate(votes_texts, start=1):
-                logging.info(f"   - Element {idx}: '{votes_text}'")
-                # Extract number from text using regex
-                match = re.search(r'(\d+)', votes_text)
-                if match:
-                    votes = int(match.group(1))
-                    logging.info(f"     - Extracted Votes: {votes}")
-                    break  # Assuming the first numerical value is the desired vote count
-                else:
-                    logging.warning("     - No numerical votes found in this element.")
-            if votes is None:
-                logging.warning(f"No numerical votes found for '{submission_url}'.")
-        except Exception as e_votes:
-            logging.error(f"   - Error extracting votes for {submission_url}: {e_votes}")
-            votes = None
+            if result is None:
+                if loader:
+                    # `driver.get` did not wait; the previous submission may still be showing
+                    with span('page.get'):
+                        loader.wait_for_document(driver, submission_url)
+                # Wait until the title and votes nodes hold text (or their timeouts run out)
+                with span('page.ready'):
+                    latencies = readiness.wait(driver, started)
+                if None in latencies.values():
+                    held.overloaded("render timeout")
+            render_seconds = time.monotonic() - started
+
+        if result is None:
+            # Extract every field of the spec in a single round trip
+            with span('page.extract'):
+                result = spec.run(driver)
+        for name, error in result.errors.items():
+            logging.debug("Could not extract %s for %s: %s (texts: %s)", name, submission_url, error, result.raw.get(name))
+
+        # Bandwidth and CPU spent on this page
+        page_cost = policy.finish_page(driver, baseline, render_seconds) if policy else None
+        if page_cost:
+            log_summary('page_cost', hash=submission_hash, **page_cost)
+        if archive:
+            archive.capture(submission_hash, submission_url, lambda: page_source(driver, submission_url, loader),
+                            ok=result.ok)
 
     except Exception as e:
-        logging.error(f" - Error processing submission {submission_url}: {e}")
-        # Optionally, save the page source for debugging
-        try:
-            with open(f'page_source_error_{submission_hash}.html', 'w', encoding='utf-8') as f:
-                f.write(driver.page_source)
-            logging.info(f"   - Page source saved to 'page_source_error_{submission_hash}.html' for debugging.")
-        except Exception as save_error:
-            logging.error(f"   - Failed to save page source for {submission_url}: {save_error}")
+        failed = True
+        logging.debug("Error processing submission %s: %s", submission_url, e)
+        # Keep the page for debugging and later re-extraction
+        if archive:
+            archive.capture(submission_hash, submission_url, lambda: page_source(driver, submission_url, loader),
+                            ok=False)
+        raise
 
     finally:
+        # Hand the browser back for the next submission; a failed one is replaced
+        with span('driver.release'):
+            pool.release(driver, discard=failed)
+
+    if not result.ok:
+        raise SelectorMissError(submission_url, result.errors, result.values)
+    submission.update(result.values)
+    return submission
+
+def extract_submission(submission, mode, pool, readiness, session, limiters=None, spec=TITLE_VOTES_SPEC, url_template=None,
+                       archive=None):
+    """
+    Extracts the title and votes (or the fields of `spec`) for one submission
+    with the configured mode.
+
+    Args:
+        submission (dict): A dictionary containing submission details.
+        mode (str): 'browser' renders the page in Chrome, 'network' also loads it
+            in Chrome but reads the fields from its data responses when the pool
+            has a network capture (no other mode waits on it), 'http' only uses
+            plain requests, and 'auto' tries requests first and renders the page
+            only if the fast path could not resolve it. 'devtools' renders a single submission like 'browser';
+            the DevTools engine only runs in `stream_submission_details`.
+        pool (DriverPool): Browsers to lease from.
+        readiness (ReadinessEngine): Shared page readiness waits.
+        session (requests.Session): Pooled session, required for 'http' and 'auto'.
+        limiters (dict): 'http' and 'browser' -> AimdLimiter; see `build_limiters`.
+        spec (ExtractorSpec): Fields to extract.
+        url_template (str): Submission page URL with a `{submission_hash}`
+            field; defaults to `SUBMISSION_URL_TEMPLATE`.
+        archive (SnapshotArchive): Keeps the pages of failed (or all) submissions;
+            in 'auto' mode only the browser's rendering is kept.
+
+    Returns:
+        dict: The updated submission dictionary with a key per spec field
+            ('title' and 'votes' by default).
+    """
+    limiters = limiters or {}
+    started = time.monotonic()
+    via = 'http'
+    submission_url = (url_template or SUBMISSION_URL_TEMPLATE).format(submission_hash=submission.get('hash'))
+    required = [field.name for field in spec.fields if field.required]
+    resolved = False
+    if mode == 'http':
+        submission = extract_submission_details_http(submission, session, submission_url,
+                                                     limiter=limiters.get('http'), spec=spec, archive=archive)
+    elif mode == 'auto':
         try:
-            driver.quit()
-            logging.info(f" - Closed WebDriver for {submission_url}.")
-        except Exception as e_quit:
-            logging.error(f" - Error closing WebDriver for {submission_url}: {e_quit}")
+            submission = extract_submission_details_http(submission, session, submission_url,
+                                                         limiter=limiters.get('http'), spec=spec)
+            resolved = all(submission.get(name) is not None for name in required)
+        except Exception as e:
+            # The browser gets its own chance before this counts as a failure
+            logging.debug("Fast path failed for %s: %s", submission_url, e)
+    if mode in BROWSER_MODES or (mode == 'auto' and not resolved):
+        via = 'browser'
+        submission = extract_submission_details(submission, pool, readiness, spec=spec,
+                                                limiter=limiters.get('browser'), url_template=url_template,
+                                                archive=archive,
+                                                capture=pool.network_capture if mode == 'network' else None)
 
-    submission['title'] = title
-    submission['votes'] = votes
-    submission['url'] = submission_url  # Ensure the URL is included
+    # One structured record per submission instead of a line per element
+    log_summary(
+        'submission', hash=submission.get('hash'), via=via,
+        title=submission.get('title'), votes=submission.get('votes'),
+        ms=round((time.monotonic() - started) * 1000),
+    )
+    return submission
+
+def build_limiters(max_browsers, pages_per_browser=DEVTOOLS_PAGES_PER_BROWSER):
+    """
+    Builds independent concurrency limiters for the extraction paths. Each
+    starts below its ceiling and grows towards it while pages stay fast.
+
+    Args:
+        max_browsers (int): Ceiling for concurrent page loads (the pool size).
+        pages_per_browser (int): Pages in flight per browser in 'devtools' mode.
+
+    Returns:
+        dict: 'http', 'browser' and 'devtools' -> AimdLimiter.
+    """
+    max_pages = max_browsers * pages_per_browser
+    return {
+        'http': AimdLimiter('http extraction', initial=max(1, MAX_HTTP_THREADS // 4),
+                            max_limit=MAX_HTTP_THREADS, latency_ceiling=SLOW_RESPONSE_SECONDS),
+        'browser': AimdLimiter('browser extraction', initial=max(1, max_browsers // 2),
+                               max_limit=max_browsers, latency_ceiling=SLOW_RENDER_SECONDS),
+        'devtools': AimdLimiter('devtools extraction', initial=max(1, max_pages // 4),
+                                max_limit=max_pages, latency_ceiling=SLOW_RENDER_SECONDS),
+    }
+
+def mark_failed(submission, error):
+    """
+    Result written for a submission whose extraction failed for good. Fields
+    found before a selector miss are kept.
+    """
+    values = getattr(error, 'values', {})
+    submission['title'] = values.get('title')
+    submission['votes'] = values.get('votes')
     return submission
 
-def extract_all_submission_details(submissions, max_threads=3):
+def extract_all_submission_details(submissions, max_threads=3, pool=None, readiness=None, mode='browser', session=None):
     """
     Extracts titles and votes for all submissions concurrently.
 
     Args:
-        submissions (list): A list of submission dictionaries.
+        submissions (iterable): Submission dictionaries; may be a generator.
         max_threads (int): Maximum number of concurrent threads.
+        pool (DriverPool): Browsers to lease from. A pool of `max_threads`
+            browsers is created (and closed afterwards) if omitted.
+        readiness (ReadinessEngine): Shared page readiness waits. Uses the
+            default title and votes selectors if omitted.
+        mode (str): 'browser', 'network', 'devtools', 'http' or 'auto'; see `extract_submission`.
+        session (requests.Session): Pooled session, required for 'http' and 'auto'.
 
     Returns:
         list: The updated list of submissions with 'title' and 'votes' added.
     """
     updated_submissions = []
-    
-    # Set up Selenium Chrome options once
-    options = Options()
-    options.headless = True  # Set to False for debugging
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    # Anti-detection options
-    options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    options.add_experimental_option('useAutomationExtension', False)
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    
-    with ThreadPoolExecutor(max_workers=max_threads) as executor:
-        # Submit all title and votes extraction tasks
-        futures = {executor.submit(extract_submission_details, submission, options): submission for submission in submissions}
-        
-        # Initialize tqdm progress bar for title and votes extraction
-        for future in tqdm(as_completed(futures), total=len(futures), desc="Extracting Titles & Votes", unit="submission"):
-            submission = futures[future]
-            try:
-                updated_submission = future.result()
-                updated_submissions.append(updated_submission)
-            except Exception as e:
-                logging.error(f"Exception occurred while extracting details for submission {submission.get('hash', 'No Hash')}: {e}")
-                submission['title'] = None
-                submission['votes'] = None
-                updated_submissions.append(submission)
+    stream_submission_details(
+        submissions, updated_submissions.append, max_threads=max_threads,
+        pool=pool, readiness=readiness, mode=mode, session=session,
+    )
     return updated_submissions
 
+def stream_submission_details(submissions, write, max_threads=3, pool=None, readiness=None, mode='browser', session=None,
+                              limiters=None, retry=None, pages_per_browser=DEVTOOLS_PAGES_PER_BROWSER, archive=None,
+                              url_template=None):
+    """
+    Extracts titles and votes as `submissions` are produced and hands each
+    finished submission to `write` straight away, so nothing waits for the
+    whole listing and results reach disk as they complete.
+
+    Args:
+        submissions (iterable): Submission dictionaries; typically a generator
+            still fetching listing pages.
+        write (callable): Called with each updated submission, in completion order.
+        max_threads (int): Maximum number of concurrent browsers.
+        pool (DriverPool): Browsers to lease from. A pool of `max_threads`
+            browsers is created (and closed afterwards) if omitted.
+        readiness (ReadinessEngine): Shared page readiness waits.
+        mode (str): 'browser', 'network', 'devtools', 'http' or 'auto'; see `extract_submission`.
+        session (requests.Session): Pooled session, required for 'http' and 'auto'.
+        limiters (dict): Extraction limiters; see `build_limiters`.
+        retry (RetryLane): Retries failed submissions alongside first attempts;
+            without one a failure is written straight away with empty fields.
+        pages_per_browser (int): Pages in flight per browser in 'devtools' mode.
+        archive (SnapshotArchive): Keeps the pages of failed (or all) submissions.
+        url_template (str): Submission page URL with a `{submission_hash}`
+            field; defaults to `SUBMISSION_URL_TEMPLATE`.
+
+    Returns:
+        int: The number of submissions written.
+    """
+    owns_pool = pool is None
+    if owns_pool:
+        pool = DriverPool(size=max_threads)
+    if readiness is None:
+        readiness = ReadinessEngine()
+    if limiters is None:
+        limiters = build_limiters(max_threads, pages_per_browser)
+
+    # Browser workers block on the pool, so HTTP modes can run more of them;
+    # the limiters decide how many are actually busy at a time
+    workers = max_threads if mode in BROWSER_MODES else MAX_HTTP_THREADS
+    try:
+        if mode == 'devtools':
+            # One event loop drives every page; the engine retries with the lane's policies
+            engine = DevToolsEngine(pool, url_template or SUBMISSION_URL_TEMPLATE, pages_per_browser=pages_per_browser,
+                                    readiness=readiness, retry=retry, archive=archive,
+                                    limiter=limiters.get('devtools'))
+            return engine.run(submissions, write, on_error=mark_failed)
+        return run_pipeline(
+            submissions,
+            lambda submission: extract_submission(submission, mode, pool, readiness, session, limiters,
+                                                  url_template=url_template, archive=archive),
+            write,
+            workers=workers,
+            on_error=mark_failed,
+            progress_desc="Extracting Titles & Votes",
+            retry=retry,
+        )
+    finally:
+        if owns_pool:
+            pool.close()
+
+def select_submission(submission):
+    """
+    Keeps only submissions that have a hash. Category filtering already
+    happened in the listing client.
+
+    Args:
+        submission (dict): A submission from the listing.
+
+    Returns:
+        bool: True if the submission should be extracted.
+    """
+    if not submission.get('hash'):
+        logging.warning("Submission without hash found: %s", submission)
+        return False
+    logging.debug("Added submission: %s by %s [Category: %s]", submission.get('title', 'No Title'), submission.get('name', 'No Name'), submission.get('category'))
+    return True
+
+def parse_args():
+    """
+    Parses the command-line options.
+    """
+    parser = argparse.ArgumentParser(description="Scrape Editfest submission titles and votes.")
+    parser.add_argument(
+        '--mode', choices=['auto', 'http', 'browser', 'network', 'devtools'], default='auto',
+        help="'auto' (default) tries plain HTTP first and falls back to Chrome, "
+             "'http' never starts a browser, 'browser' renders every page, and 'network' "
+             "loads every page in Chrome but reads the fields from the JSON the page fetches, "
+             "falling back to the rendered page. 'devtools' renders pages like 'browser' but drives "
+             "many tabs per browser from one event loop over the DevTools protocol (needs trio).",
+    )
+    parser.add_argument(
+        '--category', action='append', dest='categories', metavar='NAME',
+        help="Only crawl this category; repeat for several (default: 'Title Sequence').",
+    )
+    parser.add_argument(
+        '--all-categories', action='store_true',
+        help="Crawl every category.",
+    )
+    parser.add_argument(
+        '--resume', action='store_true',
+        help="Skip submissions already extracted by a previous run and retry pending or failed ones.",
+    )
+    parser.add_argument(
+        '--delta', action='store_true',
+        help="Only extract submissions that are new or changed in the listing since the previous run, "
+             "walking pages from the newest end until one holds nothing new; earlier results are kept.",
+    )
+    parser.add_argument(
+        '--listing-state', default=LISTING_STATE_PATH,
+        help=f"SQLite file remembering the listing seen by previous runs (default: {LISTING_STATE_PATH}).",
+    )
+    parser.add_argument(
+        '--checkpoint', default=CHECKPOINT_PATH,
+        help=f"SQLite file recording per-submission progress (default: {CHECKPOINT_PATH}).",
+    )
+    parser.add_argument(
+        '--cache', choices=list(CACHE_MODES),
+        help="Record HTTP responses to disk, replay them fully offline, or refresh "
+             "them with conditional requests. Replay implies --mode http.",
+    )
+    parser.add_argument(
+        '--cache-dir', default=CACHE_DIR,
+        help=f"Directory for recorded HTTP responses (default: {CACHE_DIR}).",
+    )
+    parser.add_argument(
+        '--sink', choices=list(SINK_BACKENDS), default='csv',
+        help="Storage for results while the crawl runs (default: csv). Rows are appended in small "
+             "batches and turned into 'titles_votes.csv' once the crawl ends.",
+    )
+    parser.add_argument(
+        '--snapshots', action='store_true',
+        help="Archive every rendered page, compressed, for offline re-extraction with snapshot_archive.py "
+             "(failed pages are always archived).",
+    )
+    parser.add_argument(
+        '--snapshot-dir', default=SNAPSHOT_DIR,
+        help=f"Page snapshot archive directory (default: {SNAPSHOT_DIR}).",
+    )
+    parser.add_argument(
+        '--results-db', default=RESULTS_DB_PATH,
+        help=f"Indexed results store that every run's vote counts are added to, for leaderboard "
+             f"queries with results_store.py (default: {RESULTS_DB_PATH}).",
+    )
+    parser.add_argument(
+        '--processes', type=int, default=1,
+        help="Split extraction across this many worker processes, each with its own browsers, "
+             "coordinated through a shared SQLite work queue (default: 1).",
+    )
+    parser.add_argument(
+        '--queue', default=QUEUE_PATH,
+        help=f"SQLite work queue used with --processes (default: {QUEUE_PATH}).",
+    )
+    parser.add_argument(
+        '--tabs', type=int,
+        help="Load this many pages at once in tabs of each browser instead of one page per browser; "
+             f"network capture is not available with tabs (default: 1, or {DEVTOOLS_PAGES_PER_BROWSER} "
+             "with --mode devtools).",
+    )
+    parser.add_argument(
+        '--browsers', type=int,
+        help=f"Number of browsers (default: {MAX_EXTRACT_THREADS}, or 1 with --tabs).",
+    )
+    parser.add_argument(
+        '--load-all-resources', action='store_true',
+        help="Let browsers load images, media, fonts and third-party scripts, and wait for the full "
+             "page load (by default they are blocked and pages are read at DOMContentLoaded).",
+    )
+    parser.add_argument(
+        '--block-domain', action='append', dest='block_domains', metavar='DOMAIN',
+        help="Also block requests to this domain and its subdomains; repeat for several.",
+    )
+    parser.add_argument(
+        '--trace', metavar='PATH',
+        help="Write a Chrome trace (chrome://tracing, Perfetto) of every timed stage to PATH.",
+    )
+    parser.add_argument(
+        '--poll', action='store_true',
+        help="Keep running and re-check votes on a schedule, storing changes as a time series.",
+    )
+    parser.add_argument(
+        '--poll-db', default=POLL_DB_PATH,
+        help=f"SQLite file for the vote time series (default: {POLL_DB_PATH}).",
+    )
+    parser.add_argument(
+        '--poll-min-interval', type=float, default=60,
+        help="Seconds between checks of changing or leading submissions (default: 60).",
+    )
+    parser.add_argument(
+        '--poll-max-interval', type=float, default=3600,
+        help="Longest back-off between checks of a static submission (default: 3600).",
+    )
+    args = parser.parse_args()
+    if args.all_categories:
+        args.categories = None
+    elif not args.categories:
+        args.categories = DEFAULT_CATEGORIES
+    return args
+
 def main():
+    args = parse_args()
     setup_logging()
+    tracer.keep_events = bool(args.trace)
     
     # Headers with randomized User-Agent can be implemented here if needed
     headers = {
         'User-Agent': 'Mozilla/5.0',
     }
-    
-    # Step 1: Fetch the first page to determine total pages
-    API_URL_TEMPLATE = 'https://editfest.filmsupply.com/api/submissions?page={page}'
-    first_page_url = API_URL_TEMPLATE.format(page=1)
+    session = build_session(headers, pool_size=MAX_HTTP_THREADS + MAX_FETCH_CEILING, cache_dir=args.cache_dir, cache_mode=args.cache)
+    if args.cache == REPLAY and args.mode != 'http':
+        # Browser page loads cannot be replayed, so stay offline
+        logging.info("Replay cache in use; extracting with --mode http.")
+        args.mode = 'http'
+
+    # Browsers launch lazily; when every page needs one, start them now so they
+    # are ready once the first listing page arrives
+    pool = build_pool(args, build_network_capture(args), devtools=args.mode == 'devtools')
+    if args.mode in BROWSER_MODES and args.processes <= 1:
+        pool.warm_up()
     try:
-        response = requests.get(first_page_url, headers=headers)
-        if response.status_code != 200:
-            logging.error(f"Failed to retrieve the first page: Status code {response.status_code}")
-            return
-        data = response.json()
-        meta = data.get('meta', {})
-        last_page = meta.get('last_page', 1)
-        logging.info(f"Total pages to fetch: {last_page}")
-    except Exception as e:
-        logging.error(f"Exception while fetching the first page: {e}")
+        with span('run'):
+            run(args, pool, session)
+    finally:
+        pool.close()
+        # Where the time went, per stage
+        tracer.log_report()
+        if args.trace:
+            tracer.write_chrome_trace(args.trace)
+
+def run(args, pool, session):
+    if args.poll:
+        run_poll(args, pool, session)
         return
 
-    # Step 2: Fetch all submissions concurrently with progress bar
-    logging.info("Fetching all submissions...")
-    all_submissions = fetch_all_submissions(last_page, headers, max_threads=5)
-    logging.info(f"Total submissions collected: {len(all_submissions)}")
-
-    # Step 3: Filter submissions by category "Title Sequence" and prepare submissions data
-    submissions_data = []
-    for submission in all_submissions:
-        submission_hash = submission.get('hash')
-        category = submission.get('category', '').strip()
-        if submission_hash and category.lower() == "title sequence":
-            submissions_data.append(submission)
-            logging.info(f" - Added submission: {submission.get('title', 'No Title')} by {submission.get('name', 'No Name')} [Category: {category}]")
-        else:
-            if not submission_hash:
-                logging.warning(f"Submission without hash found: {submission}")
-            elif category.lower() != "title sequence":
-                logging.info(f" - Skipping submission: {submission.get('title', 'No Title')} by {submission.get('name', 'No Name')} [Category: {category}]")
-
-    logging.info(f"\nTotal submissions prepared for title and votes extraction: {len(submissions_data)}")
-
-    # Step 4: Extract titles and votes concurrently with progress bar
-    logging.info("\nStarting to extract titles and votes using threading...")
-    updated_submissions = extract_all_submission_details(submissions_data, max_threads=3)
-    logging.info("\nAll titles and votes have been extracted.")
-
-    # Step 5: Save submission data to CSV file
-    logging.info("\nSaving submission data to 'titles_votes.csv'...")
-    keys = ['url', 'title', 'votes', 'name', 'category', 'hash']
+    # Every listing page fetched is remembered, so the next run can sync just the delta
+    listing_state = ListingState(args.listing_state)
     try:
-        with open('titles_votes.csv', 'w', newline='', encoding='utf-8') as output_file:
-            dict_writer = csv.DictWriter(output_file, fieldnames=keys)
-            dict_writer.writeheader()
-            for submission in updated_submissions:
-                # Create a new dict with only the desired keys
-                row = {key: submission.get(key, '') for key in keys}
-                dict_writer.writerow(row)
-        logging.info("Submission data has been saved to 'titles_votes.csv'.")
-    except Exception as e:
-        logging.error(f"Error writing to CSV: {e}")
+        run_listing(args, pool, session, listing_state)
+    finally:
+        listing_state.close()
+
+def list_submissions(args, client):
+    """
+    The listing entries to extract: every submission, or with --delta only the
+    new and changed ones.
+    """
+    if not args.delta:
+        return client.iter_submissions()
+    logging.info("Delta sync against %s known submissions.", client.state.known_count())
+    return (submission for _, submissions in client.iter_changed(newest_first=LISTING_NEWEST_FIRST)
+            for submission in submissions)
+
+def run_listing(args, pool, session, listing_state):
+    # Step 1: Fetch the first page to determine total pages (its payload is reused in step 2)
+    client = ListingClient(session, max_threads=MAX_FETCH_CEILING, categories=args.categories,
+                           limiter=AimdLimiter('listing', initial=MAX_FETCH_THREADS, max_limit=MAX_FETCH_CEILING),
+                           state=listing_state)
+    last_page = client.last_page()
+    if last_page is None:
+        logging.error("Failed to retrieve the first page.")
+        return
+    logging.info("Total pages to fetch: %s", last_page)
 
-    # Step 6: Save submission URLs to a text file
-    logging.info("\nSaving submission URLs to 'submission_urls.txt'...")
+    if args.processes > 1:
+        run_sharded(args, client)
+        return
+
+    # Step 2: Open the checkpoint; a resumed run skips submissions that already finished,
+    # and a delta run adds to the previous one
+    checkpoint = CheckpointStore(args.checkpoint)
+    if args.resume:
+        finished = checkpoint.done_hashes()
+        logging.info("Resuming from '%s': %s", args.checkpoint, checkpoint.counts())
+    else:
+        if not args.delta:
+            checkpoint.reset()
+        finished = set()
+
+    def queue_submission(submission):
+        if not select_submission(submission):
+            return False
+        if submission['hash'] in finished:
+            client.complete(submission['hash'])
+            return False
+        checkpoint.mark_pending(submission['hash'])
+        return True
+
+    # Step 3: Stream listing pages, already narrowed to the selected categories, into extraction
+    # and append each finished submission to the partial results as soon as it completes
+    logging.info("\nStreaming submissions into title and votes extraction...")
+    submissions = (submission for submission in list_submissions(args, client) if queue_submission(submission))
+    readiness = ReadinessEngine()
+    archive = build_snapshot_archive(args)
+    retry = RetryLane('extraction', workers=RETRY_THREADS, describe=lambda submission: submission.get('hash'))
+    sink = open_sink(args.sink, OUTPUT_BASE, OUTPUT_KEYS, resume=args.resume or args.delta)
+    results = ResultsStore(args.results_db)
+    run_id = results.begin_run('delta' if args.delta else 'resume' if args.resume else 'full')
     try:
-        with open('submission_urls.txt', 'w') as f:
-            for submission in updated_submissions:
-                f.write(f"{submission.get('url', 'No URL')}\n")
-        logging.info("Submission URLs have been saved to 'submission_urls.txt'.")
-    except Exception as e:
-        logging.error(f"Error writing submission URLs to text file: {e}")
+        # Carry over the rows finished by the run being resumed (duplicates are dropped)
+        if args.resume:
+            for submission in checkpoint.iter_done():
+                sink.write(submission)
+
+        def write_submission(submission):
+            with span('output.write'):
+                # A changed listing entry replaces the row of the previous run
+                sink.write(submission, replace=args.delta)
+            with span('checkpoint.record'):
+                checkpoint.record(submission)
+            if submission.get('votes') is not None:
+                # Failed submissions leave their listing page open for the next delta
+                client.complete(submission['hash'])
+            with span('results.record'):
+                results.record(run_id, submission)
+
+        written = stream_submission_details(
+            submissions, write_submission, max_threads=pool.size, pool=pool,
+            readiness=readiness, mode=args.mode, session=session, retry=retry,
+            pages_per_browser=args.tabs or DEVTOOLS_PAGES_PER_BROWSER, archive=archive,
+        )
+        logging.info("Extracted %s submissions into '%s'.", written, sink.path)
+        # A crashed run is left without a snapshot, so diffs skip it
+        results.end_run(run_id)
+    except OSError as e:
+        # A failed listing request lands here too; 'titles_votes.csv' is only replaced by a complete run
+        logging.error("Run stopped before it was complete, keeping the partial results: %s", e)
+        return
+    finally:
+        sink.close()
+        archive.close()
+        results.close()
+        logging.info("Checkpoint states: %s", checkpoint.counts())
+        checkpoint.close()
+
+    # Step 4: Turn the partial results into 'titles_votes.csv' and 'submission_urls.txt' in one atomic step
+    try:
+        total = sink.finalize('titles_votes.csv', urls_path='submission_urls.txt')
+        logging.info("Saved %s submissions to 'titles_votes.csv' and 'submission_urls.txt'.", total)
+    except OSError as e:
+        logging.error("Error writing output files: %s", e)
+    readiness.log_summary()
+    if pool.resource_policy:
+        pool.resource_policy.log_summary()
+    if pool.network_capture:
+        pool.network_capture.log_summary()
+    archive.log_summary()
+
+    # Everything that is still missing after its retries, listed one by one
+    log_failures('listing', client.failures)
+    retry.log_report()
 
     logging.info("\nScraping completed successfully!")
 
+def run_sharded(args, client):
+    """
+    Multi-process mode: this process streams the listing into a shared lease
+    queue while `args.processes` worker processes, each with its own browsers
+    and session, lease and extract submissions. Crashed workers are replaced
+    and their expired leases picked up by the others. The per-shard CSVs are
+    merged and deduplicated into 'titles_votes.csv' at the end.
+    """
+    work_queue = LeaseQueue(args.queue, lease_seconds=SHARD_LEASE_SECONDS)
+    if args.resume:
+        work_queue.requeue_failed()
+        logging.info("Resuming from '%s': %s", args.queue, work_queue.counts())
+    else:
+        work_queue.reset()
+        for path in glob.glob(SHARD_OUTPUT_TEMPLATE.format(shard='*') + '.*'):
+            os.remove(path)
+
+    # Spawned rather than forked: each worker starts clean, without this process's threads
+    context = multiprocessing.get_context('spawn')
+
+    def start_worker(shard):
+        process = context.Process(target=run_shard_worker, args=(shard, args), name=f"shard-{shard}")
+        process.start()
+        return process
+
+    workers = {shard: start_worker(shard) for shard in range(args.processes)}
+    logging.info("Started %s worker processes on '%s'.", args.processes, args.queue)
+
+    # Workers start on the first pages while later ones are still being listed
+    batch = []
+    for submission in list_submissions(args, client):
+        if select_submission(submission):
+            batch.append(submission)
+        if len(batch) >= 100:
+            work_queue.enqueue(batch)
+            batch = []
+    work_queue.enqueue(batch)
+    work_queue.seal()
+    logging.info("Listing queued: %s", work_queue.counts())
+
+    restarts = 0
+    while workers:
+        for shard, process in list(workers.items()):
+            process.join(timeout=1)
+            if process.exitcode is None:
+                continue
+            del workers[shard]
+            if process.exitcode != 0 and not work_queue.finished():
+                if restarts < MAX_WORKER_RESTARTS:
+                    restarts += 1
+                    logging.warning("Worker %s exited with code %s; restarting it.", shard, process.exitcode)
+                    workers[shard] = start_worker(shard)
+                else:
+                    logging.error("Worker %s exited with code %s; no restarts left.", shard, process.exitcode)
+
+    logging.info("Work queue states: %s", work_queue.counts())
+    done = work_queue.done_hashes()
+    work_queue.close()
+    log_failures('listing', client.failures)
+
+    written = merge_shard_outputs(args.sink, 'titles_votes.csv', 'submission_urls.txt', keep_existing=args.delta)
+    logging.info("Merged %s shards into %s rows in 'titles_votes.csv'.", args.processes, written)
+    # Only now are the listing pages of finished submissions recorded for the next delta
+    for submission_hash in done:
+        client.complete(submission_hash)
+
+    # Workers only write their shard files, so the results store is updated from the merged output once
+    results = ResultsStore(args.results_db)
+    try:
+        run_id, recorded = results.import_csv('titles_votes.csv', 'delta' if args.delta else 'full')
+        logging.info("Recorded %s submissions as run %s in '%s'.", recorded, run_id, args.results_db)
+    finally:
+        results.close()
+
+def run_shard_worker(shard, args):
+    """
+    Entry point of one worker process: leases submissions from the shared
+    queue until it is sealed and drained, and appends results to its shard CSV.
+    """
+    setup_queue_logging(f'title_votes_scraping.shard-{shard}.jsonl')
+    owner = f"shard-{shard}-{os.getpid()}"
+    work_queue = LeaseQueue(args.queue, lease_seconds=SHARD_LEASE_SECONDS)
+    session = build_session({'User-Agent': 'Mozilla/5.0'}, pool_size=MAX_HTTP_THREADS,
+                            cache_dir=args.cache_dir, cache_mode=args.cache)
+    pool = build_pool(args, build_network_capture(args), devtools=args.mode == 'devtools')
+    if args.mode in BROWSER_MODES:
+        pool.warm_up()
+
+    # Keep every lease this worker holds alive while it is healthy
+    stop = threading.Event()
+
+    def heartbeat():
+        while not stop.wait(SHARD_LEASE_SECONDS / 3):
+            work_queue.renew(owner)
+
+    def leased_submissions():
+        while True:
+            submissions = work_queue.lease(owner, SHARD_LEASE_BATCH)
+            if submissions:
+                yield from submissions
+            elif work_queue.finished():
+                return
+            else:
+                time.sleep(1)
+
+    threading.Thread(target=heartbeat, name="lease-heartbeat", daemon=True).start()
+    retry = RetryLane('extraction', workers=RETRY_THREADS, describe=lambda submission: submission.get('hash'))
+    archive = build_snapshot_archive(args)
+    # A restarted worker keeps appending to the rows of the one it replaces
+    sink = open_sink(args.sink, SHARD_OUTPUT_TEMPLATE.format(shard=shard), OUTPUT_KEYS, resume=True)
+    try:
+        def write_submission(submission):
+            sink.write(submission)
+            votes_found = submission.get('votes') is not None
+            work_queue.complete(owner, submission['hash'], ok=votes_found,
+                                error=None if votes_found else "no votes extracted")
+
+        written = stream_submission_details(
+            leased_submissions(), write_submission, max_threads=pool.size, pool=pool,
+            mode=args.mode, session=session, retry=retry,
+            pages_per_browser=args.tabs or DEVTOOLS_PAGES_PER_BROWSER, archive=archive,
+        )
+        sink.close()
+        logging.info("Shard %s wrote %s submissions to '%s'.", shard, written, sink.path)
+        retry.log_report()
+        if pool.resource_policy:
+            pool.resource_policy.log_summary()
+        if pool.network_capture:
+            pool.network_capture.log_summary()
+        archive.log_summary()
+    finally:
+        sink.close()
+        archive.close()
+        stop.set()
+        pool.close()
+        work_queue.close()
+
+def merge_shard_outputs(backend, output_path, urls_path, keep_existing=False):
+    """
+    Merges the per-shard partial results into one output, keeping one row per
+    hash. A submission written by more than one shard (its lease expired
+    mid-extraction) keeps a row that has votes over one that does not.
+
+    Args:
+        backend (str): Sink backend the shards wrote with; see `sinks.SINK_BACKENDS`.
+        output_path (str): Final CSV, replaced atomically.
+        urls_path (str): Final URL list, replaced atomically.
+        keep_existing (bool): Merge into the results of the previous run (a
+            delta sync), with the shards' rows replacing older ones.
+
+    Returns:
+        int: The number of rows written.
+    """
+    extension = SINK_BACKENDS[backend][1]
+    with open_sink(backend, OUTPUT_BASE, OUTPUT_KEYS, resume=keep_existing) as merged:
+        for path in sorted(glob.glob(SHARD_OUTPUT_TEMPLATE.format(shard='*') + extension)):
+            with open_sink(backend, path[:-len(extension)], OUTPUT_KEYS, resume=True) as shard_sink:
+                for row in shard_sink.rows():
+                    merged.write(row, replace=keep_existing)
+    return merged.finalize(output_path, urls_path=urls_path)
+
+def run_poll(args, pool, session):
+    """
+    Long-running poll mode: re-checks votes on a change-aware schedule and
+    stores each change in the vote time series instead of writing a snapshot CSV.
+    """
+    listing_limiter = AimdLimiter('listing', initial=MAX_FETCH_THREADS, max_limit=MAX_FETCH_CEILING)
+
+    def discover():
+        # A fresh client so page 1 is fetched again and new submissions show up
+        client = ListingClient(session, max_threads=MAX_FETCH_CEILING, categories=args.categories,
+                               limiter=listing_limiter)
+        return [submission for submission in client.iter_submissions() if submission.get('hash')]
+
+    readiness = ReadinessEngine()
+    store = VoteSeriesStore(args.poll_db)
+    # Changed counts also move the leaderboards, as one long 'poll' run
+    results = ResultsStore(args.results_db)
+    run_id = results.begin_run('poll')
+    scheduler = PollScheduler(min_interval=args.poll_min_interval, max_interval=args.poll_max_interval)
+    workers = pool.size if args.mode in BROWSER_MODES else MAX_HTTP_THREADS
+    limiters = build_limiters(pool.size)
+    logging.info("Polling votes into '%s'; press Ctrl+C to stop.", args.poll_db)
+    try:
+        poll_votes(
+            discover,
+            lambda submission: extract_submission(submission, args.mode, pool, readiness, session, limiters),
+            store, scheduler, workers=workers,
+            on_change=lambda submission: results.record(run_id, submission),
+        )
+    except KeyboardInterrupt:
+        logging.info("Polling stopped.")
+    finally:
+        store.close()
+        results.end_run(run_id)
+        results.close()
+
 if __name__ == "__main__":
     main()
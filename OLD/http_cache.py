@@ -0,0 +1,123 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+import requests
+from requests.structures import CaseInsensitiveDict
+from errors import CacheMissError
+
+RECORD = 'record'     # Always go to the network and store every 200 response
+REPLAY = 'replay'     # Never touch the network; serve only what was recorded
+REFRESH = 'refresh'   # Revalidate stored responses with conditional requests
+CACHE_MODES = (RECORD, REPLAY, REFRESH)
+
+# Headers that describe the wire encoding rather than the stored (decoded) body
+_DROPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'keep-alive'}
+
+class CachingSession(requests.Session):
+    """
+    A `requests.Session` that records GET responses to disk and replays them.
+
+    Each response is stored as `<cache_dir>/<ab>/<sha256>.json` (status, headers,
+    validators) plus a `.body` file. In replay mode a URL that was never recorded
+    raises `CacheMissError`, which is not retried and does not count against the
+    concurrency limiters, so a replay stays fast and deterministic. In refresh
+    mode stored entries are revalidated with `If-None-Match` /
+    `If-Modified-Since` and a 304 is served from disk.
+    """
+
+    def __init__(self, cache_dir, mode=RECORD):
+        """
+        Args:
+            cache_dir (str): Directory holding the recorded responses.
+            mode (str): One of 'record', 'replay' or 'refresh'.
+        """
+        super().__init__()
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}'; expected one of {', '.join(CACHE_MODES)}")
+        self.cache_dir = cache_dir
+        self.mode = mode
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def request(self, method, url, **kwargs):
+        if method.upper() != 'GET':
+            return super().request(method, url, **kwargs)
+
+        full_url = requests.Request(method, url, params=kwargs.pop('params', None)).prepare().url
+        meta_path, body_path = self._paths(full_url)
+        cached = self._load(meta_path, body_path)
+
+        if self.mode == REPLAY:
+            if cached is None:
+                raise CacheMissError(full_url)
+            return cached
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if self.mode == REFRESH and cached is not None:
+            if cached.headers.get('ETag'):
+                headers['If-None-Match'] = cached.headers['ETag']
+            if cached.headers.get('Last-Modified'):
+                headers['If-Modified-Since'] = cached.headers['Last-Modified']
+
+        response = super().request(method, full_url, headers=headers, **kwargs)
+        if response.status_code == 304 and cached is not None:
+            logging.debug("Revalidated cached response for %s", full_url)
+            return cached
+        if response.status_code == 200:
+            self._store(response, meta_path, body_path)
+        return response
+
+    def _paths(self, url):
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        directory = os.path.join(self.cache_dir, digest[:2])
+        return os.path.join(directory, digest + '.json'), os.path.join(directory, digest + '.body')
+
+    def _load(self, meta_path, body_path):
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        response = requests.Response()
+        response.status_code = meta['status']
+        response.reason = meta.get('reason')
+        response.headers = CaseInsensitiveDict(meta['headers'])
+        response.url = meta['url']
+        response.encoding = meta.get('encoding')
+        response._content = body
+        return response
+
+    def _store(self, response, meta_path, body_path):
+        meta = {
+            'url': response.url,
+            'status': response.status_code,
+            'reason': response.reason,
+            'encoding': response.encoding,
+            'headers': {k: v for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS},
+            'stored_at': time.time(),
+        }
+        directory = os.path.dirname(meta_path)
+        os.makedirs(directory, exist_ok=True)
+        try:
+            # Body first, metadata last: an entry only counts once its .json exists
+            _atomic_write(body_path, response.content)
+            _atomic_write(meta_path, json.dumps(meta).encode('utf-8'))
+        except OSError as e:
+            logging.warning("Could not cache response for %s: %s", response.url, e)
+
+def _atomic_write(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
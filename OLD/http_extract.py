@@ -0,0 +1,168 @@
+import json
+import re
+from concurrency import parse_retry_after, slot
+from errors import HttpStatusError
+from timing import span
+from extractor_spec import TITLE_VOTES_SPEC, PageParser, parse_votes
+
+# Keys that may hold the vote count in the page's embedded state
+VOTES_KEYS = ('votes', 'votes_count', 'vote_count', 'total_votes', 'votesCount', 'voteCount')
+
+# `window.__STATE__ = {...};` style assignments in inline scripts
+STATE_ASSIGNMENT_RE = re.compile(r'^\s*(?:window\.)?[\w$.]+\s*=\s*(\{.*\})\s*;?\s*$', re.DOTALL)
+
+def embedded_states(scripts):
+    """
+    Yields the JSON objects embedded in a page's inline scripts
+    (`__NEXT_DATA__`, `application/json` blocks and `window.X = {...}` assignments).
+
+    Args:
+        scripts (list): (attrs, body) pairs from `PageParser.scripts`.
+    """
+    for attrs, body in scripts:
+        body = body.strip()
+        if not body:
+            continue
+        if 'json' in (attrs.get('type') or '') or attrs.get('id') == '__NEXT_DATA__':
+            candidate = body
+        else:
+            match = STATE_ASSIGNMENT_RE.match(body)
+            if not match:
+                continue
+            candidate = match.group(1)
+        try:
+            yield json.loads(candidate)
+        except ValueError:
+            continue
+
+def find_submission_record(state, submission_hash):
+    """
+    Finds the dict describing `submission_hash` anywhere inside a JSON document.
+
+    Args:
+        state: Decoded JSON (dicts and lists).
+        submission_hash (str): The submission hash to look for.
+
+    Returns:
+        dict: The matching record, or None.
+    """
+    stack = [state]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if node.get('hash') == submission_hash:
+                return node
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return None
+
+def record_value(record, field):
+    """
+    Reads one spec field from an embedded-state record, applying the field's
+    parse rule. Vote counts may live under any of `VOTES_KEYS`.
+
+    Returns:
+        The parsed value, or None.
+    """
+    if field.parse == 'int':
+        keys = VOTES_KEYS if field.name == 'votes' else (field.name,)
+        for key in keys:
+            value = parse_votes(record.get(key))
+            if value is not None:
+                return value
+        return None
+    value = record.get(field.name)
+    if field.parse == 'texts':
+        values = [item.strip() for item in value if isinstance(item, str) and item.strip()] if isinstance(value, list) else []
+        return values or None
+    return value.strip() if isinstance(value, str) and value.strip() else None
+
+def parse_fields_html(html, submission_hash, spec=TITLE_VOTES_SPEC):
+    """
+    Extracts every field of `spec` from a submission page's raw HTML, without
+    running any JavaScript. Embedded state is preferred over rendered nodes, and
+    the `og:title` meta tag is the last resort for a 'title' field.
+
+    Args:
+        html (str): The page HTML.
+        submission_hash (str): Hash of the submission the page describes.
+        spec (ExtractorSpec): Fields to extract.
+
+    Returns:
+        dict: Field name -> value, None where the page had none.
+    """
+    parser = PageParser(spec.selectors)
+    parser.feed(html)
+    parser.close()
+
+    values = {field.name: None for field in spec.fields}
+    for state in embedded_states(parser.scripts):
+        record = find_submission_record(state, submission_hash)
+        if record is None:
+            continue
+        for field in spec.fields:
+            values[field.name] = record_value(record, field)
+        break
+
+    # Fall back to server-rendered nodes
+    rendered = spec.parse({field.name: parser.texts[field.selector] for field in spec.fields})
+    for name, value in values.items():
+        if value is None:
+            values[name] = rendered.values[name]
+    if 'title' in values and values['title'] is None:
+        values['title'] = (parser.meta.get('og:title') or '').strip() or None
+    return values
+
+def parse_submission_html(html, submission_hash):
+    """
+    Extracts the title and votes from a submission page's raw HTML; see `parse_fields_html`.
+
+    Args:
+        html (str): The page HTML.
+        submission_hash (str): Hash of the submission the page describes.
+
+    Returns:
+        tuple: (title or None, votes or None).
+    """
+    values = parse_fields_html(html, submission_hash)
+    return values['title'], values['votes']
+
+def extract_submission_details_http(submission, session, submission_url, timeout=15, limiter=None, spec=TITLE_VOTES_SPEC,
+                                    archive=None):
+    """
+    Extracts the title and votes (or the fields of `spec`) for a submission
+    with a plain HTTP request.
+
+    Args:
+        submission (dict): A dictionary containing submission details.
+        session (requests.Session): Pooled session used for the request.
+        submission_url (str): URL of the submission page.
+        timeout (float): Request timeout in seconds.
+        limiter (AimdLimiter): Adapts the number of concurrent page requests.
+        spec (ExtractorSpec): Fields to extract.
+        archive (SnapshotArchive): Keeps the HTML of pages missing a required field (or of all pages).
+
+    Returns:
+        dict: The submission with every spec field and 'url' set. A field is
+            None when the page did not expose it without JavaScript.
+
+    Raises:
+        HttpStatusError: The page answered with something other than a 200.
+        requests.RequestException: The request itself failed.
+    """
+    submission_hash = submission.get('hash')
+    with span('http.get'), slot(limiter) as held:
+        response = session.get(submission_url, timeout=timeout)
+        held.response(response)
+    if response.status_code != 200:
+        raise HttpStatusError(submission_url, response.status_code, parse_retry_after(response.headers.get('Retry-After')))
+    with span('http.parse'):
+        values = parse_fields_html(response.text, submission_hash, spec)
+    if archive:
+        ok = all(values[field.name] is not None for field in spec.fields if field.required)
+        archive.capture(submission_hash, submission_url, lambda: response.text, ok=ok, source='http')
+
+    submission.update(values)
+    submission['url'] = submission_url
+    return submission
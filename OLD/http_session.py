@@ -0,0 +1,25 @@
+import requests
+from requests.adapters import HTTPAdapter
+from http_cache import CachingSession
+
+def build_session(headers=None, pool_size=10, cache_dir=None, cache_mode=None):
+    """
+    Builds a `requests.Session` with keep-alive connection pooling.
+
+    Args:
+        headers (dict): Headers sent with every request.
+        pool_size (int): Connections kept open per host; match it to the thread count.
+        cache_dir (str): Directory for recorded responses, used with `cache_mode`.
+        cache_mode (str): 'record', 'replay' or 'refresh' to put a `CachingSession`
+            under every GET; None talks to the network directly.
+
+    Returns:
+        requests.Session: A session safe to share between worker threads.
+    """
+    session = CachingSession(cache_dir, cache_mode) if cache_mode else requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
@@ -0,0 +1,446 @@
+import logging
+import queue
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
+from urllib.parse import urlencode
+from tqdm import tqdm
+from concurrency import parse_retry_after, slot
+from errors import HttpStatusError, classify
+from listing_state import fingerprint
+from retry import RetryLane
+from timing import span
+
+API_URL_TEMPLATE = 'https://editfest.filmsupply.com/api/submissions?page={page}'
+PAGE_SIZE_PARAM = 'per_page'   # Laravel-style page size query parameter
+DEFAULT_PAGE_SIZE = 100        # Page size requested from the API; it may cap or ignore it
+CATEGORY_PARAM = 'category'    # Query parameter used to ask the API for a single category
+
+class ListingClient:
+    """
+    Fetches the paginated submissions listing over a pooled session.
+
+    Page 1 is fetched once and its payload reused for both `meta.last_page` and
+    its submissions. A larger page size is requested on every call; `meta` in the
+    first response reflects whatever size the API actually applied, so an API
+    that ignores the parameter costs nothing extra and one that rejects it falls
+    back to the default size. Pages are returned in page order.
+
+    When `categories` is given, a single category is also requested from the API
+    (so only that category's pages are fetched if the endpoint supports it), and
+    every page is filtered as soon as it is decoded, so other categories never
+    reach the caller. The API's filter is only relied on if its page 1 agrees
+    with an unfiltered page 1; otherwise the parameter is dropped and the whole
+    listing is filtered here.
+
+    With a `limiter`, `max_threads` is only the ceiling: the limiter decides how
+    many page requests are in flight and backs off on 429/5xx and timeouts.
+
+    A page that fails is handed to a retry lane rather than dropped: it is
+    fetched again after a backoff on a separate thread and yielded once it
+    arrives, after the pages that were already in flight. Pages that still fail
+    are listed in `failures`.
+
+    With a `state`, `iter_changed` syncs only what changed since the previous
+    run. A page is recorded in the state once the caller has reported every
+    submission taken from it as stored (see `complete`); until then, the next
+    delta sees the page as changed again.
+    """
+
+    def __init__(self, session, url_template=API_URL_TEMPLATE, max_threads=5, page_size=DEFAULT_PAGE_SIZE, categories=None,
+                 limiter=None, retry_policies=None, state=None, executor=None):
+        """
+        Args:
+            session (requests.Session): Pooled session used for every request.
+            url_template (str): Listing URL with a `{page}` field.
+            max_threads (int): Maximum number of concurrent page requests.
+            page_size (int): Page size to request, or None for the API default.
+            categories (list): Category names to keep (case-insensitive); None keeps all.
+            limiter (AimdLimiter): Adapts the number of concurrent page requests.
+            retry_policies (dict): Error class -> RetryPolicy for failed pages;
+                defaults to `retry.DEFAULT_POLICIES`, and {} disables retries.
+            state (ListingState): Fingerprints of earlier runs, for delta syncs.
+            executor (ThreadPoolExecutor): Pool shared with other clients to fetch
+                pages on; by default each listing gets its own `max_threads` threads.
+        """
+        self.session = session
+        self.url_template = url_template
+        self.max_threads = max_threads
+        self.page_size = page_size
+        self.categories = {category.strip().lower() for category in categories} if categories else None
+        self.api_category = categories[0].strip() if categories and len(categories) == 1 else None
+        self.limiter = limiter
+        self.retry_policies = retry_policies
+        self.state = state
+        self.executor = executor
+        self.failures = []
+        self._first_page = None
+        # Pages waiting on submissions to be stored: page number -> (entries, stored entries, pending hashes)
+        self._open_pages = {}
+        self._pages_of = defaultdict(set)
+        self._pages_lock = threading.Lock()
+
+    def page_url(self, page_number):
+        """
+        Builds the URL for one listing page, including the page size parameter.
+        """
+        url = self.url_template.format(page=page_number)
+        params = {}
+        if self.page_size:
+            params[PAGE_SIZE_PARAM] = self.page_size
+        if self.api_category:
+            params[CATEGORY_PARAM] = self.api_category
+        if params:
+            url += ('&' if '?' in url else '?') + urlencode(params)
+        return url
+
+    def wanted(self, submission):
+        """
+        Returns True if the submission belongs to one of the selected categories.
+        """
+        if self.categories is None:
+            return True
+        category = submission.get('category')
+        return isinstance(category, str) and category.strip().lower() in self.categories
+
+    def request_payload(self, page_number):
+        """
+        Fetches one listing page and returns the decoded JSON body.
+
+        Args:
+            page_number (int): The page number to fetch.
+
+        Returns:
+            dict: The response payload.
+
+        Raises:
+            HttpStatusError: The API answered with something other than a 200.
+            requests.RequestException: The request itself failed.
+        """
+        api_url = self.page_url(page_number)
+        with span('listing.fetch_page'), slot(self.limiter) as held:
+            response = self.session.get(api_url, timeout=30)
+            held.response(response)
+            if response.status_code != 200:
+                raise HttpStatusError(api_url, response.status_code, parse_retry_after(response.headers.get('Retry-After')))
+            return response.json()
+
+    def fetch_payload(self, page_number):
+        """
+        Like `request_payload`, but logs failures and returns None instead of raising.
+        """
+        try:
+            return self.request_payload(page_number)
+        except HttpStatusError as e:
+            logging.error("Failed to retrieve page %s: Status code %s", page_number, e.status)
+            return None
+        except Exception as e:
+            logging.error("Exception while fetching page %s: %s", page_number, e)
+            return None
+
+    def fetch_page(self, page_number):
+        """
+        Fetches a single submission page from the API.
+
+        Args:
+            page_number (int): The page number to fetch.
+
+        Returns:
+            list: A list of submission dictionaries in the selected categories.
+
+        Raises:
+            Exception: Whatever `request_payload` raised.
+        """
+        raw = self.fetch_raw_page(page_number)
+        submissions = [submission for submission in raw if self.wanted(submission)]
+        self._track_page(page_number, raw, submissions, submissions)
+        logging.info("Page %s: Retrieved %s submissions.", page_number, len(submissions))
+        return submissions
+
+    def fetch_raw_page(self, page_number):
+        """
+        Fetches a single page before category filtering.
+
+        Returns:
+            list: Every submission on the page.
+        """
+        if page_number == 1 and self._first_page is not None:
+            return self._first_page.get('data', [])
+        return self.request_payload(page_number).get('data', [])
+
+    def page_scope(self):
+        """
+        Key of the pages this client fetches in `state`: the same page number
+        lists different submissions under another URL, page size or category.
+        """
+        return fingerprint({
+            'url': self.url_template,
+            'page_size': self.page_size,
+            'api_category': self.api_category,
+            'categories': sorted(self.categories) if self.categories else None,
+        })
+
+    def complete(self, submission_hash):
+        """
+        Reports a submission handed out by this client as stored (written with
+        its fields, or already done in a resumed run). Once every submission
+        taken from a page is, the page is recorded in `state`. Submissions that
+        fail for good are never reported, so they stay unfinished and the next
+        delta sync picks them up again.
+        """
+        if self.state is None:
+            return
+        self.state.finish(submission_hash)
+        finished = []
+        with self._pages_lock:
+            for page_number in self._pages_of.pop(submission_hash, ()):
+                raw, stored, pending = self._open_pages[page_number]
+                pending.discard(submission_hash)
+                if not pending:
+                    del self._open_pages[page_number]
+                    finished.append((page_number, raw, stored))
+        for page_number, raw, stored in finished:
+            self.state.record_page(self.page_scope(), page_number, raw, stored)
+
+    def _track_page(self, page_number, raw, stored, handed_out):
+        # `stored` entries are fingerprinted once every `handed_out` hash is complete
+        if self.state is None:
+            return
+        pending = {submission['hash'] for submission in handed_out if submission.get('hash')}
+        if not pending:
+            self.state.record_page(self.page_scope(), page_number, raw, stored)
+            return
+        self.state.add_unfinished(handed_out)
+        with self._pages_lock:
+            self._open_pages[page_number] = (raw, stored, pending)
+            for submission_hash in pending:
+                self._pages_of[submission_hash].add(page_number)
+
+    def first_page(self):
+        """
+        Fetches page 1 once and caches its payload.
+
+        Returns:
+            dict: The page 1 payload, or None if it could not be fetched.
+        """
+        if self._first_page is not None:
+            return self._first_page
+        data = self.fetch_payload(1)
+        if data is None and self.page_size:
+            logging.warning("Page size %s was rejected; falling back to the API default.", self.page_size)
+            self.page_size = None
+            data = self.fetch_payload(1)
+        if data is None:
+            return None
+
+        meta = data.get('meta', {})
+        if self.page_size:
+            applied = meta.get('per_page', len(data.get('data', [])))
+            if str(applied) == str(self.page_size):
+                logging.info("API honours %s=%s.", PAGE_SIZE_PARAM, self.page_size)
+            else:
+                logging.info("API applied a page size of %s instead of %s.", applied, self.page_size)
+        if self.api_category:
+            # Compare with an unfiltered page 1 before trusting the API's filter
+            api_category, self.api_category = self.api_category, None
+            probe = self.fetch_payload(1)
+            if probe is not None and self._filters_category(data, probe):
+                self.api_category = api_category
+                logging.info("API filters by %s; fetching only '%s' pages.", CATEGORY_PARAM, api_category)
+            else:
+                logging.info("API ignores %s; filtering '%s' while streaming.", CATEGORY_PARAM, api_category)
+                data = probe
+                if data is None:
+                    return None
+        self._first_page = data
+        return data
+
+    def _filters_category(self, filtered, unfiltered):
+        """
+        Returns True if a page 1 fetched with the category parameter looks like
+        the category's own listing: it is not empty, holds only wanted
+        submissions, is no longer than the full listing, and starts with the
+        wanted submissions of the unfiltered page 1. An empty page proves
+        nothing, since an API that misreads the parameter answers the same way.
+        """
+        entries = filtered.get('data', [])
+        if not entries or not all(self.wanted(submission) for submission in entries):
+            return False
+        filtered_total = filtered.get('meta', {}).get('total')
+        total = unfiltered.get('meta', {}).get('total')
+        if filtered_total is not None and total is not None and filtered_total > total:
+            return False
+        expected = [submission.get('hash') for submission in unfiltered.get('data', []) if self.wanted(submission)]
+        hashes = [submission.get('hash') for submission in entries]
+        length = min(len(expected), len(hashes))
+        return hashes[:length] == expected[:length]
+
+    def last_page(self):
+        """
+        Returns the number of listing pages, or None if page 1 could not be fetched.
+        """
+        data = self.first_page()
+        if data is None:
+            return None
+        return data.get('meta', {}).get('last_page', 1)
+
+    def iter_pages(self, progress=False):
+        """
+        Yields (page number, submissions) for every page, in page order, while
+        later pages are still being fetched. At most twice `max_threads` pages
+        are held ahead of the consumer, so a slow consumer slows the fetching
+        instead of buffering the whole listing. Pages that needed a retry are
+        yielded out of order, as soon as the retry succeeds.
+
+        Args:
+            progress (bool): Show a tqdm progress bar.
+        """
+        total_pages = self.last_page()
+        if total_pages is None:
+            return
+        pages = iter(range(1, total_pages + 1))
+        window = deque()
+        progress_bar = tqdm(total=total_pages, desc="Fetching Submissions", unit="page") if progress else None
+
+        # Failed pages are retried off the main window and come back through `recovered`
+        recovered = queue.Queue()
+        lane = RetryLane('listing', policies=self.retry_policies, workers=1, describe=lambda page: f"page {page}")
+        lane.start(
+            self.fetch_page,
+            on_success=lambda page_number, submissions: recovered.put((page_number, submissions)),
+            on_exit=lambda: recovered.put(None),
+        )
+
+        def drain(block):
+            while True:
+                try:
+                    entry = recovered.get(block=block)
+                except queue.Empty:
+                    return
+                if entry is None:
+                    return
+                if progress_bar:
+                    progress_bar.update(1)
+                yield entry
+
+        try:
+            # A shared executor is left running for the other listings using it
+            shared = nullcontext(self.executor) if self.executor is not None else None
+            with shared or ThreadPoolExecutor(max_workers=self.max_threads) as executor:
+                for page_number in islice(pages, self.max_threads * 2):
+                    window.append((page_number, executor.submit(self.fetch_page, page_number)))
+                while window:
+                    page_number, future = window.popleft()
+                    next_page = next(pages, None)
+                    if next_page is not None:
+                        window.append((next_page, executor.submit(self.fetch_page, next_page)))
+                    try:
+                        submissions = future.result()
+                    except Exception as e:
+                        lane.submit(page_number, e)
+                    else:
+                        if progress_bar:
+                            progress_bar.update(1)
+                        yield page_number, submissions
+                    yield from drain(block=False)
+            lane.close()
+            yield from drain(block=True)
+        finally:
+            lane.stop()
+            self.failures.extend(lane.failures)
+            for _, future in window:
+                future.cancel()
+            if progress_bar:
+                progress_bar.close()
+
+    def iter_changed(self, newest_first=True):
+        """
+        Delta sync: walks the listing from its newest end and yields
+        (page number, submissions) with only the submissions that are new or
+        whose listing entry changed since the previous run. Stops at the first
+        page that holds nothing new, since everything past it was seen already.
+
+        New submissions push older ones onto later pages, so the page after the
+        last new one is fully known even though its number changed; a page that
+        is byte-for-byte as recorded is known without looking further. With an
+        empty `state` every page is walked, as in a full run. Only the selected
+        categories count: a page without any of them tells nothing and the walk
+        goes on.
+
+        The caller reports stored submissions with `complete`; pages are
+        recorded only then. Submissions that earlier runs handed out but never
+        stored are yielded last, as (None, submissions), unless the walk
+        already yielded them.
+
+        Pages are fetched one at a time; a delta normally touches only a few.
+        A page that cannot be fetched ends the walk and is listed in `failures`.
+
+        Args:
+            newest_first (bool): The API lists the newest submissions on page 1;
+                otherwise the walk starts from the last page.
+        """
+        if self.state is None:
+            raise ValueError("iter_changed needs a ListingClient with a state")
+        total_pages = self.last_page()
+        if total_pages is None:
+            return
+        pages = range(1, total_pages + 1) if newest_first else range(total_pages, 0, -1)
+        leftovers = self.state.unfinished()
+        yielded = set()
+        for page_number, submissions in self._walk_changed(pages, total_pages):
+            yielded.update(submission['hash'] for submission in submissions)
+            yield page_number, submissions
+        leftovers = [submission for submission in leftovers
+                     if submission['hash'] not in yielded and self.wanted(submission)]
+        if leftovers:
+            logging.info("Delta sync: retrying %s submissions left unfinished by earlier runs.", len(leftovers))
+            yield None, leftovers
+
+    def _walk_changed(self, pages, total_pages):
+        walked = 0
+        for page_number in pages:
+            try:
+                raw = self.fetch_raw_page(page_number)
+            except Exception as e:
+                logging.error("Delta sync stopped at page %s: %s", page_number, e)
+                self.failures.append({'item': f"page {page_number}", 'kind': classify(e), 'attempts': 1, 'error': str(e)})
+                return
+            walked += 1
+            wanted = [submission for submission in raw if self.wanted(submission)]
+            unchanged = self.state.page_unchanged(self.page_scope(), page_number, raw)
+            submissions = [] if unchanged else self.state.changed(wanted)
+            logging.info("Page %s: %s new or changed submissions of %s.", page_number, len(submissions), len(wanted))
+            self._track_page(page_number, raw, wanted, submissions)
+            if submissions:
+                yield page_number, submissions
+            if unchanged or (wanted and not submissions):
+                logging.info("Delta sync: page %s is fully known; stopping after %s of %s pages.",
+                             page_number, walked, total_pages)
+                return
+
+    def iter_submissions(self, progress=False):
+        """
+        Yields submissions one at a time, in page order.
+
+        Args:
+            progress (bool): Show a tqdm progress bar over pages.
+        """
+        for _, submissions in self.iter_pages(progress=progress):
+            yield from submissions
+
+    def fetch_all(self, progress=False):
+        """
+        Fetches all submissions across every page concurrently.
+
+        Args:
+            progress (bool): Show a tqdm progress bar.
+
+        Returns:
+            list: A combined list of all submissions, in page order.
+        """
+        all_submissions = []
+        for _, submissions in self.iter_pages(progress=progress):
+            all_submissions.extend(submissions)
+        return all_submissions
@@ -0,0 +1,204 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+# Listing fields that change between runs without the submission itself changing
+VOLATILE_FIELDS = ('votes', 'votes_count', 'vote_count', 'rank')
+
+def fingerprint(value):
+    """
+    Stable content fingerprint of a JSON-serialisable value.
+    """
+    encoded = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+def submission_fingerprint(submission, volatile=VOLATILE_FIELDS):
+    """
+    Fingerprint of a listing entry, ignoring `volatile` fields.
+    """
+    return fingerprint({key: value for key, value in submission.items() if key not in volatile})
+
+class ListingState:
+    """
+    What the previous listing runs saw, kept in a local SQLite file: the
+    fingerprint of every submission (by hash) and of every listing page.
+
+    A delta sync compares freshly fetched pages against it to tell new and
+    changed submissions from known ones, and stops at the first page that holds
+    nothing new (see `ListingClient.iter_changed`). The client records a page,
+    full or delta run, only once every submission taken from it has been
+    stored, and every submission handed out is kept as unfinished until it
+    is stored, so a crashed run or a failed submission is picked up again by
+    the next delta however far back its page lies.
+
+    Pages are keyed by a `scope` as well as their number: the same page number
+    holds different submissions under another page size, category or listing
+    URL (see `ListingClient.page_scope`).
+    """
+
+    def __init__(self, path, volatile=VOLATILE_FIELDS):
+        """
+        Args:
+            path (str): SQLite database file; created if missing.
+            volatile (tuple): Listing fields left out of submission fingerprints.
+        """
+        self.path = path
+        self.volatile = volatile
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS submissions (
+                hash TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL
+            )
+        ''')
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(pages)')]
+        if columns and 'scope' not in columns:
+            # Pages recorded before scopes existed cannot be attributed to one; a
+            # delta then walks until it reaches known submissions instead
+            self._conn.execute('DROP TABLE pages')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS pages (
+                scope TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                fingerprint TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (scope, page)
+            )
+        ''')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS unfinished (
+                hash TEXT PRIMARY KEY,
+                entry TEXT NOT NULL,
+                added_at REAL NOT NULL
+            )
+        ''')
+
+    def add_unfinished(self, submissions):
+        """
+        Remembers listing entries handed out for extraction until `finish` is called for them.
+        """
+        now = time.time()
+        rows = [(submission['hash'], json.dumps(submission, ensure_ascii=False, default=str), now)
+                for submission in submissions if submission.get('hash')]
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO unfinished (hash, entry, added_at) VALUES (?, ?, ?)', rows)
+
+    def finish(self, submission_hash):
+        """
+        Marks an unfinished entry as stored and records its fingerprint.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT entry FROM unfinished WHERE hash = ?', (submission_hash,)).fetchone()
+            if row is None:
+                return
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.execute('''
+                    INSERT INTO submissions (hash, fingerprint, first_seen, last_seen) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(hash) DO UPDATE SET fingerprint = excluded.fingerprint, last_seen = excluded.last_seen
+                ''', (submission_hash, submission_fingerprint(json.loads(row[0]), self.volatile), now, now))
+                self._conn.execute('DELETE FROM unfinished WHERE hash = ?', (submission_hash,))
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    def unfinished(self):
+        """
+        Returns:
+            list: Listing entries handed out by earlier runs and never stored, oldest first.
+        """
+        with self._lock:
+            rows = self._conn.execute('SELECT entry FROM unfinished ORDER BY added_at, hash').fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def page_fingerprint(self, submissions):
+        """
+        Fingerprint of a whole page: its submissions' fingerprints in order.
+        """
+        return fingerprint([submission_fingerprint(submission, self.volatile) for submission in submissions])
+
+    def page_unchanged(self, scope, page_number, submissions):
+        """
+        Returns True if the page holds exactly what it held when last recorded.
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT fingerprint FROM pages WHERE scope = ? AND page = ?',
+                                     (scope, page_number)).fetchone()
+        return row is not None and row[0] == self.page_fingerprint(submissions)
+
+    def changed(self, submissions):
+        """
+        Filters a page down to submissions that are new or whose listing entry changed.
+
+        Args:
+            submissions (list): Listing entries with a 'hash'.
+
+        Returns:
+            list: The new or changed entries, in page order.
+        """
+        hashes = [submission.get('hash') for submission in submissions if submission.get('hash')]
+        if not hashes:
+            return [submission for submission in submissions if submission.get('hash')]
+        with self._lock:
+            known = dict(self._conn.execute(
+                f"SELECT hash, fingerprint FROM submissions WHERE hash IN ({', '.join('?' * len(hashes))})",
+                hashes,
+            ).fetchall())
+        return [
+            submission for submission in submissions
+            if submission.get('hash') and known.get(submission['hash']) != submission_fingerprint(submission, self.volatile)
+        ]
+
+    def record_page(self, scope, page_number, page, stored=None):
+        """
+        Stores the fingerprint of a fetched page and of the submissions from it
+        that were stored.
+
+        Args:
+            scope (str): From `ListingClient.page_scope`.
+            page_number (int): The page number.
+            page (list): Every entry on the page, as fetched.
+            stored (list): The entries that were stored; defaults to the whole
+                page. Entries left out (other categories) stay unknown.
+        """
+        now = time.time()
+        rows = [
+            (submission['hash'], submission_fingerprint(submission, self.volatile), now, now)
+            for submission in (page if stored is None else stored) if submission.get('hash')
+        ]
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.executemany('''
+                    INSERT INTO submissions (hash, fingerprint, first_seen, last_seen) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(hash) DO UPDATE SET fingerprint = excluded.fingerprint, last_seen = excluded.last_seen
+                ''', rows)
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO pages (scope, page, fingerprint, updated_at) VALUES (?, ?, ?, ?)',
+                    (scope, page_number, self.page_fingerprint(page), now))
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    def known_count(self):
+        """
+        Returns:
+            int: The number of submissions seen by earlier runs.
+        """
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM submissions').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
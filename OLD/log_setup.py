@@ -0,0 +1,93 @@
+import atexit
+import json
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    Formats each record as one compact JSON object per line. Structured values
+    passed as `extra={'fields': {...}}` become top-level keys.
+    """
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'thread': record.threadName,
+            'msg': record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class ConsoleFormatter(logging.Formatter):
+    """
+    Human-readable console lines, with structured fields appended as key=value.
+    """
+
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            line += ' ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    A QueueHandler that hands the record over untouched. The stock handler
+    formats the message on the calling thread; here all formatting happens on
+    the listener thread, so worker threads only pay for an enqueue.
+    """
+
+    def prepare(self, record):
+        return record
+
+def setup_queue_logging(log_path, level=logging.INFO, console_level=logging.INFO,
+                        max_bytes=5 * 1024 * 1024, backup_count=2):
+    """
+    Routes all logging through a queue to a background thread that writes
+    JSON lines to a rotating file and human-readable lines to the console.
+
+    Args:
+        log_path (str): The JSON-lines log file.
+        level (int): Minimum level recorded at all; lower calls return immediately.
+        console_level (int): Minimum level echoed to the console.
+        max_bytes (int): Rotate the file once it reaches this size.
+        backup_count (int): Number of rotated files kept.
+
+    Returns:
+        QueueListener: The running listener; it is stopped (and the queue
+            drained) automatically at exit.
+    """
+    log_queue = queue.SimpleQueue()
+
+    file_handler = RotatingFileHandler(log_path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+    file_handler.setFormatter(JsonLinesFormatter())
+    console = logging.StreamHandler()
+    console.setLevel(console_level)
+    console.setFormatter(ConsoleFormatter('%(levelname)s - %(message)s'))
+
+    logger = logging.getLogger()
+    logger.setLevel(level)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(DeferredQueueHandler(log_queue))
+
+    listener = QueueListener(log_queue, file_handler, console, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+def log_summary(event, **fields):
+    """
+    Logs one structured INFO record, e.g. a per-submission summary.
+
+    Args:
+        event (str): Short message, e.g. 'submission'.
+        **fields: Values written as top-level JSON keys.
+    """
+    logging.info(event, extra={'fields': fields})
@@ -0,0 +1,218 @@
+import base64
+import json
+import logging
+import threading
+import time
+from selenium.common.exceptions import TimeoutException
+from extractor_spec import ExtractionResult
+from http_extract import find_submission_record, parse_fields_html, record_value
+from tab_pool import NAVIGATED_SCRIPT, NAVIGATION_MARKER_SCRIPT
+
+class NetworkCapture:
+    """
+    Reads a submission's fields from the responses the page itself fetches,
+    instead of waiting for hashed CSS class names to render.
+
+    Browsers are launched with Chrome's performance log, which carries the
+    DevTools Network events, and with the 'none' page-load strategy, so
+    `driver.get` returns as soon as navigation starts. `wait` then watches the
+    events for JSON responses (and the document itself, for embedded state),
+    pulls finished bodies with `Network.getResponseBody`, and returns as soon
+    as one of them holds a record with the submission's hash and every
+    required field. If none does within `timeout`, the caller falls back to the
+    DOM.
+
+    With the 'none' strategy the previous page is still showing when
+    `driver.get` returns, so pages are opened with `navigate`, which marks the
+    old document, and anything that reads the DOM first calls
+    `wait_for_document` until the new one has replaced it, as the replaced
+    load strategy would have.
+
+    A site that never exposes the data this way would pay the timeout on
+    every page, so capture switches itself off after `max_misses` misses in a
+    row without a single hit.
+    """
+
+    def __init__(self, url_patterns=None, timeout=10.0, poll_interval=0.05, max_misses=10, load_timeout=30.0):
+        """
+        Args:
+            url_patterns (list): Substrings a response URL must contain to be
+                inspected, e.g. ['/api/']; None inspects every JSON response.
+            timeout (float): Seconds to wait for a matching response per page.
+            poll_interval (float): Seconds between reads of the event log.
+            max_misses (int): Consecutive misses, before the first hit, after
+                which capture is disabled.
+            load_timeout (float): Seconds `wait_for_document` waits for the new page.
+        """
+        self.url_patterns = url_patterns
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.max_misses = max_misses
+        self.load_timeout = load_timeout
+        # Whether the strategy replaced by 'none' was 'eager'; see `wait_for_document`
+        self.eager = False
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self._misses_in_row = 0
+        self._lock = threading.Lock()
+
+    def configure(self, options):
+        """
+        Turns on the performance log and the 'none' load strategy before launch.
+
+        Args:
+            options (Options): Selenium Chrome options.
+        """
+        options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        self.eager = options.page_load_strategy == 'eager'
+        options.page_load_strategy = 'none'
+
+    def navigate(self, driver, url):
+        """
+        Starts loading `url` and returns at once, leaving the current document
+        marked so `wait_for_document` can tell the new one from it.
+        """
+        driver.execute_script(NAVIGATION_MARKER_SCRIPT)
+        driver.get(url)
+
+    def wait_for_document(self, driver, url):
+        """
+        Waits until the page opened with `navigate` has replaced the previous
+        one and is interactive ('eager') or loaded, as `driver.get` would have
+        under the replaced load strategy.
+
+        Raises:
+            TimeoutException: The new document did not arrive within `load_timeout`.
+        """
+        deadline = time.monotonic() + self.load_timeout
+        while not driver.execute_script(NAVIGATED_SCRIPT, self.eager):
+            if time.monotonic() >= deadline:
+                raise TimeoutException(f"Timed out loading {url}")
+            time.sleep(self.poll_interval)
+
+    def drain(self, driver):
+        """
+        Discards buffered events, so `wait` only sees the next navigation.
+        """
+        try:
+            driver.get_log('performance')
+        except Exception as e:
+            logging.debug("Could not drain the performance log: %s", e)
+
+    def wait(self, driver, submission_hash, spec, started=None):
+        """
+        Waits for a response holding every required field of `spec` for the submission.
+
+        Args:
+            driver (WebDriver): Driver that has just started navigating to the page.
+            submission_hash (str): Hash of the submission the page describes.
+            spec (ExtractorSpec): Fields to read; matched by name in the response record.
+            started (float): `time.monotonic()` taken just before `driver.get`.
+
+        Returns:
+            ExtractionResult: The fields, or None if no response held them in time.
+        """
+        if not self.enabled:
+            return None
+        deadline = (started if started is not None else time.monotonic()) + self.timeout
+        candidates = {}   # requestId -> 'json' or 'document', for responses worth reading
+        inspected = set()
+        while True:
+            finished = []
+            for entry in driver.get_log('performance'):
+                try:
+                    message = json.loads(entry['message'])['message']
+                except (KeyError, TypeError, ValueError):
+                    continue
+                method = message.get('method')
+                params = message.get('params', {})
+                if method == 'Network.responseReceived':
+                    kind = self._kind(params)
+                    if kind:
+                        candidates[params.get('requestId')] = kind
+                elif method == 'Network.loadingFinished':
+                    finished.append(params.get('requestId'))
+
+            for request_id in finished:
+                kind = candidates.get(request_id)
+                if kind is None or request_id in inspected:
+                    continue
+                inspected.add(request_id)
+                result = self._read(driver, request_id, kind, submission_hash, spec)
+                if result is not None and result.ok:
+                    self._record(hit=True)
+                    return result
+
+            if time.monotonic() >= deadline:
+                self._record(hit=False)
+                return None
+            time.sleep(self.poll_interval)
+
+    def log_summary(self):
+        """
+        Logs how many pages were resolved from network responses.
+        """
+        with self._lock:
+            hits, misses, enabled = self.hits, self.misses, self.enabled
+        if hits or misses:
+            logging.info("Network capture: %s pages from responses, %s fell back to the DOM%s",
+                         hits, misses, '' if enabled else ' (disabled after repeated misses)')
+
+    def _kind(self, params):
+        response = params.get('response', {})
+        url = response.get('url', '')
+        if params.get('type') == 'Document':
+            return 'document'
+        if 'json' not in (response.get('mimeType') or ''):
+            return None
+        if self.url_patterns and not any(pattern in url for pattern in self.url_patterns):
+            return None
+        return 'json'
+
+    def _read(self, driver, request_id, kind, submission_hash, spec):
+        try:
+            body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+        except Exception as e:
+            # Evicted from the buffer or from a previous page
+            logging.debug("No body for request %s: %s", request_id, e)
+            return None
+        text = body.get('body', '')
+        if body.get('base64Encoded'):
+            text = base64.b64decode(text).decode('utf-8', errors='replace')
+
+        if kind == 'document':
+            values = parse_fields_html(text, submission_hash, spec)
+        else:
+            try:
+                record = find_submission_record(json.loads(text), submission_hash)
+            except ValueError:
+                return None
+            if record is None:
+                return None
+            values = {field.name: record_value(record, field) for field in spec.fields}
+        errors = {name: 'missing' for name, value in values.items() if value is None}
+        required = [field.name for field in spec.fields if field.required]
+        return ExtractionResult(values, errors, {'source': kind}, required)
+
+    def _record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self._misses_in_row = 0
+                return
+            self.misses += 1
+            self._misses_in_row += 1
+            if self.enabled and not self.hits and self._misses_in_row >= self.max_misses:
+                self.enabled = False
+                logging.warning("Network capture found nothing on %s pages in a row; "
+                                "reading pages from the DOM from now on.", self._misses_in_row)
+
+def page_source(driver, url, capture=None):
+    """
+    The HTML of the page at `url`; with a `capture`, which leaves `driver.get`
+    returning early, once that page has replaced the previous one.
+    """
+    if capture:
+        capture.wait_for_document(driver, url)
+    return driver.page_source
@@ -0,0 +1,147 @@
+import logging
+import queue
+import threading
+from tqdm import tqdm
+
+# Marks the end of a stream on the work and result queues
+_DONE = object()
+
+def run_pipeline(source, extract, write, workers=3, queue_size=None, on_error=None, progress_desc=None, retry=None):
+    """
+    Streams items from `source` through `extract` into `write` with bounded
+    queues between the stages, so listing, extraction and output overlap and
+    memory stays flat however many items there are.
+
+        source --(producer thread)--> work queue --(workers)--> result queue --> write
+
+    A full work queue pauses the producer and a full result queue pauses the
+    workers (backpressure).
+
+    If `source` raises, the items it produced so far are still extracted and
+    written, and then its exception is raised here, so a broken listing never
+    passes for a complete run.
+
+    With a `retry` lane, a failed item is handed to the lane instead of going
+    straight to `on_error`; the lane retries it on its own threads after a
+    backoff while the workers carry on, and its results are written like any
+    other. `on_error` then only sees items that failed for good.
+
+    Args:
+        source (iterable): Yields the items to process; consumed on its own thread.
+        extract (callable): Item -> result; runs on `workers` threads.
+        write (callable): Result -> None; runs on the calling thread as results arrive.
+        workers (int): Number of extraction threads.
+        queue_size (int): Capacity of each queue. Defaults to twice `workers`.
+        on_error (callable): (item, exception) -> result to write when `extract`
+            raises; the item is dropped if omitted or if it returns None.
+        progress_desc (str): Show a tqdm progress bar with this description.
+        retry (RetryLane): Lane that retries failed items; see `retry.RetryLane`.
+
+    Returns:
+        int: The number of results written.
+
+    Raises:
+        Exception: Whatever `source` raised, once the items before it are written.
+    """
+    queue_size = queue_size or workers * 2
+    work_queue = queue.Queue(maxsize=queue_size)
+    result_queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    finished_lock = threading.Lock()
+    finished_main = 0
+    source_error = None
+
+    def put(target, item):
+        # Give up if the consumer side has stopped, instead of blocking forever
+        while not stop.is_set():
+            try:
+                target.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        nonlocal source_error
+        try:
+            for item in source:
+                if not put(work_queue, item):
+                    return
+        except Exception as e:
+            logging.error("Error while producing work items: %s", e)
+            source_error = e
+        finally:
+            for _ in range(workers):
+                put(work_queue, _DONE)
+
+    def work():
+        nonlocal finished_main
+        try:
+            while True:
+                item = work_queue.get()
+                if item is _DONE:
+                    return
+                try:
+                    result = extract(item)
+                except Exception as e:
+                    if retry is not None:
+                        retry.submit(item, e)
+                        continue
+                    logging.error("Exception occurred while extracting %.80r: %s", item, e)
+                    result = on_error(item, e) if on_error else None
+                if result is not None and not put(result_queue, result):
+                    return
+        finally:
+            put(result_queue, _DONE)
+            if retry is not None:
+                with finished_lock:
+                    finished_main += 1
+                    if finished_main == workers:
+                        # The main lane is drained; the retry lane exits once it is too
+                        retry.close()
+
+    def write_failure(item, error):
+        result = on_error(item, error) if on_error else None
+        if result is not None:
+            put(result_queue, result)
+
+    total_workers = workers
+    if retry is not None:
+        total_workers += retry.workers
+        retry.start(
+            extract,
+            on_success=lambda item, result: result is not None and put(result_queue, result),
+            on_failure=write_failure,
+            on_exit=lambda: put(result_queue, _DONE),
+        )
+
+    threads = [threading.Thread(target=produce, name="pipeline-producer", daemon=True)]
+    threads += [threading.Thread(target=work, name=f"pipeline-worker-{i}", daemon=True) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    written = 0
+    finished_workers = 0
+    progress = tqdm(desc=progress_desc, unit="item") if progress_desc else None
+    try:
+        while finished_workers < total_workers:
+            result = result_queue.get()
+            if result is _DONE:
+                finished_workers += 1
+                continue
+            write(result)
+            written += 1
+            if progress is not None:
+                progress.update(1)
+    finally:
+        stop.set()
+        if retry is not None:
+            retry.stop()
+            retry.join(timeout=5)
+        if progress is not None:
+            progress.close()
+        for thread in threads:
+            thread.join(timeout=5)
+    if source_error is not None:
+        raise source_error
+    return written
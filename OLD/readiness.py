@@ -0,0 +1,192 @@
+import logging
+import threading
+import time
+from collections import deque
+
+# Selector -> maximum seconds to wait for it to hold non-empty text
+DEFAULT_SELECTORS = {
+    'div.css-tumkbo': 15,    # Votes
+    'div.css-1w984ju': 15,   # Title
+}
+
+# Returns, for each selector, whether any matching node has non-empty text
+READY_SCRIPT = '''
+    return arguments[0].map(function (selector) {
+        return Array.from(document.querySelectorAll(selector))
+            .some(function (el) { return el.textContent.trim().length > 0; });
+    });
+'''
+
+def text_present(selector):
+    """
+    Expected condition for `WebDriverWait` that holds once a node matching
+    `selector` has non-empty text.
+
+    Args:
+        selector (str): CSS selector to check.
+
+    Returns:
+        callable: A condition taking the driver and returning a bool.
+    """
+    def condition(driver):
+        return driver.execute_script(READY_SCRIPT, [selector])[0]
+    return condition
+
+def percentile(samples, fraction):
+    """
+    Nearest-rank percentile of a sequence of numbers.
+
+    Args:
+        samples (list): The observed values.
+        fraction (float): Percentile as a fraction, e.g. 0.95.
+
+    Returns:
+        float: The percentile, or None if there are no samples.
+    """
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+class ReadinessEngine:
+    """
+    Waits until a page's target nodes hold text instead of sleeping a fixed time.
+
+    Every selector has its own timeout. Observed render latencies are recorded and,
+    once enough samples exist, each timeout shrinks to a multiple of its p95 latency
+    (never exceeding the configured ceiling). Timed-out waits are recorded at the
+    timeout value, so a slowing site pushes the timeouts back up.
+    """
+
+    def __init__(self, selectors=None, poll_interval=0.1, adaptive=True,
+                 min_timeout=2.0, headroom=3.0, min_samples=20, history=200):
+        """
+        Args:
+            selectors (dict): Selector -> timeout ceiling in seconds.
+            poll_interval (float): Seconds between readiness checks.
+            adaptive (bool): Derive timeouts from observed latencies.
+            min_timeout (float): Lower bound for an adaptive timeout.
+            headroom (float): Adaptive timeout as a multiple of the p95 latency.
+            min_samples (int): Samples needed before timeouts start adapting.
+            history (int): Number of recent latencies kept per selector.
+        """
+        self.selectors = dict(selectors or DEFAULT_SELECTORS)
+        self.poll_interval = poll_interval
+        self.adaptive = adaptive
+        self.min_timeout = min_timeout
+        self.headroom = headroom
+        self.min_samples = min_samples
+        self._latencies = {selector: deque(maxlen=history) for selector in self.selectors}
+        self._timeouts = {selector: 0 for selector in self.selectors}
+        self._lock = threading.Lock()
+
+    def timeout_for(self, selector):
+        """
+        Returns the current timeout for a selector, in seconds.
+        """
+        ceiling = self.selectors[selector]
+        if not self.adaptive:
+            return ceiling
+        with self._lock:
+            samples = list(self._latencies[selector])
+        if len(samples) < self.min_samples:
+            return ceiling
+        return min(ceiling, max(self.min_timeout, percentile(samples, 0.95) * self.headroom))
+
+    def wait(self, driver, started=None):
+        """
+        Blocks until every selector holds non-empty text or runs out of time.
+
+        Args:
+            driver (WebDriver): Driver that has navigated to the page.
+            started (float): `time.monotonic()` taken just before `driver.get`, so
+                latencies cover the whole render. Defaults to now.
+
+        Returns:
+            dict: Selector -> seconds until ready, or None if it timed out.
+        """
+        started = started if started is not None else time.monotonic()
+        timeouts = self.timeouts()
+        pending = list(self.selectors)
+        latencies = {}
+
+        while pending:
+            ready = driver.execute_script(READY_SCRIPT, pending)
+            pending = self.observe(pending, ready, time.monotonic() - started, timeouts, latencies)
+            if pending:
+                time.sleep(self.poll_interval)
+        return latencies
+
+    def timeouts(self):
+        """
+        Returns the current timeout of every selector, fixed for one page's wait.
+        """
+        return {selector: self.timeout_for(selector) for selector in self.selectors}
+
+    def observe(self, pending, ready, elapsed, timeouts, latencies):
+        """
+        Records one readiness check of a page, for callers that run their own
+        polling loop (see `devtools_engine.wait_ready`).
+
+        Args:
+            pending (list): Selectors checked.
+            ready (list): `READY_SCRIPT` result for `pending`.
+            elapsed (float): Seconds since navigation started.
+            timeouts (dict): From `timeouts()`, taken when the wait began.
+            latencies (dict): Updated with selector -> seconds until ready, or None on timeout.
+
+        Returns:
+            list: The selectors still pending.
+        """
+        still_pending = []
+        for selector, is_ready in zip(pending, ready):
+            if is_ready:
+                latencies[selector] = elapsed
+                self._record(selector, elapsed)
+            elif elapsed >= timeouts[selector]:
+                latencies[selector] = None
+                self._record(selector, timeouts[selector], timed_out=True)
+                logging.warning("Timed out after %.1fs waiting for '%s'", elapsed, selector)
+            else:
+                still_pending.append(selector)
+        return still_pending
+
+    def summary(self):
+        """
+        Summarises recorded latencies per selector.
+
+        Returns:
+            dict: Selector -> dict with samples, p50, p95, timeouts and current timeout.
+        """
+        report = {}
+        for selector in self.selectors:
+            with self._lock:
+                samples = list(self._latencies[selector])
+                timeouts = self._timeouts[selector]
+            report[selector] = {
+                'samples': len(samples),
+                'p50': percentile(samples, 0.5),
+                'p95': percentile(samples, 0.95),
+                'timeouts': timeouts,
+                'timeout': self.timeout_for(selector),
+            }
+        return report
+
+    def log_summary(self):
+        """
+        Logs one line per selector with its render latencies and current timeout.
+        """
+        for selector, stats in self.summary().items():
+            if not stats['samples']:
+                continue
+            logging.info(
+                "Readiness '%s': %s samples, p50 %.2fs, p95 %.2fs, %s timeouts, timeout now %.1fs",
+                selector, stats['samples'], stats['p50'], stats['p95'], stats['timeouts'], stats['timeout'],
+            )
+
+    def _record(self, selector, latency, timed_out=False):
+        with self._lock:
+            self._latencies[selector].append(latency)
+            if timed_out:
+                self._timeouts[selector] += 1
@@ -0,0 +1,210 @@
+import logging
+import threading
+from collections import deque
+from readiness import percentile
+
+# URL patterns (Network.setBlockedURLs wildcards) per resource class
+RESOURCE_PATTERNS = {
+    'image': ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico', '*.bmp'],
+    'media': ['*.mp4', '*.webm', '*.m3u8', '*.m4s', '*.mov', '*.mp3', '*.ogg', '*.vtt'],
+    'font': ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot'],
+}
+
+# Video players, thumbnails CDNs and trackers a submission page pulls in but we never read
+DEFAULT_BLOCKED_DOMAINS = [
+    'vimeo.com', 'vimeocdn.com', 'youtube.com', 'ytimg.com', 'googlevideo.com',
+    'wistia.com', 'wistia.net', 'jwplayer.com', 'jwpcdn.com',
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'facebook.net',
+    'facebook.com', 'hotjar.com', 'segment.io', 'segment.com', 'intercom.io', 'sentry.io',
+    'fonts.googleapis.com', 'fonts.gstatic.com', 'typekit.net', 'use.typekit.net',
+]
+
+# Bytes fetched for the document and every resource it loaded, and the DOMContentLoaded time
+PAGE_COST_SCRIPT = '''
+    var navigation = performance.getEntriesByType('navigation')[0] || {};
+    var resources = performance.getEntriesByType('resource');
+    var bytes = navigation.transferSize || 0;
+    resources.forEach(function (entry) { bytes += entry.transferSize || 0; });
+    return {
+        bytes: bytes,
+        requests: resources.length + 1,
+        dom_ms: navigation.domContentLoadedEventEnd || null
+    };
+'''
+
+class ResourcePolicy:
+    """
+    Keeps browsers from downloading what extraction never reads.
+
+    `configure` switches Chrome options to the eager page-load strategy (so
+    `driver.get` returns at DOMContentLoaded instead of after every image and
+    player has loaded) and stops image decoding; `apply` blocks images, media,
+    fonts and the listed third-party domains through DevTools on a freshly
+    launched browser. Blocking is by URL pattern, since `Network.setBlockedURLs`
+    is the only blocking DevTools offers without handling every request.
+
+    `start_page`/`finish_page` measure each page load: bytes transferred and
+    requests (from the Resource Timing API; cross-origin entries without
+    Timing-Allow-Origin count as 0 bytes), render time and main-thread CPU
+    time (from DevTools performance metrics). `log_summary` reports them.
+    """
+
+    def __init__(self, block_types=('image', 'media', 'font'), block_domains=None, eager=True, measure=True,
+                 history=1000):
+        """
+        Args:
+            block_types (iterable): Keys of `RESOURCE_PATTERNS` to block.
+            block_domains (list): Third-party domains to block, including
+                subdomains; defaults to `DEFAULT_BLOCKED_DOMAINS`, [] blocks none.
+            eager (bool): Use the eager page-load strategy.
+            measure (bool): Collect per-page bandwidth and CPU figures.
+            history (int): Number of recent pages kept for the summary.
+        """
+        unknown = set(block_types) - set(RESOURCE_PATTERNS)
+        if unknown:
+            raise ValueError(f"Unknown resource types: {', '.join(sorted(unknown))}")
+        self.block_types = tuple(block_types)
+        self.block_domains = DEFAULT_BLOCKED_DOMAINS if block_domains is None else list(block_domains)
+        self.eager = eager
+        self.measure = measure
+        self._pages = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def blocked_urls(self):
+        """
+        Returns:
+            list: URL patterns passed to `Network.setBlockedURLs`.
+        """
+        patterns = []
+        for resource_type in self.block_types:
+            patterns.extend(RESOURCE_PATTERNS[resource_type])
+            # Query strings and cache busters follow the extension on most CDNs
+            patterns.extend(pattern + '?*' for pattern in RESOURCE_PATTERNS[resource_type])
+        for domain in self.block_domains:
+            patterns.extend([f'*://{domain}/*', f'*://*.{domain}/*'])
+        return patterns
+
+    def configure(self, options):
+        """
+        Applies the load strategy and content settings to Chrome options before launch.
+
+        Args:
+            options (Options): Selenium Chrome options.
+        """
+        if self.eager:
+            options.page_load_strategy = 'eager'
+        if 'image' in self.block_types:
+            options.add_argument("--blink-settings=imagesEnabled=false")
+        if 'media' in self.block_types:
+            options.add_argument("--autoplay-policy=user-gesture-required")
+
+    def apply(self, driver):
+        """
+        Enables request blocking (and the metrics used by `finish_page`) on a
+        freshly launched browser. The settings stay in force across navigations.
+
+        Args:
+            driver (WebDriver): The browser to configure.
+        """
+        for method, params in self.cdp_commands():
+            driver.execute_cdp_cmd(method, params)
+
+    def cdp_commands(self):
+        """
+        DevTools commands that put the policy in force on a page.
+
+        Returns:
+            list: (method, params) pairs, in order.
+        """
+        commands = []
+        patterns = self.blocked_urls()
+        if patterns:
+            commands.append(('Network.enable', {}))
+            commands.append(('Network.setBlockedURLs', {'urls': patterns}))
+        if self.measure:
+            commands.append(('Performance.enable', {}))
+        return commands
+
+    def start_page(self, driver):
+        """
+        Takes the CPU baseline before `driver.get`.
+
+        Returns:
+            float: Cumulative main-thread task seconds, or None when not measuring.
+        """
+        if not self.measure:
+            return None
+        return self._task_seconds(driver)
+
+    def finish_page(self, driver, baseline, render_seconds=None):
+        """
+        Measures the page just loaded and adds it to the summary.
+
+        Args:
+            driver (WebDriver): The browser, still on the page.
+            baseline (float): The value returned by `start_page`.
+            render_seconds (float): Time from `driver.get` until the page was ready.
+
+        Returns:
+            dict: bytes, requests, render_ms and cpu_ms (missing figures are None),
+                or None when not measuring.
+        """
+        if not self.measure:
+            return None
+        try:
+            cost = driver.execute_script(PAGE_COST_SCRIPT)
+            task_seconds = self._task_seconds(driver)
+        except Exception as e:
+            logging.debug("Could not measure page cost: %s", e)
+            return None
+        render_ms = round(render_seconds * 1000) if render_seconds is not None else cost.get('dom_ms')
+        cpu_ms = None
+        if baseline is not None and task_seconds is not None:
+            cpu_ms = round(max(0.0, task_seconds - baseline) * 1000)
+        page = {'bytes': cost.get('bytes'), 'requests': cost.get('requests'), 'render_ms': render_ms, 'cpu_ms': cpu_ms}
+        with self._lock:
+            self._pages.append(page)
+        return page
+
+    def summary(self):
+        """
+        Summarises the measured pages.
+
+        Returns:
+            dict: Figure -> dict with samples, total, p50 and p95.
+        """
+        with self._lock:
+            pages = list(self._pages)
+        report = {}
+        for figure in ('bytes', 'requests', 'render_ms', 'cpu_ms'):
+            samples = [page[figure] for page in pages if page[figure] is not None]
+            report[figure] = {
+                'samples': len(samples),
+                'total': sum(samples),
+                'p50': percentile(samples, 0.5),
+                'p95': percentile(samples, 0.95),
+            }
+        return report
+
+    def log_summary(self):
+        """
+        Logs one line per figure with its per-page p50/p95.
+        """
+        for figure, stats in self.summary().items():
+            if not stats['samples']:
+                continue
+            if figure == 'bytes':
+                logging.info(
+                    "Page bytes: %s pages, p50 %.0f KB, p95 %.0f KB, %.1f MB in total",
+                    stats['samples'], stats['p50'] / 1024, stats['p95'] / 1024, stats['total'] / (1024 * 1024),
+                )
+            else:
+                logging.info("Page %s: %s pages, p50 %s, p95 %s", figure, stats['samples'], stats['p50'], stats['p95'])
+
+    @staticmethod
+    def _task_seconds(driver):
+        metrics = driver.execute_cdp_cmd('Performance.getMetrics', {}).get('metrics', [])
+        for metric in metrics:
+            if metric.get('name') == 'TaskDuration':
+                return metric.get('value')
+        return None
@@ -0,0 +1,431 @@
+import argparse
+import csv
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlparse
+
+RESULTS_DB_PATH = 'results.sqlite3'
+
+# Movement orders of `ResultsStore.diff` -> run_standings column
+DIFF_ORDERS = {'votes': 'gained', 'rank': 'climbed'}
+
+def parse_count(value):
+    """
+    A vote count from a CSV cell or a submission dict; None if there is none.
+    """
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+class ResultsStore:
+    """
+    Current standings and per-run vote history in SQLite, indexed for
+    leaderboard queries.
+
+    `standings` holds the latest known row of every submission, with a
+    (category, votes DESC) index and an overall (votes DESC) index, so top-k
+    and rank lookups read a few index pages instead of sorting the results.
+    SQLite keeps both indexes sorted as rows are upserted, so a new vote count
+    costs one B-tree update however large the store grows.
+
+    When a run ends (`end_run`), the standings are snapshotted into
+    `run_standings` with every submission's rank in its category and its
+    votes and rank at the previous run, indexed by how far it moved, so
+    `diff` between consecutive runs reads its top movers straight off an
+    index. Runs that never ended (a crashed crawl) have no snapshot and are
+    left out of diffs.
+
+    Writes are buffered and committed in batches, every `batch_size` rows or
+    `flush_interval` seconds, whichever comes first.
+    """
+
+    def __init__(self, path=RESULTS_DB_PATH, batch_size=500, flush_interval=2.0):
+        """
+        Args:
+            path (str): SQLite database file; created if missing.
+            batch_size (int): Buffered rows that trigger a commit.
+            flush_interval (float): Seconds after which buffered rows are committed anyway.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY,
+                label TEXT,
+                started_at REAL NOT NULL,
+                ended_at REAL,
+                observed INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS standings (
+                hash TEXT PRIMARY KEY,
+                category TEXT,
+                title TEXT,
+                name TEXT,
+                url TEXT,
+                votes INTEGER,
+                run_id INTEGER,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS standings_category_votes ON standings (category, votes DESC, hash)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS standings_votes ON standings (votes DESC, hash)')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS run_standings (
+                run_id INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                category TEXT,
+                votes INTEGER NOT NULL,
+                rank INTEGER NOT NULL,
+                prev_votes INTEGER,
+                prev_rank INTEGER,
+                gained INTEGER NOT NULL,
+                climbed INTEGER,
+                PRIMARY KEY (run_id, hash)
+            ) WITHOUT ROWID
+        ''')
+        for column in DIFF_ORDERS.values():
+            self._conn.execute(f'CREATE INDEX IF NOT EXISTS run_standings_{column} '
+                               f'ON run_standings (run_id, {column} DESC, hash)')
+            self._conn.execute(f'CREATE INDEX IF NOT EXISTS run_standings_category_{column} '
+                               f'ON run_standings (run_id, category, {column} DESC, hash)')
+
+    def begin_run(self, label=None):
+        """
+        Starts a run that the following `record` calls belong to; see `end_run`.
+
+        Returns:
+            int: The run id.
+        """
+        with self._lock:
+            return self._conn.execute('INSERT INTO runs (label, started_at) VALUES (?, ?)',
+                                      (label, time.time())).lastrowid
+
+    def end_run(self, run_id):
+        """
+        Flushes the run's results and snapshots the standings as of the run,
+        each with its rank in its category and its movement since the
+        previous ended run.
+
+        Returns:
+            int: The number of submissions in the snapshot.
+        """
+        self.flush()
+        with self._lock:
+            previous = self._conn.execute(
+                'SELECT MAX(id) FROM runs WHERE id < ? AND ended_at IS NOT NULL', (run_id,)).fetchone()[0]
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.execute('DELETE FROM run_standings WHERE run_id = ?', (run_id,))
+                count = self._conn.execute('''
+                    INSERT INTO run_standings (run_id, hash, category, votes, rank, prev_votes, prev_rank, gained, climbed)
+                    SELECT ?, s.hash, s.category, s.votes, s.rank, p.votes, p.rank,
+                           s.votes - COALESCE(p.votes, 0), p.rank - s.rank
+                    FROM (
+                        SELECT hash, category, votes, RANK() OVER (PARTITION BY category ORDER BY votes DESC) AS rank
+                        FROM standings WHERE votes IS NOT NULL
+                    ) AS s
+                    LEFT JOIN run_standings AS p ON p.run_id = ? AND p.hash = s.hash
+                ''', (run_id, previous)).rowcount
+                self._conn.execute('UPDATE runs SET ended_at = ? WHERE id = ?', (time.time(), run_id))
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+        return count
+
+    def record(self, run_id, submission):
+        """
+        Buffers one result: the submission's standing and the count this run saw.
+        A result without votes keeps the previously known count.
+
+        Args:
+            run_id (int): From `begin_run`.
+            submission (dict): 'hash' (or a submission 'url'), 'category', 'title',
+                'name', 'url' and 'votes'.
+        """
+        submission_hash = submission.get('hash') or self._hash_from_url(submission.get('url'))
+        if not submission_hash:
+            return
+        row = (submission_hash, submission.get('category'), submission.get('title'), submission.get('name'),
+               submission.get('url'), parse_count(submission.get('votes')), run_id, time.time())
+        with self._lock:
+            self._pending.append(row)
+            due = (len(self._pending) >= self.batch_size
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self):
+        """
+        Commits the buffered rows in one transaction.
+        """
+        with self._lock:
+            rows, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+            if not rows:
+                return
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.executemany('''
+                    INSERT INTO standings (hash, category, title, name, url, votes, run_id, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(hash) DO UPDATE SET
+                        category = COALESCE(excluded.category, standings.category),
+                        title = COALESCE(excluded.title, standings.title),
+                        name = COALESCE(excluded.name, standings.name),
+                        url = COALESCE(excluded.url, standings.url),
+                        votes = COALESCE(excluded.votes, standings.votes),
+                        run_id = excluded.run_id,
+                        updated_at = excluded.updated_at
+                ''', rows)
+                observed = Counter(row[6] for row in rows)
+                self._conn.executemany('UPDATE runs SET observed = observed + ? WHERE id = ?',
+                                       [(count, run_id) for run_id, count in observed.items()])
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    def import_csv(self, path, label=None):
+        """
+        Records every row of a crawl output ('titles_votes.csv', 'submissions.csv') as a new, ended run.
+
+        Returns:
+            tuple: (run id, number of rows).
+        """
+        run_id = self.begin_run(label or os.path.basename(path))
+        count = 0
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                self.record(run_id, row)
+                count += 1
+        self.end_run(run_id)
+        return run_id, count
+
+    def runs(self):
+        """
+        Returns:
+            list: (run id, label, started_at, ended_at, submissions observed) tuples,
+                oldest first; ended_at is None for a run that never ended.
+        """
+        with self._lock:
+            return self._conn.execute('SELECT id, label, started_at, ended_at, observed FROM runs ORDER BY id').fetchall()
+
+    def categories(self):
+        """
+        Returns:
+            list: Every category with results, sorted.
+        """
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                'SELECT DISTINCT category FROM standings WHERE category IS NOT NULL ORDER BY category')]
+
+    def top(self, category=None, k=10):
+        """
+        The `k` submissions with the most votes, in one category or overall.
+
+        Returns:
+            list: (hash, category, title, name, votes) tuples, most votes first.
+        """
+        where, params = ('category = ? AND', (category,)) if category is not None else ('', ())
+        with self._lock:
+            return self._conn.execute(f'''
+                SELECT hash, category, title, name, votes FROM standings
+                WHERE {where} votes IS NOT NULL
+                ORDER BY votes DESC, hash LIMIT ?
+            ''', params + (k,)).fetchall()
+
+    def rank(self, submission_hash):
+        """
+        Where a submission stands. Tied counts share a rank (1, 2, 2, 4, ...).
+
+        Returns:
+            dict: hash, category, title, votes, rank and total within the category,
+                and overall_rank and overall_total; None for an unknown hash.
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT category, title, votes FROM standings WHERE hash = ?',
+                                     (submission_hash,)).fetchone()
+            if row is None:
+                return None
+            category, title, votes = row
+            result = {'hash': submission_hash, 'category': category, 'title': title, 'votes': votes,
+                      'rank': None, 'total': None, 'overall_rank': None, 'overall_total': None}
+            if votes is None:
+                return result
+            # Range counts over the sorted indexes
+            result['rank'] = 1 + self._conn.execute(
+                'SELECT COUNT(*) FROM standings WHERE category IS ? AND votes > ?', (category, votes)).fetchone()[0]
+            result['total'] = self._conn.execute(
+                'SELECT COUNT(*) FROM standings WHERE category IS ? AND votes IS NOT NULL', (category,)).fetchone()[0]
+            result['overall_rank'] = 1 + self._conn.execute(
+                'SELECT COUNT(*) FROM standings WHERE votes > ?', (votes,)).fetchone()[0]
+            result['overall_total'] = self._conn.execute(
+                'SELECT COUNT(*) FROM standings WHERE votes IS NOT NULL').fetchone()[0]
+        return result
+
+    def diff(self, from_run=None, to_run=None, category=None, k=10, by='votes'):
+        """
+        Who moved most between two ended runs, comparing their snapshots.
+        Between a run and the one before it, the movers are read off an index;
+        other pairs join the two snapshots by hash.
+
+        Args:
+            from_run (int): Earlier run; defaults to the ended run before `to_run`.
+            to_run (int): Later run; defaults to the latest ended run.
+            category (str): Only this category; None compares every category.
+            k (int): Number of movers to return.
+            by (str): 'votes' ranks by votes gained, 'rank' by places climbed.
+
+        Returns:
+            list: (hash, category, title, votes before, votes after, gained, rank
+                before, rank after) tuples; the 'before' values are None for a
+                submission new since `from_run`.
+
+        Raises:
+            ValueError: Unknown `by`, or a run without a snapshot.
+        """
+        if by not in DIFF_ORDERS:
+            raise ValueError(f"Unknown diff order '{by}'")
+        column = DIFF_ORDERS[by]
+        with self._lock:
+            if to_run is None:
+                to_run = self._scalar('SELECT MAX(id) FROM runs WHERE ended_at IS NOT NULL')
+            if to_run is None:
+                return []
+            previous = self._scalar('SELECT MAX(id) FROM runs WHERE id < ? AND ended_at IS NOT NULL', (to_run,))
+            from_run = previous if from_run is None else from_run
+            if from_run is None:
+                return []
+            for run_id in (from_run, to_run):
+                if self._scalar('SELECT ended_at FROM runs WHERE id = ?', (run_id,)) is None:
+                    raise ValueError(f"Run {run_id} has no snapshot; it does not exist or never ended")
+            where, params = ('AND b.category = ?', (category,)) if category is not None else ('', ())
+            if from_run == previous:
+                # Movement since the previous run was stored with the snapshot
+                return self._conn.execute(f'''
+                    SELECT b.hash, b.category, s.title, b.prev_votes, b.votes, b.gained, b.prev_rank, b.rank
+                    FROM run_standings AS b
+                    LEFT JOIN standings AS s ON s.hash = b.hash
+                    WHERE b.run_id = ? {where}
+                    ORDER BY b.{column} DESC, b.hash
+                    LIMIT ?
+                ''', (to_run,) + params + (k,)).fetchall()
+            order = 'gained' if by == 'votes' else 'a.rank - b.rank'
+            return self._conn.execute(f'''
+                SELECT b.hash, b.category, s.title, a.votes, b.votes, b.votes - COALESCE(a.votes, 0) AS gained,
+                       a.rank, b.rank
+                FROM run_standings AS b
+                LEFT JOIN run_standings AS a ON a.run_id = ? AND a.hash = b.hash
+                LEFT JOIN standings AS s ON s.hash = b.hash
+                WHERE b.run_id = ? {where}
+                ORDER BY {order} DESC, b.hash
+                LIMIT ?
+            ''', (from_run, to_run) + params + (k,)).fetchall()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    def _scalar(self, sql, params=()):
+        row = self._conn.execute(sql, params).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _hash_from_url(url):
+        # 'https://editfest.filmsupply.com/submissions/<hash>' -> '<hash>'
+        if not url:
+            return None
+        return urlparse(url).path.rstrip('/').rsplit('/', 1)[-1] or None
+
+def format_votes(votes):
+    return '-' if votes is None else str(votes)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Leaderboard queries over the indexed results store.")
+    parser.add_argument('--db', default=RESULTS_DB_PATH, help=f"Results database (default: {RESULTS_DB_PATH}).")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    load = commands.add_parser('import', help="Record a crawl output CSV as a new run.")
+    load.add_argument('path', help="e.g. titles_votes.csv or submissions.csv")
+    load.add_argument('--label', help="Run label (default: the file name).")
+
+    top = commands.add_parser('top', help="Submissions with the most votes.")
+    top.add_argument('--category', help="Only this category (default: every category, each on its own).")
+    top.add_argument('--overall', action='store_true', help="One leaderboard across all categories.")
+    top.add_argument('-k', type=int, default=10, help="Entries per leaderboard (default: 10).")
+
+    rank = commands.add_parser('rank', help="Where a submission stands.")
+    rank.add_argument('hash', nargs='+', help="Submission hash(es).")
+
+    diff = commands.add_parser('diff', help="Who moved most between two runs.")
+    diff.add_argument('--from', dest='from_run', type=int, help="Earlier run id (default: the one before --to).")
+    diff.add_argument('--to', dest='to_run', type=int, help="Later run id (default: the latest).")
+    diff.add_argument('--category', help="Only this category.")
+    diff.add_argument('--by', choices=['votes', 'rank'], default='votes',
+                      help="Order by votes gained or places climbed (default: votes).")
+    diff.add_argument('-k', type=int, default=10, help="Number of movers (default: 10).")
+
+    commands.add_parser('runs', help="List the recorded runs.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    store = ResultsStore(args.db)
+    started = time.perf_counter()
+    try:
+        if args.command == 'import':
+            run_id, count = store.import_csv(args.path, args.label)
+            print(f"Run {run_id}: recorded {count} rows from '{args.path}'.")
+        elif args.command == 'top':
+            categories = [None] if args.overall else ([args.category] if args.category else store.categories())
+            for category in categories:
+                print(f"\n{category or 'All categories'}")
+                for position, (submission_hash, _, title, name, votes) in enumerate(store.top(category, args.k), 1):
+                    print(f"{position:>4}. {votes:>7}  {title or '-'} ({name or '-'})  {submission_hash}")
+        elif args.command == 'rank':
+            for submission_hash in args.hash:
+                result = store.rank(submission_hash)
+                if result is None:
+                    print(f"{submission_hash}: not in the store")
+                elif result['rank'] is None:
+                    print(f"{submission_hash}: no votes recorded")
+                else:
+                    print(f"{submission_hash}: #{result['rank']} of {result['total']} in {result['category']}, "
+                          f"#{result['overall_rank']} of {result['overall_total']} overall, "
+                          f"{result['votes']} votes ({result['title']})")
+        elif args.command == 'diff':
+            try:
+                movers = store.diff(args.from_run, args.to_run, args.category, args.k, args.by)
+            except ValueError as e:
+                print(e)
+                movers = []
+            for submission_hash, category, title, before, after, gained, rank_before, rank_after in movers:
+                print(f"{gained:>+7}  {format_votes(before):>7} -> {after:<7} "
+                      f"#{format_votes(rank_before)} -> #{rank_after}  {title or '-'} [{category}]  {submission_hash}")
+        elif args.command == 'runs':
+            for run_id, label, started_at, ended_at, observed in store.runs():
+                print(f"{run_id:>4}  {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(started_at))}  "
+                      f"{observed:>7} submissions  {label or ''}{'' if ended_at else '  (never ended)'}")
+    finally:
+        store.close()
+    print(f"({(time.perf_counter() - started) * 1000:.1f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from errors import HTTP_STATUS, NETWORK, OTHER, SELECTOR_MISS, WEBDRIVER_INIT, classify
+from log_setup import log_summary
+
+class RetryPolicy:
+    """
+    How often, and how patiently, one class of error is retried.
+
+    The delay before retry n is drawn uniformly from [0, min(max_delay,
+    base_delay * 2 ** (n - 1))] ("full jitter"), so items that failed together
+    do not all come back at the same moment.
+    """
+
+    def __init__(self, max_attempts, base_delay=1.0, max_delay=60.0):
+        """
+        Args:
+            max_attempts (int): Total attempts, including the first one.
+            base_delay (float): Backoff ceiling before the first retry, in seconds.
+            max_delay (float): Upper bound on any single delay, in seconds.
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt):
+        """
+        Seconds to wait after failed attempt number `attempt` (1-based).
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+DEFAULT_POLICIES = {
+    NETWORK: RetryPolicy(5, base_delay=1.0, max_delay=60.0),
+    HTTP_STATUS: RetryPolicy(4, base_delay=2.0, max_delay=120.0),
+    WEBDRIVER_INIT: RetryPolicy(3, base_delay=5.0, max_delay=60.0),
+    SELECTOR_MISS: RetryPolicy(2, base_delay=10.0, max_delay=30.0),
+    OTHER: RetryPolicy(2, base_delay=2.0, max_delay=30.0),
+}
+NO_RETRY = RetryPolicy(1)
+
+class RetryLane:
+    """
+    Retries failed items on its own threads, off the main lane, so first
+    attempts keep flowing while failures wait out their backoff.
+
+    The main lane hands a failed item over with `submit`; it is scheduled
+    according to its error class, re-run by one of the lane's workers, and
+    either handed to `on_success` or, once its policy is exhausted, recorded in
+    `failures` and handed to `on_failure`. Call `close` when the main lane has
+    no more items; the workers exit once every scheduled retry has finished.
+    """
+
+    def __init__(self, name, policies=None, workers=2, describe=repr):
+        """
+        Args:
+            name (str): Label used in log messages, e.g. 'extraction'.
+            policies (dict): Error class -> RetryPolicy; defaults to `DEFAULT_POLICIES`.
+                Classes missing from the dict are not retried.
+            workers (int): Number of retry threads.
+            describe (callable): Item -> short label for the log and the report.
+        """
+        self.name = name
+        self.policies = DEFAULT_POLICIES if policies is None else policies
+        self.workers = workers
+        self.describe = describe
+        self.failures = []
+        self._heap = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._closed = False
+        self._stopped = False
+        self._condition = threading.Condition()
+        self._threads = []
+        self._on_failure = None
+
+    def start(self, attempt, on_success, on_failure=None, on_exit=None):
+        """
+        Starts the retry threads.
+
+        Args:
+            attempt (callable): Item -> result; raises on failure.
+            on_success (callable): (item, result) -> None, for a retry that worked.
+            on_failure (callable): (item, exception) -> None, for a permanent failure.
+            on_exit (callable): Called once by each worker thread as it exits.
+        """
+        self._on_failure = on_failure
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, args=(attempt, on_success, on_exit),
+                name=f"{self.name}-retry-{i}", daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, item, error, attempts=1):
+        """
+        Schedules a retry of an item whose attempt failed.
+
+        Args:
+            item: The item to retry.
+            error (Exception): Why the last attempt failed.
+            attempts (int): Attempts made so far.
+
+        Returns:
+            bool: True if a retry was scheduled, False if the item failed for good
+                (it is then in `failures` and was passed to `on_failure`).
+        """
+        kind = classify(error)
+        policy = self.policies.get(kind, NO_RETRY)
+        if attempts >= policy.max_attempts or self._stopped:
+            self._fail(item, kind, attempts, error)
+            return False
+        delay = policy.delay(attempts)
+        # Honour the server's own Retry-After when it asks for a longer wait
+        delay = max(delay, min(getattr(error, 'retry_after', None) or 0, policy.max_delay))
+        logging.warning(
+            "%s: %s failed (%s: %s); retry %d/%d in %.1fs",
+            self.name, self.describe(item), kind, error, attempts, policy.max_attempts - 1, delay,
+        )
+        with self._condition:
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._sequence), item, attempts))
+            self._condition.notify()
+        return True
+
+    def close(self):
+        """
+        Tells the lane that no more items will be submitted by the main lane.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def stop(self):
+        """
+        Abandons scheduled retries, e.g. because the consumer went away.
+        """
+        with self._condition:
+            self._stopped = True
+            self._closed = True
+            self._condition.notify_all()
+
+    def join(self, timeout=None):
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def log_report(self):
+        """
+        Logs every item that failed permanently, one line each.
+        """
+        log_failures(self.name, self.failures)
+
+    def _fail(self, item, kind, attempts, error):
+        with self._condition:
+            self.failures.append({'item': self.describe(item), 'kind': kind, 'attempts': attempts, 'error': str(error)})
+        if self._on_failure:
+            self._on_failure(item, error)
+
+    def _take(self):
+        with self._condition:
+            while True:
+                if self._stopped:
+                    return None
+                now = time.monotonic()
+                if self._heap and self._heap[0][0] <= now:
+                    _, _, item, attempts = heapq.heappop(self._heap)
+                    self._in_flight += 1
+                    return item, attempts
+                if self._closed and not self._heap and not self._in_flight:
+                    return None
+                self._condition.wait(timeout=min(self._heap[0][0] - now, 0.5) if self._heap else 0.5)
+
+    def _work(self, attempt, on_success, on_exit):
+        try:
+            while True:
+                taken = self._take()
+                if taken is None:
+                    return
+                item, attempts = taken
+                try:
+                    result = attempt(item)
+                except Exception as e:
+                    self.submit(item, e, attempts + 1)
+                else:
+                    logging.info("%s: %s succeeded on attempt %d", self.name, self.describe(item), attempts + 1)
+                    on_success(item, result)
+                finally:
+                    with self._condition:
+                        self._in_flight -= 1
+                        self._condition.notify_all()
+        finally:
+            if on_exit:
+                on_exit()
+
+def log_failures(name, failures):
+    """
+    Logs a permanent-failure report: a count, then one structured record per item.
+
+    Args:
+        name (str): Lane name, e.g. 'listing' or 'extraction'.
+        failures (list): Dicts with item, kind, attempts and error (see `RetryLane.failures`).
+    """
+    if not failures:
+        logging.info("%s: no permanent failures.", name)
+        return
+    logging.error("%s: %d items failed permanently:", name, len(failures))
+    for failure in failures:
+        log_summary('permanent_failure', lane=name, **failure)
@@ -0,0 +1,294 @@
+import argparse
+import json
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import harv_titles_votes
+from concurrency import AimdLimiter
+from extractor_spec import TITLE_VOTES_SPEC, ExtractorSpec, parse_simple_selector
+from http_session import build_session
+from listing import API_URL_TEMPLATE, ListingClient
+from log_setup import setup_queue_logging
+from network_capture import NetworkCapture
+from pipeline import run_pipeline
+from readiness import ReadinessEngine
+from retry import RetryLane, log_failures
+from sinks import SINK_BACKENDS, open_sink
+from snapshot_archive import SNAPSHOT_DIR, SnapshotArchive
+from timing import span, tracer
+
+# Columns every target writes besides its spec fields
+LISTING_KEYS = ['name', 'category', 'hash']
+DEFAULT_FIELD_TIMEOUT = 15   # Seconds a browser waits for a field's node to hold text
+
+class Target:
+    """
+    One crawl target: a listing, its submission pages, the fields to read from
+    them and where to write the results.
+
+    A config file holds a list of targets, e.g.
+
+        {"targets": [
+            {"name": "titles-2024", "categories": ["Title Sequence"]},
+            {"name": "music-2023",
+             "api_url": "https://editfest.filmsupply.com/api/2023/submissions?page={page}",
+             "submission_url": "https://editfest.filmsupply.com/2023/submissions/{submission_hash}",
+             "categories": ["Music Video"], "mode": "browser", "weight": 2,
+             "fields": [{"name": "title", "selector": "div.css-1w984ju"},
+                        {"name": "votes", "selector": "div.css-tumkbo", "parse": "int"}]}
+        ]}
+
+    Omitted keys default to the Editfest listing, the title and votes fields,
+    'auto' mode, every category and an output named after the target.
+    """
+
+    def __init__(self, name, api_url_template=API_URL_TEMPLATE, submission_url_template=None, categories=None,
+                 spec=TITLE_VOTES_SPEC, mode='auto', output=None, timeout=DEFAULT_FIELD_TIMEOUT, weight=1):
+        """
+        Args:
+            name (str): Unique label, used in logs and as the default output name.
+            api_url_template (str): Listing URL with a `{page}` field.
+            submission_url_template (str): Submission page URL with a
+                `{submission_hash}` field; defaults to `harv_titles_votes.SUBMISSION_URL_TEMPLATE`.
+            categories (list): Category names to keep; None keeps all.
+            spec (ExtractorSpec): Fields read from each submission page.
+            mode (str): 'browser', 'network', 'http' or 'auto'; see `harv_titles_votes.extract_submission`.
+            output (str): Output name without extension, e.g. 'titles-2024'
+                for 'titles-2024.csv' and 'titles-2024_urls.txt'.
+            timeout (float): Readiness timeout per field, in seconds.
+            weight (int): Submissions taken from this target per scheduling turn.
+
+        Raises:
+            ValueError: An 'http' target has a selector that only a browser can match.
+        """
+        if mode == 'http':
+            for selector in spec.selectors:
+                parse_simple_selector(selector)
+        self.name = name
+        self.api_url_template = api_url_template
+        self.submission_url_template = submission_url_template or harv_titles_votes.SUBMISSION_URL_TEMPLATE
+        self.categories = categories
+        self.spec = spec
+        self.mode = mode
+        self.output = output or name
+        self.weight = max(1, int(weight))
+        self.readiness = ReadinessEngine({field.selector: timeout for field in spec.fields})
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Builds a target from one entry of a config file (see the class docstring).
+        """
+        fields = config.get('fields')
+        spec = ExtractorSpec.from_config(fields) if fields else TITLE_VOTES_SPEC
+        return cls(
+            config['name'],
+            api_url_template=config.get('api_url', API_URL_TEMPLATE),
+            submission_url_template=config.get('submission_url'),
+            categories=config.get('categories'),
+            spec=spec,
+            mode=config.get('mode', 'auto'),
+            output=config.get('output'),
+            timeout=config.get('timeout', DEFAULT_FIELD_TIMEOUT),
+            weight=config.get('weight', 1),
+        )
+
+    @property
+    def fieldnames(self):
+        """
+        Output columns: the URL, every spec field, then the listing keys.
+        """
+        names = ['url'] + [field.name for field in self.spec.fields]
+        return names + [key for key in LISTING_KEYS if key not in names]
+
+    def mark_failed(self, submission, error):
+        """
+        Result written for a submission whose extraction failed for good; fields
+        found before a selector miss are kept.
+        """
+        values = getattr(error, 'values', {})
+        for field in self.spec.fields:
+            submission[field.name] = values.get(field.name)
+        submission['url'] = self.submission_url_template.format(submission_hash=submission.get('hash'))
+        return submission
+
+    def __repr__(self):
+        return f"Target({self.name!r})"
+
+def load_targets(path):
+    """
+    Reads the targets from a JSON config file.
+
+    Returns:
+        list: `Target` instances, in file order.
+    """
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    targets = [Target.from_config(entry) for entry in config.get('targets', [])]
+    names = [target.name for target in targets]
+    if len(names) != len(set(names)):
+        raise ValueError(f"Duplicate target names in '{path}': {names}")
+    outputs = [target.output for target in targets]
+    if len(outputs) != len(set(outputs)):
+        raise ValueError(f"Targets in '{path}' share an output: {outputs}")
+    return targets
+
+def interleave(streams):
+    """
+    Weighted round robin over several iterators: takes `weight` items from each
+    in turn until all are exhausted, so no target waits for another to finish.
+
+    Args:
+        streams (list): (iterator, weight) pairs.
+    """
+    active = deque((iter(stream), weight) for stream, weight in streams)
+    while active:
+        stream, weight = active.popleft()
+        for _ in range(weight):
+            try:
+                yield next(stream)
+            except StopIteration:
+                break
+        else:
+            active.append((stream, weight))
+
+def run_targets(targets, session, pool, sink_backend='csv', resume=False, archive=None):
+    """
+    Crawls every target over one shared set of workers: listing pages of all
+    targets are fetched on one thread pool behind one concurrency limiter, and
+    their submissions are interleaved into a single extraction pipeline that
+    shares the browser pool, the HTTP limiters and the retry lane. Each target
+    writes to its own sink and output files.
+
+    Args:
+        targets (list): `Target` instances.
+        session (requests.Session): Pooled session shared by all targets.
+        pool (DriverPool): Browsers (or a `TabPool` of tabs) shared by all targets.
+        sink_backend (str): Partial-results storage; see `sinks.SINK_BACKENDS`.
+        resume (bool): Keep the partial results of an interrupted run.
+        archive (SnapshotArchive): Keeps the pages of failed (or all) submissions.
+
+    Returns:
+        dict: Target name -> number of rows in its final output.
+    """
+    listing_limiter = AimdLimiter('listing', initial=harv_titles_votes.MAX_FETCH_THREADS,
+                                  max_limit=harv_titles_votes.MAX_FETCH_CEILING)
+    limiters = harv_titles_votes.build_limiters(pool.size)
+    fetch_executor = ThreadPoolExecutor(max_workers=harv_titles_votes.MAX_FETCH_CEILING, thread_name_prefix='listing')
+    clients = {
+        target.name: ListingClient(session, url_template=target.api_url_template,
+                                   max_threads=harv_titles_votes.MAX_FETCH_THREADS, categories=target.categories,
+                                   limiter=listing_limiter, executor=fetch_executor)
+        for target in targets
+    }
+    sinks = {target.name: open_sink(sink_backend, target.output, target.fieldnames, resume=resume) for target in targets}
+
+    def listed(target):
+        for submission in clients[target.name].iter_submissions():
+            if harv_titles_votes.select_submission(submission):
+                yield target, submission
+
+    def extract(item):
+        target, submission = item
+        return target, harv_titles_votes.extract_submission(
+            submission, target.mode, pool, target.readiness, session, limiters,
+            spec=target.spec, url_template=target.submission_url_template, archive=archive,
+        )
+
+    def write(result):
+        target, submission = result
+        with span('output.write'):
+            sinks[target.name].write(submission)
+
+    # Browser workers block on the pool, so HTTP-capable targets can keep more in flight
+    all_browser = all(target.mode in harv_titles_votes.BROWSER_MODES for target in targets)
+    workers = pool.size if all_browser else harv_titles_votes.MAX_HTTP_THREADS
+    retry = RetryLane('extraction', workers=harv_titles_votes.RETRY_THREADS,
+                      describe=lambda item: f"{item[0].name}:{item[1].get('hash')}")
+    try:
+        written = run_pipeline(
+            interleave([(listed(target), target.weight) for target in targets]),
+            extract,
+            write,
+            workers=workers,
+            on_error=lambda item, error: (item[0], item[0].mark_failed(item[1], error)),
+            progress_desc="Extracting",
+            retry=retry,
+        )
+        logging.info("Extracted %s submissions across %s targets.", written, len(targets))
+    finally:
+        fetch_executor.shutdown(wait=False, cancel_futures=True)
+        for sink in sinks.values():
+            sink.close()
+
+    totals = {}
+    for target in targets:
+        totals[target.name] = sinks[target.name].finalize(f"{target.output}.csv", urls_path=f"{target.output}_urls.txt")
+        logging.info("Target '%s': saved %s submissions to '%s.csv'.", target.name, totals[target.name], target.output)
+        target.readiness.log_summary()
+        log_failures(f"{target.name} listing", clients[target.name].failures)
+    retry.log_report()
+    return totals
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Crawl several Editfest listings or category sets in one run over shared workers.")
+    parser.add_argument('config', help="JSON file with a 'targets' list; see `scheduler.Target`.")
+    parser.add_argument('--sink', choices=list(SINK_BACKENDS), default='csv',
+                        help="Storage for results while the crawl runs (default: csv).")
+    parser.add_argument('--resume', action='store_true',
+                        help="Keep the partial results of an interrupted run and add to them.")
+    parser.add_argument('--tabs', type=int, default=1,
+                        help="Load this many pages at once in tabs of each browser (default: 1).")
+    parser.add_argument('--browsers', type=int,
+                        help=f"Number of browsers (default: {harv_titles_votes.MAX_EXTRACT_THREADS}, or 1 with --tabs).")
+    parser.add_argument('--load-all-resources', action='store_true',
+                        help="Let browsers load images, media, fonts and third-party scripts.")
+    parser.add_argument('--block-domain', action='append', dest='block_domains', metavar='DOMAIN',
+                        help="Also block requests to this domain and its subdomains; repeat for several.")
+    parser.add_argument('--snapshots', action='store_true',
+                        help="Archive every rendered page for offline re-extraction (failed pages always are).")
+    parser.add_argument('--snapshot-dir', default=SNAPSHOT_DIR,
+                        help=f"Page snapshot archive directory (default: {SNAPSHOT_DIR}).")
+    parser.add_argument('--trace', metavar='PATH',
+                        help="Write a Chrome trace of every timed stage to PATH.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    setup_queue_logging('scheduler.jsonl')
+    tracer.keep_events = bool(args.trace)
+    targets = load_targets(args.config)
+    logging.info("Loaded %s targets from '%s': %s", len(targets), args.config, ', '.join(target.name for target in targets))
+
+    # Browsers log network events if any target reads pages from their own responses;
+    # only 'network' targets wait on the capture, the others wait for the new document
+    # (the capture's 'none' load strategy returns from `driver.get` at once) and read the DOM
+    network_capture = None
+    if any(target.mode == 'network' for target in targets):
+        network_capture = NetworkCapture(timeout=harv_titles_votes.NETWORK_CAPTURE_TIMEOUT)
+
+    # One session, one browser pool and one warm-up for every target
+    session = build_session({'User-Agent': 'Mozilla/5.0'},
+                            pool_size=harv_titles_votes.MAX_HTTP_THREADS + harv_titles_votes.MAX_FETCH_CEILING)
+    pool = harv_titles_votes.build_pool(args, network_capture)
+    if any(target.mode in harv_titles_votes.BROWSER_MODES for target in targets):
+        pool.warm_up()
+    archive = SnapshotArchive(args.snapshot_dir, every_page=args.snapshots)
+    try:
+        with span('run'):
+            run_targets(targets, session, pool, sink_backend=args.sink, resume=args.resume, archive=archive)
+    finally:
+        pool.close()
+        archive.log_summary()
+        archive.close()
+        if pool.resource_policy:
+            pool.resource_policy.log_summary()
+        if pool.network_capture:
+            pool.network_capture.log_summary()
+        tracer.log_report()
+        if args.trace:
+            tracer.write_chrome_trace(args.trace)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+import csv
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+def has_votes(row):
+    """
+    Default completeness test: a row counts as finished once it has votes.
+    Values read back from CSV are strings, so '' means missing too.
+    """
+    return row.get('votes') not in (None, '')
+
+class ResultSink:
+    """
+    Appends result rows to durable storage in small batches as they complete.
+
+    Rows are buffered until `batch_size` have accumulated or the oldest has
+    waited `flush_interval` seconds, then written in one go; the file is
+    fsynced at most every `fsync_interval` seconds and on `close`. An
+    interrupted run therefore loses at most the current batch, and memory does
+    not grow with the number of rows (only their keys are remembered).
+
+    Rows are deduplicated by `key`: a row for a key that already has a complete
+    row is dropped, and an incomplete row never replaces an earlier one, so a
+    retry or a resumed run can only improve on what is stored.
+
+    `finalize` writes one row per key (the last one stored) to the final CSV
+    layout through a temporary file and an atomic rename, so readers never see
+    a half-written output.
+
+    Subclasses provide the storage: `_open`, `_append`, `_sync`, `_iter_raw`
+    and `_close`.
+    """
+
+    def __init__(self, path, fieldnames, key='hash', resume=False, batch_size=50, flush_interval=2.0,
+                 fsync_interval=5.0, complete=has_votes):
+        """
+        Args:
+            path (str): Storage file for the partial results.
+            fieldnames (list): Columns stored, and written by `finalize`.
+            key (str): Column rows are deduplicated by.
+            resume (bool): Keep rows stored by an earlier run instead of starting empty.
+            batch_size (int): Rows buffered before a write.
+            flush_interval (float): Longest time a row waits in the buffer, in seconds.
+            fsync_interval (float): Minimum seconds between two fsyncs.
+            complete (callable): Row -> True once the row needs no further attempts.
+        """
+        self.path = path
+        self.fieldnames = list(fieldnames)
+        self.key = key
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.complete = complete
+        self._complete_keys = set()
+        self._incomplete_keys = set()
+        self._batch = []
+        self._batch_started = None
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._open(resume)
+        if resume:
+            for row in self._iter_raw():
+                self._remember(row)
+
+    def write(self, row, replace=False):
+        """
+        Queues a row for the next batch.
+
+        Args:
+            row (dict): The result; keys outside `fieldnames` are ignored.
+            replace (bool): Let a complete row replace an earlier complete one,
+                e.g. for a submission whose listing entry changed.
+
+        Returns:
+            bool: False if the row was dropped as a duplicate.
+        """
+        row = {name: row.get(name) for name in self.fieldnames}
+        with self._lock:
+            key = row.get(self.key)
+            complete = self.complete(row)
+            if key in self._complete_keys and not (replace and complete):
+                return False
+            if key in self._incomplete_keys and not complete:
+                return False
+            self._remember(row)
+            self._batch.append(row)
+            if self._batch_started is None:
+                self._batch_started = time.monotonic()
+            if len(self._batch) >= self.batch_size or time.monotonic() - self._batch_started >= self.flush_interval:
+                self._write_batch()
+        return True
+
+    def flush(self, sync=True):
+        """
+        Writes the buffered rows and, with `sync`, forces them to disk.
+        """
+        with self._lock:
+            self._write_batch(force_sync=sync)
+
+    def close(self):
+        """
+        Flushes and syncs the buffered rows and closes the storage. Safe to call twice.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._write_batch(force_sync=True)
+            self._close()
+            self._closed = True
+
+    def __len__(self):
+        with self._lock:
+            return len(self._complete_keys | self._incomplete_keys)
+
+    def rows(self):
+        """
+        Yields the deduplicated rows: per key the last row written, in storage
+        order. Reads the storage, so it works after `close`.
+        """
+        if not self._closed:
+            self.flush(sync=False)
+        # The row a key ends up with is the last one stored for it
+        last = {}
+        for position, row in enumerate(self._iter_raw()):
+            last[row.get(self.key)] = position
+        for position, row in enumerate(self._iter_raw()):
+            if last.get(row.get(self.key)) == position:
+                yield row
+
+    def finalize(self, output_path, urls_path=None):
+        """
+        Atomically replaces `output_path` with a CSV of the deduplicated rows
+        and, optionally, `urls_path` with one URL per row.
+
+        Returns:
+            int: The number of rows written.
+        """
+        written = 0
+        with atomic_open(output_path, newline='', encoding='utf-8') as output_file, \
+                atomic_open(urls_path) as urls_file:
+            dict_writer = csv.DictWriter(output_file, fieldnames=self.fieldnames)
+            dict_writer.writeheader()
+            for row in self.rows():
+                dict_writer.writerow({name: '' if row.get(name) is None else row.get(name) for name in self.fieldnames})
+                if urls_file:
+                    urls_file.write(f"{row.get('url') or 'No URL'}\n")
+                written += 1
+        return written
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _remember(self, row):
+        key = row.get(self.key)
+        if self.complete(row):
+            self._complete_keys.add(key)
+            self._incomplete_keys.discard(key)
+        else:
+            self._incomplete_keys.add(key)
+
+    def _write_batch(self, force_sync=False):
+        if self._closed:
+            return
+        if self._batch:
+            self._append(self._batch)
+            self._batch = []
+            self._batch_started = None
+        if force_sync or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self._sync()
+            self._last_sync = time.monotonic()
+
+    def _open(self, resume):
+        raise NotImplementedError
+
+    def _append(self, rows):
+        raise NotImplementedError
+
+    def _sync(self):
+        raise NotImplementedError
+
+    def _iter_raw(self):
+        raise NotImplementedError
+
+    def _close(self):
+        raise NotImplementedError
+
+class CsvSink(ResultSink):
+    """
+    Partial results as an append-only CSV with a header row.
+    """
+
+    def _open(self, resume):
+        self._file = open(self.path, 'a' if resume else 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction='ignore')
+        if self._file.tell() == 0:
+            self._writer.writeheader()
+            self._file.flush()
+
+    def _append(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+
+    def _iter_raw(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, newline='', encoding='utf-8') as f:
+            # A row cut short by a crash has missing columns; skip it
+            for row in csv.DictReader(f):
+                if None not in row.values():
+                    yield row
+
+    def _close(self):
+        self._file.close()
+
+class JsonLinesSink(ResultSink):
+    """
+    Partial results as one JSON object per line; keeps value types (votes stay ints).
+    """
+
+    def _open(self, resume):
+        self._file = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+
+    def _append(self, rows):
+        self._file.write(''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows))
+        self._file.flush()
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+
+    def _iter_raw(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # The last line may be cut short by a crash
+                    continue
+
+    def _close(self):
+        self._file.close()
+
+class SqliteSink(ResultSink):
+    """
+    Partial results in a SQLite table keyed by `key`; each batch is one transaction.
+    """
+
+    def _open(self, resume):
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        # Commits are made durable by `_sync` instead of one fsync per batch
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL,
+                row TEXT NOT NULL
+            )
+        ''')
+        if not resume:
+            self._conn.execute('DELETE FROM results')
+
+    def _append(self, rows):
+        self._conn.execute('BEGIN')
+        # A replaced row keeps its original position
+        self._conn.executemany('''
+            INSERT INTO results (key, seq, row)
+            VALUES (?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM results), ?)
+            ON CONFLICT(key) DO UPDATE SET row = excluded.row
+        ''', [(row.get(self.key), json.dumps(row, ensure_ascii=False)) for row in rows])
+        self._conn.execute('COMMIT')
+
+    def _sync(self):
+        self._conn.execute('PRAGMA wal_checkpoint(PASSIVE)')
+
+    def rows(self):
+        if not self._closed:
+            self.flush(sync=False)
+        yield from self._iter_raw()
+
+    def _iter_raw(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            for (row,) in conn.execute('SELECT row FROM results ORDER BY seq'):
+                yield json.loads(row)
+        finally:
+            conn.close()
+
+    def _close(self):
+        self._conn.close()
+
+# Backend name -> (sink class, file extension of its partial results)
+SINK_BACKENDS = {
+    'csv': (CsvSink, '.partial.csv'),
+    'jsonl': (JsonLinesSink, '.partial.jsonl'),
+    'sqlite': (SqliteSink, '.partial.sqlite3'),
+}
+
+def open_sink(backend, base_path, fieldnames, **kwargs):
+    """
+    Opens the partial-results sink for one output.
+
+    Args:
+        backend (str): 'csv', 'jsonl' or 'sqlite'.
+        base_path (str): Output name without extension, e.g. 'titles_votes'.
+        fieldnames (list): Columns of the output.
+        **kwargs: Passed to the sink, e.g. resume=True.
+
+    Returns:
+        ResultSink: Writes to e.g. 'titles_votes.partial.sqlite3'.
+    """
+    sink_class, extension = SINK_BACKENDS[backend]
+    return sink_class(base_path + extension, fieldnames, **kwargs)
+
+@contextmanager
+def atomic_open(path, **kwargs):
+    """
+    Opens `path + '.tmp'` for writing and, if the block succeeds, fsyncs it and
+    renames it over `path`; on failure the original file is left untouched.
+    A `path` of None yields None, for optional outputs.
+    """
+    if path is None:
+        yield None
+        return
+    temp_path = path + '.tmp'
+    f = open(temp_path, 'w', **kwargs)
+    try:
+        yield f
+        f.flush()
+        os.fsync(f.fileno())
+    except BaseException:
+        f.close()
+        os.remove(temp_path)
+        raise
+    f.close()
+    os.replace(temp_path, path)
@@ -0,0 +1,264 @@
+import argparse
+import csv
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from extractor_spec import TITLE_VOTES_SPEC, ExtractorSpec
+from http_extract import parse_fields_html
+from log_setup import setup_queue_logging
+from sinks import atomic_open
+from timing import span, tracer
+
+SNAPSHOT_DIR = 'page_snapshots'
+REEXTRACT_CHUNK = 64   # Snapshots handed to a worker process at a time
+
+def blob_path(root, digest):
+    """
+    Where the compressed page with this SHA-256 digest lives, e.g.
+    'page_snapshots/objects/3f/a2....html.gz'.
+    """
+    return os.path.join(root, 'objects', digest[:2], digest[2:] + '.html.gz')
+
+def read_blob(root, digest):
+    """
+    Returns the page HTML stored under `digest`.
+    """
+    with open(blob_path(root, digest), 'rb') as f:
+        return gzip.decompress(f.read()).decode('utf-8')
+
+class SnapshotArchive:
+    """
+    Compressed, content-addressed snapshots of submission pages, so fields can
+    be re-extracted later without a browser or the network (see `reextract`).
+
+    Each page is gzipped into `objects/` under the SHA-256 of its HTML, so an
+    unchanged page is stored once however often it is crawled. An SQLite
+    index records every capture: submission hash, crawl time, digest, URL,
+    where the HTML came from and whether extraction succeeded.
+
+    Failed pages are always kept, replacing the old per-failure HTML dumps;
+    with `every_page`, successful ones are kept too. Nothing is created on
+    disk until the first page is stored.
+    """
+
+    def __init__(self, root=SNAPSHOT_DIR, every_page=False, compresslevel=6):
+        """
+        Args:
+            root (str): Archive directory.
+            every_page (bool): Keep every page, not only failed ones.
+            compresslevel (int): gzip level, 1 (fastest) to 9 (smallest).
+        """
+        self.root = root
+        self.every_page = every_page
+        self.compresslevel = compresslevel
+        self.stored = 0
+        self.new_blobs = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def wants(self, ok):
+        """
+        Returns True if a page whose extraction succeeded (`ok`) or failed should be kept.
+        """
+        return self.every_page or not ok
+
+    def capture(self, submission_hash, url, read_html, ok=True, source='browser'):
+        """
+        Stores the page if `wants(ok)`. Errors are logged, never raised, so
+        archiving cannot fail an extraction.
+
+        Args:
+            submission_hash (str): The submission the page describes.
+            url (str): The page URL.
+            read_html (callable): Returns the page HTML; only called if the page is kept.
+            ok (bool): Whether extraction succeeded.
+            source (str): 'browser', 'devtools' or 'http'.
+        """
+        if not self.wants(ok):
+            return
+        try:
+            with span('snapshot.store'):
+                self.put(submission_hash, url, read_html(), ok=ok, source=source)
+        except Exception as e:
+            logging.debug("Could not archive the page of %s: %s", submission_hash, e)
+
+    def put(self, submission_hash, url, html, ok=True, source='browser', crawled_at=None):
+        """
+        Stores one page.
+
+        Returns:
+            str: The page's digest.
+        """
+        data = html.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = blob_path(self.root, digest)
+        created = False
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Unique temp name: two threads may store the same page at once
+            temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(gzip.compress(data, compresslevel=self.compresslevel))
+            os.replace(temp_path, path)
+            created = True
+        with self._lock:
+            self._connect().execute(
+                'INSERT OR REPLACE INTO snapshots (hash, crawled_at, digest, url, source, ok) VALUES (?, ?, ?, ?, ?, ?)',
+                (submission_hash, crawled_at or time.time(), digest, url, source, int(ok)))
+            self.stored += 1
+            self.new_blobs += created
+        return digest
+
+    def latest(self, include_failed=True):
+        """
+        The most recent snapshot of every submission.
+
+        Returns:
+            list: (hash, url, digest, crawled_at) tuples, ordered by hash.
+        """
+        if not os.path.exists(os.path.join(self.root, 'index.sqlite3')):
+            return []
+        where = '' if include_failed else 'WHERE ok = 1'
+        with self._lock:
+            # SQLite returns the other columns from the row holding the MAX
+            return self._connect().execute(f'''
+                SELECT hash, url, digest, MAX(crawled_at) FROM snapshots {where}
+                GROUP BY hash ORDER BY hash
+            ''').fetchall()
+
+    def history(self, submission_hash):
+        """
+        Every snapshot of one submission, oldest first.
+
+        Returns:
+            list: (crawled_at, digest, source, ok) tuples.
+        """
+        with self._lock:
+            return self._connect().execute(
+                'SELECT crawled_at, digest, source, ok FROM snapshots WHERE hash = ? ORDER BY crawled_at',
+                (submission_hash,)).fetchall()
+
+    def log_summary(self):
+        """
+        Logs how many pages were archived in this run.
+        """
+        if self.stored:
+            logging.info("Archived %s page snapshots in '%s' (%s new, %s unchanged).",
+                         self.stored, self.root, self.new_blobs, self.stored - self.new_blobs)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(self.root, exist_ok=True)
+            # Shard worker processes share one archive, so wait out each other's writes
+            self._conn = sqlite3.connect(os.path.join(self.root, 'index.sqlite3'), timeout=30,
+                                         check_same_thread=False, isolation_level=None)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    hash TEXT NOT NULL,
+                    crawled_at REAL NOT NULL,
+                    digest TEXT NOT NULL,
+                    url TEXT,
+                    source TEXT,
+                    ok INTEGER NOT NULL,
+                    PRIMARY KEY (hash, crawled_at)
+                )
+            ''')
+        return self._conn
+
+def extract_snapshot(root, spec, snapshot):
+    """
+    Re-extracts one archived page; runs in a worker process.
+
+    Args:
+        root (str): Archive directory.
+        spec (ExtractorSpec): Fields to extract.
+        snapshot (tuple): A row of `SnapshotArchive.latest`.
+
+    Returns:
+        dict: 'hash', 'url', 'crawled_at' and every spec field.
+    """
+    submission_hash, url, digest, crawled_at = snapshot
+    try:
+        values = parse_fields_html(read_blob(root, digest), submission_hash, spec)
+    except (OSError, ValueError) as e:
+        logging.debug("Could not read snapshot %s of %s: %s", digest, submission_hash, e)
+        values = {field.name: None for field in spec.fields}
+    return dict(values, hash=submission_hash, url=url, crawled_at=crawled_at)
+
+def reextract(root, spec=TITLE_VOTES_SPEC, output_path='reextracted.csv', processes=None, include_failed=True):
+    """
+    Runs `spec` over the latest snapshot of every submission in parallel
+    processes, without a browser or the network, and writes one CSV row per
+    submission.
+
+    Args:
+        root (str): Archive directory.
+        spec (ExtractorSpec): Fields to extract.
+        output_path (str): CSV to write, replaced atomically.
+        processes (int): Worker processes; defaults to the CPU count.
+        include_failed (bool): Also re-extract pages whose original extraction failed.
+
+    Returns:
+        int: The number of rows written.
+    """
+    archive = SnapshotArchive(root)
+    snapshots = archive.latest(include_failed=include_failed)
+    archive.close()
+    fieldnames = ['url'] + [field.name for field in spec.fields] + ['hash', 'crawled_at']
+    required = [field.name for field in spec.fields if field.required]
+    written = complete = 0
+    with atomic_open(output_path, newline='', encoding='utf-8') as f, \
+            ProcessPoolExecutor(max_workers=processes) as executor:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+        for row in executor.map(partial(extract_snapshot, root, spec), snapshots, chunksize=REEXTRACT_CHUNK):
+            writer.writerow(row)
+            written += 1
+            complete += all(row.get(name) is not None for name in required)
+    logging.info("Re-extracted %s snapshots into '%s'; %s have every required field.", written, output_path, complete)
+    return written
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Re-extract fields from archived submission pages, without a browser or the network.")
+    parser.add_argument('--archive', default=SNAPSHOT_DIR,
+                        help=f"Snapshot archive directory (default: {SNAPSHOT_DIR}).")
+    parser.add_argument('--fields', metavar='PATH',
+                        help="JSON file with a 'fields' list, as in a scheduler target "
+                             "(default: the title and votes fields).")
+    parser.add_argument('--output', default='reextracted.csv',
+                        help="CSV to write (default: reextracted.csv).")
+    parser.add_argument('--processes', type=int,
+                        help="Worker processes (default: one per CPU).")
+    parser.add_argument('--skip-failed', action='store_true',
+                        help="Leave out pages whose original extraction failed.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    setup_queue_logging('reextract.jsonl')
+    spec = TITLE_VOTES_SPEC
+    if args.fields:
+        with open(args.fields, encoding='utf-8') as f:
+            spec = ExtractorSpec.from_config(json.load(f)['fields'])
+    with span('reextract'):
+        reextract(args.archive, spec, args.output, processes=args.processes, include_failed=not args.skip_failed)
+    tracer.log_report()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from selenium.common.exceptions import TimeoutException
+from driver_pool import HIDE_WEBDRIVER_SCRIPT, DriverPool, build_chrome_options
+
+# Keep background tabs running at full speed; only one tab is ever in the foreground
+BACKGROUND_TAB_ARGUMENTS = [
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding",
+]
+
+# Set on the old document before navigating; the new document starts without it
+NAVIGATION_MARKER_SCRIPT = "window.__tabPoolPending = true;"
+NAVIGATED_SCRIPT = '''
+    const loaded = document.readyState === 'complete' || (arguments[0] && document.readyState === 'interactive');
+    return !window.__tabPoolPending && loaded;
+'''
+
+class _Browser:
+    """
+    One Chrome session shared by several tabs. WebDriver commands act on the
+    current window, so every command goes through `lock` and `focus`.
+    """
+
+    def __init__(self, driver, eager=True, load_timeout=30.0):
+        self.driver = driver
+        self.eager = eager
+        self.load_timeout = load_timeout
+        self.lock = threading.RLock()
+        self.current = driver.current_window_handle
+        self.slots = 1      # Tabs open or being opened
+        self.pages = 0
+        self.retiring = False
+
+    def focus(self, handle):
+        if self.current != handle:
+            self.driver.switch_to.window(handle)
+            self.current = handle
+
+class Tab:
+    """
+    A browser tab with the subset of the WebDriver interface the extractors
+    use. Each call switches the browser to this tab under the browser's lock,
+    so several threads can drive tabs of one browser; pages load and render
+    in parallel while the commands themselves take turns.
+    """
+
+    def __init__(self, browser, handle):
+        self.browser = browser
+        self.handle = handle
+
+    def get(self, url, poll_interval=0.05):
+        """
+        Navigates and waits for the new document like the 'eager' (or, without
+        an eager resource policy, 'normal') load strategy would, but releases the
+        browser between checks so other tabs keep working meanwhile.
+        """
+        def navigate(driver):
+            driver.execute_script(NAVIGATION_MARKER_SCRIPT)
+            driver.get(url)
+
+        self._call(navigate)
+        deadline = time.monotonic() + self.browser.load_timeout
+        while not self.execute_script(NAVIGATED_SCRIPT, self.browser.eager):
+            if time.monotonic() >= deadline:
+                raise TimeoutException(f"Timed out loading {url} in a tab")
+            time.sleep(poll_interval)
+
+    def execute_script(self, script, *args):
+        return self._call(lambda driver: driver.execute_script(script, *args))
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        return self._call(lambda driver: driver.execute_cdp_cmd(cmd, cmd_args))
+
+    def get_log(self, log_type):
+        return self._call(lambda driver: driver.get_log(log_type))
+
+    @property
+    def page_source(self):
+        return self._call(lambda driver: driver.page_source)
+
+    def _call(self, command):
+        with self.browser.lock:
+            self.browser.focus(self.handle)
+            return command(self.browser.driver)
+
+class TabPool:
+    """
+    A pool of tabs spread over a few long-lived browsers, with the same
+    `acquire`/`release`/`lease` interface as `DriverPool`.
+
+    Each browser hosts up to `tabs_per_browser` tabs, so the number of pages
+    in flight grows by tabs rather than by whole Chrome processes. Browsers use
+    the 'none' page-load strategy and `Tab.get` polls for the new document, so
+    no tab holds the browser while its page loads and renders. A tab is
+    reused for the next submission; a failed one is closed and replaced, and a
+    browser is replaced once it has served `max_pages` pages.
+
+    DevTools event logs are shared by every tab of a browser, so a
+    `network_capture` is not supported here and is ignored.
+    """
+
+    def __init__(self, browsers=1, tabs_per_browser=8, options=None, max_pages=500, max_rss_mb=None,
+                 resource_policy=None, network_capture=None, load_timeout=30.0):
+        """
+        Args:
+            browsers (int): Maximum number of live browsers.
+            tabs_per_browser (int): Maximum number of tabs per browser.
+            options (Options): Chrome options; defaults to `build_chrome_options()`.
+            max_pages (int): Pages served by a browser, over all its tabs, before it is replaced.
+            max_rss_mb (int): Resident memory ceiling per browser, in megabytes (requires psutil).
+            resource_policy (ResourcePolicy): Load strategy and request blocking, applied to every tab.
+            network_capture (NetworkCapture): Not supported; logged and ignored.
+            load_timeout (float): Seconds a tab waits for its page to load.
+        """
+        self.browsers = browsers
+        self.tabs_per_browser = tabs_per_browser
+        self.size = browsers * tabs_per_browser
+        self.max_pages = max_pages
+        self.load_timeout = load_timeout
+        self.resource_policy = resource_policy
+        self.network_capture = None
+        if network_capture:
+            logging.warning("Network capture cannot tell tabs apart; reading pages from the DOM instead.")
+        options = options or build_chrome_options()
+        for argument in BACKGROUND_TAB_ARGUMENTS:
+            options.add_argument(argument)
+        # Browsers are launched, and their first tab prepared, by a plain DriverPool
+        self._drivers = DriverPool(size=browsers, options=options, max_rss_mb=max_rss_mb,
+                                   resource_policy=resource_policy)
+        # Tabs wait for their own page (see `Tab.get`), so `driver.get` must not block the browser
+        self._eager = options.page_load_strategy == 'eager'
+        options.page_load_strategy = 'none'
+        self._browsers = []
+        self._launching = 0
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def warm_up(self):
+        """
+        Opens every browser and tab in the background. Returns immediately.
+        """
+        def open_tabs():
+            tabs = []
+            try:
+                for _ in range(self.tabs_per_browser):
+                    tabs.append(self.acquire())
+            except Exception as e:
+                logging.error("Error warming up browser tabs: %s", e)
+            for tab in tabs:
+                self._idle.put(tab)
+
+        for _ in range(self.browsers):
+            threading.Thread(target=open_tabs, name="tab-warm-up", daemon=True).start()
+
+    def acquire(self):
+        """
+        Leases a tab: an idle one, a new tab in a browser with room, or a tab
+        of a newly launched browser; otherwise waits for one to be released.
+
+        Returns:
+            Tab: A tab to drive.
+        """
+        while True:
+            if self._closed:
+                raise RuntimeError("TabPool is closed")
+            try:
+                tab = self._idle.get_nowait()
+            except queue.Empty:
+                tab = None
+            if tab is not None:
+                if not tab.browser.retiring:
+                    return tab
+                self._close_tab(tab)
+                continue
+
+            browser, launch = self._reserve()
+            if launch:
+                return self._launch()
+            if browser is not None:
+                return self._open_tab(browser)
+            try:
+                tab = self._idle.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            if not tab.browser.retiring:
+                return tab
+            self._close_tab(tab)
+
+    def release(self, tab, discard=False):
+        """
+        Returns a leased tab for the next submission, or closes it.
+
+        Args:
+            tab (Tab): The tab obtained from `acquire`.
+            discard (bool): Close the tab instead of reusing it (e.g. after a failure).
+        """
+        browser = tab.browser
+        with self._lock:
+            browser.pages += 1
+            if browser.pages >= self.max_pages:
+                browser.retiring = True
+        if not browser.retiring and self._drivers._over_rss_ceiling(browser.driver):
+            browser.retiring = True
+        if discard or self._closed or browser.retiring:
+            self._close_tab(tab)
+        else:
+            self._idle.put(tab)
+
+    @contextmanager
+    def lease(self):
+        """
+        Context manager around `acquire`/`release`; the tab is closed if the block raises.
+        """
+        tab = self.acquire()
+        failed = False
+        try:
+            yield tab
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.release(tab, discard=failed)
+
+    def close(self):
+        """
+        Closes every idle tab and quits browsers left without tabs. Tabs still
+        leased are closed when released.
+        """
+        self._closed = True
+        while True:
+            try:
+                tab = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._close_tab(tab)
+        self._drivers.close()
+
+    def _reserve(self):
+        with self._lock:
+            if self._closed:
+                return None, False
+            for browser in self._browsers:
+                if not browser.retiring and browser.slots < self.tabs_per_browser:
+                    browser.slots += 1
+                    return browser, False
+            if len(self._browsers) + self._launching < self.browsers:
+                self._launching += 1
+                return None, True
+        return None, False
+
+    def _launch(self):
+        try:
+            driver = self._drivers.acquire()
+        finally:
+            with self._lock:
+                self._launching -= 1
+        browser = _Browser(driver, self._eager, self.load_timeout)
+        with self._lock:
+            self._browsers.append(browser)
+        # The browser's first window is already prepared by the driver pool
+        return Tab(browser, browser.current)
+
+    def _open_tab(self, browser):
+        try:
+            with browser.lock:
+                driver = browser.driver
+                driver.switch_to.new_window('tab')
+                browser.current = driver.current_window_handle
+                # Scripts and blocking rules are per tab
+                driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': HIDE_WEBDRIVER_SCRIPT})
+                if self.resource_policy:
+                    self.resource_policy.apply(driver)
+                return Tab(browser, browser.current)
+        except Exception:
+            with self._lock:
+                browser.slots -= 1
+            raise
+
+    def _close_tab(self, tab):
+        browser = tab.browser
+        with self._lock:
+            last = browser.slots == 1
+            browser.slots -= 1
+            if last:
+                # Closing the last window would end the session; quit the browser instead
+                browser.retiring = True
+                if browser in self._browsers:
+                    self._browsers.remove(browser)
+        if last:
+            self._drivers.release(browser.driver, discard=True)
+            return
+        try:
+            with browser.lock:
+                browser.focus(tab.handle)
+                browser.driver.close()
+                browser.current = None
+        except Exception as e:
+            logging.debug("Error closing tab %s: %s", tab.handle, e)
@@ -0,0 +1,34 @@
+from checkpoint import DONE, FAILED, PENDING, CheckpointStore
+
+def test_state_survives_a_reopen(tmp_path):
+    path = str(tmp_path / 'checkpoint.db')
+    store = CheckpointStore(path)
+    for submission_hash in 'abc':
+        store.mark_pending(submission_hash)
+    store.record({'hash': 'a', 'title': 'A', 'votes': 3})
+    store.record({'hash': 'b', 'title': 'B', 'votes': None})
+    store.close()
+
+    store = CheckpointStore(path)
+    assert store.done_hashes() == {'a'}
+    assert store.counts() == {DONE: 1, FAILED: 1, PENDING: 1}
+    assert list(store.iter_done()) == [{'hash': 'a', 'title': 'A', 'votes': 3}]
+    store.close()
+
+def test_a_failed_submission_is_retried_and_counted(tmp_path):
+    store = CheckpointStore(str(tmp_path / 'checkpoint.db'))
+    store.mark_pending('a')
+    store.mark_failed({'hash': 'a'}, "timed out")
+    store.mark_pending('a')
+    attempts, error = store._conn.execute("SELECT attempts, error FROM submissions WHERE hash = 'a'").fetchone()
+    assert attempts == 2 and error == "timed out"
+    store.mark_done({'hash': 'a', 'votes': 1})
+    assert store.done_hashes() == {'a'}
+    store.close()
+
+def test_reset_forgets_everything(tmp_path):
+    store = CheckpointStore(str(tmp_path / 'checkpoint.db'))
+    store.mark_done({'hash': 'a', 'votes': 1})
+    store.reset()
+    assert store.done_hashes() == set() and store.counts() == {}
+    store.close()
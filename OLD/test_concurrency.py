@@ -0,0 +1,76 @@
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+
+from concurrency import AimdLimiter, parse_retry_after, slot
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+def test_parse_retry_after():
+    assert parse_retry_after('120') == 120.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+    assert 50 < parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+    assert parse_retry_after(formatdate(time.time() - 60, usegmt=True)) == 0.0
+
+def test_limit_grows_after_a_limit_of_healthy_completions():
+    limiter = AimdLimiter('test', initial=2, max_limit=3)
+    limiter.succeeded()
+    assert limiter.limit == 2
+    limiter.succeeded()
+    assert limiter.limit == 3
+    for _ in range(10):
+        limiter.succeeded()
+    assert limiter.limit == 3
+
+def test_overload_halves_the_limit_once_per_cooldown():
+    limiter = AimdLimiter('test', initial=8, min_limit=3, cooldown=60.0)
+    limiter.overloaded("status 503")
+    limiter.overloaded("status 503")
+    assert limiter.limit == 4
+    limiter._last_decrease -= 60.0
+    limiter.overloaded("status 503")
+    assert limiter.limit == 3
+
+def test_slow_completions_count_as_overload():
+    limiter = AimdLimiter('test', initial=4, latency_ceiling=1.0)
+    limiter.succeeded(latency=5.0)
+    assert limiter.limit == 2
+
+def test_retry_after_pauses_new_acquisitions():
+    limiter = AimdLimiter('test', initial=4)
+    limiter.observe_response(Response(429, {'Retry-After': '30'}))
+    assert limiter.limit == 2
+    assert not limiter.try_acquire()
+
+def test_try_acquire_respects_the_limit():
+    limiter = AimdLimiter('test', initial=2)
+    assert limiter.try_acquire() and limiter.try_acquire()
+    assert not limiter.try_acquire()
+    limiter.release()
+    assert limiter.try_acquire()
+
+def test_slot_records_the_outcome():
+    limiter = AimdLimiter('test', initial=4, cooldown=0)
+    with pytest.raises(requests.Timeout):
+        with limiter.slot():
+            raise requests.Timeout("slow")
+    assert limiter.limit == 2
+    with pytest.raises(ValueError):
+        with limiter.slot():
+            raise ValueError("not an overload")
+    assert limiter.limit == 2
+    with limiter.slot() as held:
+        held.response(Response(503))
+    assert limiter.limit == 1
+    assert limiter._in_flight == 0
+
+def test_slot_without_a_limiter():
+    with slot(None) as held:
+        held.overloaded("ignored")
+    assert held.reported
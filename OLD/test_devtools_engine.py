@@ -0,0 +1,131 @@
+import json
+import math
+from contextlib import asynccontextmanager
+
+import pytest
+import trio
+from trio_websocket import ConnectionClosed
+
+import devtools_engine
+from devtools_engine import DevToolsEngine
+from errors import DriverInitError
+from extractor_spec import COLLECT_SCRIPT
+from readiness import READY_SCRIPT, ReadinessEngine
+
+URL_TEMPLATE = 'http://editfest.test/submissions/{submission_hash}'
+
+class FakeBrowser:
+    """
+    Answers the DevTools commands the engine sends, and drops its connection
+    once it has loaded `crash_after` pages.
+    """
+
+    def __init__(self, crash_after=None):
+        self.crash_after = crash_after
+        self.loaded = 0
+        self.targets = 0
+        self.urls = {}
+
+    @property
+    def crashed(self):
+        return self.crash_after is not None and self.loaded >= self.crash_after
+
+class FakeWebSocket:
+    def __init__(self, browser):
+        self.browser = browser
+        self.send_channel, self.receive_channel = trio.open_memory_channel(math.inf)
+
+    async def send_message(self, text):
+        browser = self.browser
+        if browser.crashed:
+            raise ConnectionClosed(None)
+        message = json.loads(text)
+        method, params, session_id = message['method'], message['params'], message.get('sessionId')
+        result = {}
+        if method == 'Target.createTarget':
+            browser.targets += 1
+            result = {'targetId': f"target-{browser.targets}"}
+        elif method == 'Target.attachToTarget':
+            result = {'sessionId': f"session-{params['targetId']}"}
+        elif method == 'Page.navigate':
+            browser.loaded += 1
+            if browser.crashed:
+                await self.send_channel.send(None)
+                return
+            browser.urls[session_id] = params['url']
+            result = {'loaderId': f"loader-{browser.loaded}"}
+            await self.send_channel.send({'method': 'Page.lifecycleEvent', 'sessionId': session_id,
+                                          'params': {'name': 'load', 'loaderId': result['loaderId']}})
+        elif method == 'Runtime.evaluate':
+            expression = params['expression']
+            args = json.loads(expression.rsplit('.apply(null, ', 1)[1][:-1])
+            submission_hash = browser.urls[session_id].rsplit('/', 1)[1]
+            if READY_SCRIPT in expression:
+                value = [True] * len(args[0])
+            elif COLLECT_SCRIPT in expression:
+                value = {'title': [f"Submission {submission_hash}"], 'votes': ['7 Votes']}
+            result = {'result': {'value': value}}
+        await self.send_channel.send({'id': message['id'], 'result': result})
+
+    async def get_message(self):
+        message = await self.receive_channel.receive()
+        if message is None:
+            raise ConnectionClosed(None)
+        return json.dumps(message)
+
+class FakePool:
+    resource_policy = None
+
+    def __init__(self, browsers, size=1, max_pages=1000):
+        self.browsers = list(browsers)
+        self.size = size
+        self.max_pages = max_pages
+        self.released = []
+
+    def acquire(self):
+        if not self.browsers:
+            raise RuntimeError("No browser left")
+        return self.browsers.pop(0)
+
+    def release(self, driver, discard=False):
+        self.released.append((driver, discard))
+
+    def worn_out(self, driver, pages):
+        return pages >= self.max_pages
+
+@pytest.fixture(autouse=True)
+def fake_websockets(monkeypatch):
+    @asynccontextmanager
+    async def open_websocket_url(browser, max_message_size=None):
+        yield FakeWebSocket(browser)
+
+    monkeypatch.setattr(devtools_engine, 'browser_websocket_url', lambda driver: driver)
+    monkeypatch.setattr(devtools_engine, 'open_websocket_url', open_websocket_url)
+
+def run_engine(pool, count):
+    written = []
+    engine = DevToolsEngine(pool, URL_TEMPLATE, pages_per_browser=3, readiness=ReadinessEngine(poll_interval=0))
+    total = engine.run([{'hash': f"h{index}"} for index in range(count)], written.append)
+    return engine, total, written
+
+def test_a_lost_browser_is_replaced_and_its_submissions_retried():
+    pool = FakePool([FakeBrowser(crash_after=4), FakeBrowser()])
+    engine, total, written = run_engine(pool, 20)
+    assert total == 20
+    assert sorted(submission['hash'] for submission in written) == sorted(f"h{index}" for index in range(20))
+    assert all(submission['title'] == f"Submission {submission['hash']}" for submission in written)
+    assert engine.failures == []
+    assert [discard for _, discard in pool.released] == [True, False]
+
+def test_a_worn_out_browser_is_recycled():
+    browsers = [FakeBrowser() for _ in range(5)]
+    pool = FakePool(browsers, max_pages=5)
+    _, total, _ = run_engine(pool, 12)
+    assert total == 12
+    assert [discard for _, discard in pool.released][:2] == [True, True]
+    assert all(browser.loaded <= 5 + 2 for browser in browsers)
+
+def test_losing_every_browser_is_an_error():
+    pool = FakePool([FakeBrowser(crash_after=0)])
+    with pytest.raises(DriverInitError):
+        run_engine(pool, 10)
@@ -6,7 +6,7 @@ from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from readiness import text_present
 
 def extract_votes(submission_url):
     """
@@ -50,22 +50,19 @@ def extract_votes(submission_url):
     
     try:
         # Navigate to the submission URL
+        started = time.monotonic()
         driver.get(submission_url)
         print(f"Navigated to {submission_url}")
         
-        # Wait for a few seconds to let the page load fully
-        time.sleep(5)
+        # Use explicit wait until the votes elements hold text instead of a fixed sleep
+        wait = WebDriverWait(driver, 15, poll_frequency=0.1)  # 15 seconds timeout
+        wait.until(text_present('div.css-tumkbo'))
+        print(f"Votes rendered after {time.monotonic() - started:.2f}s")
         
         # Take a screenshot for debugging (optional)
         driver.save_screenshot('page_screenshot.png')
         print("Page screenshot saved to 'page_screenshot.png'.")
         
-        # Use explicit wait to ensure the votes elements are loaded
-        wait = WebDriverWait(driver, 15)  # 15 seconds timeout
-        votes_present = wait.until(
-            EC.presence_of_all_elements_located((By.CSS_SELECTOR, 'div.css-tumkbo'))
-        )
-        
         # Use JavaScript to get all 'div.css-tumkbo' texts
         votes_texts = driver.execute_script('return Array.from(document.querySelectorAll("div.css-tumkbo")).map(el => el.textContent.trim());')
         print(f"Votes Texts via JavaScript: {votes_texts}")
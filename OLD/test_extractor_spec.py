@@ -0,0 +1,70 @@
+import pytest
+
+from extractor_spec import TITLE_VOTES_SPEC, ExtractorSpec, Field, PageParser, parse_simple_selector, parse_votes
+
+PAGE = '''<html><head><meta property="og:title" content="Og title"></head><body>
+<div class="css-1w984ju extra">  My   <b>Edit</b> </div>
+<div class="css-tumkbo" id="votes">1234 Votes</div>
+<ul class="tags"><li class="tag">one</li><li class="tag"></li><li class="tag">two</li></ul>
+<img class="css-tumkbo">
+<script>window.__STATE__ = {"votes": 3};</script>
+</body></html>'''
+
+def test_run_html():
+    result = TITLE_VOTES_SPEC.run_html(PAGE)
+    assert result.ok
+    assert result.values == {'title': 'My Edit', 'votes': 1234}
+
+def test_parse_rules_and_errors():
+    spec = ExtractorSpec([
+        Field('tags', 'li.tag', parse='texts'),
+        Field('votes', '#votes', parse='int'),
+        Field('missing', 'span.nothing', required=False),
+        Field('heading', 'h1'),
+    ])
+    result = spec.run_html(PAGE)
+    assert result.values['tags'] == ['one', 'two']
+    assert result.values['votes'] == 1234
+    assert result.errors == {'missing': 'missing', 'heading': 'missing'}
+    assert not result.ok
+    assert result.get('missing', 'default') == 'default'
+
+def test_page_parser_collects_scripts_and_meta():
+    parser = PageParser(['div.css-tumkbo'])
+    parser.feed(PAGE)
+    parser.close()
+    assert parser.meta == {'og:title': 'Og title'}
+    assert parser.scripts == [({}, 'window.__STATE__ = {"votes": 3};')]
+    assert parser.texts['div.css-tumkbo'] == ['1234 Votes']
+
+@pytest.mark.parametrize('selector, parsed', [
+    ('div', ('div', None, set())),
+    ('DIV.a.b', ('div', None, {'a', 'b'})),
+    ('#votes', (None, 'votes', set())),
+    ('span.b#x.c', ('span', 'x', {'b', 'c'})),
+])
+def test_simple_selectors(selector, parsed):
+    assert parse_simple_selector(selector) == parsed
+
+@pytest.mark.parametrize('selector', [
+    'div.a > span.b', 'div.a span.b', 'div + p', 'a[href]', 'li:first-child', '#a#b', '*', '', 'div,span',
+])
+def test_selectors_only_a_browser_can_match_are_rejected(selector):
+    with pytest.raises(ValueError):
+        parse_simple_selector(selector)
+    with pytest.raises(ValueError):
+        ExtractorSpec([Field('value', selector)]).run_html(PAGE)
+
+def test_spec_config():
+    spec = ExtractorSpec.from_config([{'name': 'votes', 'selector': 'div.css-tumkbo', 'parse': 'int'},
+                                      {'name': 'title', 'selector': 'h1', 'required': False}])
+    assert [(field.name, field.parse, field.required) for field in spec.fields] == [
+        ('votes', 'int', True), ('title', 'text', False)]
+    with pytest.raises(ValueError):
+        ExtractorSpec([Field('a', 'div'), Field('a', 'span')])
+    with pytest.raises(ValueError):
+        Field('a', 'div', parse='float')
+
+@pytest.mark.parametrize('value, votes', [(12, 12), ('123 Votes', 123), ('none', None), (True, None), (None, None)])
+def test_parse_votes(value, votes):
+    assert parse_votes(value) == votes
@@ -0,0 +1,27 @@
+import requests
+
+from fake_editfest import FakeEditfest
+from harv_titles_votes import stream_submission_details
+from http_session import build_session
+from listing import ListingClient
+from sinks import open_sink
+
+FIELDNAMES = ['hash', 'title', 'name', 'category', 'url', 'votes']
+
+def test_http_mode_end_to_end(tmp_path):
+    with FakeEditfest(total=50) as site:
+        client = ListingClient(requests.Session(), url_template=site.listing_url_template, page_size=20,
+                               categories=['Trailer'])
+        session = build_session()
+        with open_sink('csv', str(tmp_path / 'titles_votes'), FIELDNAMES) as sink:
+            written = stream_submission_details(client.iter_submissions(), sink.write, mode='http',
+                                                session=session, url_template=site.submission_url_template)
+            assert written == 10
+            assert sink.finalize(str(tmp_path / 'titles_votes.csv')) == 10
+            rows = {row['hash']: row for row in sink.rows()}
+
+    expected = {site.submission(index)['hash']: site.submission(index) for index in range(1, 50, 5)}
+    assert rows.keys() == expected.keys()
+    for submission_hash, row in rows.items():
+        assert row['title'] == expected[submission_hash]['title']
+        assert int(row['votes']) == expected[submission_hash]['votes']
@@ -0,0 +1,46 @@
+import pytest
+
+from errors import CACHE_MISS, CacheMissError, classify
+from fake_editfest import FakeEditfest
+from http_cache import RECORD, REFRESH, REPLAY, CachingSession
+from retry import DEFAULT_POLICIES
+
+@pytest.fixture
+def site():
+    with FakeEditfest(total=20) as site:
+        yield site
+
+def test_replay_serves_recorded_responses(site, tmp_path):
+    url = site.listing_url_template.format(page=1)
+    recorded = CachingSession(str(tmp_path), mode=RECORD).get(url, params={'per_page': 5})
+    assert recorded.status_code == 200
+
+    site.stop()
+    replayed = CachingSession(str(tmp_path), mode=REPLAY).get(url, params={'per_page': 5})
+    assert replayed.status_code == 200
+    assert replayed.json() == recorded.json()
+    assert replayed.headers['Content-Type'] == recorded.headers['Content-Type']
+
+def test_replay_miss_is_not_retried(site, tmp_path):
+    session = CachingSession(str(tmp_path), mode=REPLAY)
+    with pytest.raises(CacheMissError) as raised:
+        session.get(site.listing_url_template.format(page=1))
+    assert classify(raised.value) == CACHE_MISS
+    assert CACHE_MISS not in DEFAULT_POLICIES
+
+def test_only_successful_responses_are_recorded(site, tmp_path):
+    missing = site.submission_url_template.format(submission_hash='missing')
+    assert CachingSession(str(tmp_path), mode=RECORD).get(missing).status_code == 404
+    with pytest.raises(CacheMissError):
+        CachingSession(str(tmp_path), mode=REPLAY).get(missing)
+
+def test_refresh_updates_the_recording(site, tmp_path):
+    url = site.listing_url_template.format(page=1)
+    CachingSession(str(tmp_path), mode=RECORD).get(url)
+    site.total = 30
+    assert CachingSession(str(tmp_path), mode=REFRESH).get(url).json()['meta']['total'] == 30
+    assert CachingSession(str(tmp_path), mode=REPLAY).get(url).json()['meta']['total'] == 30
+
+def test_unknown_mode(tmp_path):
+    with pytest.raises(ValueError):
+        CachingSession(str(tmp_path), mode='offline')
@@ -0,0 +1,112 @@
+import pytest
+import requests
+
+from fake_editfest import FakeEditfest
+from listing import ListingClient
+from listing_state import ListingState
+
+@pytest.fixture
+def site():
+    with FakeEditfest(total=60) as site:
+        yield site
+
+@pytest.fixture
+def state(tmp_path):
+    state = ListingState(str(tmp_path / 'listing_state.db'))
+    yield state
+    state.close()
+
+def listing_client(site, state, categories=None):
+    # The fake site lists the oldest submissions first
+    return ListingClient(requests.Session(), url_template=site.listing_url_template, page_size=10,
+                         categories=categories, retry_policies={}, state=state)
+
+def sync(client, complete=True, skip=()):
+    """
+    Runs one delta sync and returns the hashes it yielded, reporting each as
+    stored unless it is in `skip`.
+    """
+    hashes = []
+    for _, submissions in client.iter_changed(newest_first=False):
+        for submission in submissions:
+            hashes.append(submission['hash'])
+            if complete and submission['hash'] not in skip:
+                client.complete(submission['hash'])
+    return hashes
+
+def test_first_sync_yields_everything(site, state):
+    hashes = sync(listing_client(site, state))
+    assert sorted(hashes) == sorted(site.submission(index)['hash'] for index in range(60))
+    assert sync(listing_client(site, state)) == []
+
+def test_new_submissions_are_synced(site, state):
+    sync(listing_client(site, state))
+    site.total = 65
+    assert sync(listing_client(site, state)) == [site.submission(index)['hash'] for index in range(60, 65)]
+    assert sync(listing_client(site, state)) == []
+
+def test_unstored_submissions_are_retried(site, state):
+    failed = site.submission(5)['hash']
+    sync(listing_client(site, state), skip={failed})
+    # Page 1 is far behind the newest page, but its submission was never stored
+    assert sync(listing_client(site, state), complete=False) == [failed]
+    assert sync(listing_client(site, state)) == [failed]
+    assert sync(listing_client(site, state)) == []
+
+def test_an_interrupted_sync_is_picked_up_again(site, state):
+    client = listing_client(site, state)
+    hashes = sync(client, complete=False)
+    for submission_hash in hashes[:20]:
+        client.complete(submission_hash)
+    assert sorted(sync(listing_client(site, state))) == sorted(hashes[20:])
+
+def test_a_category_sync_does_not_hide_other_categories(site, state):
+    trailers = sync(listing_client(site, state, categories=['Trailer']))
+    assert len(trailers) == 12
+    assert all(site.submission(index)['category'] == 'Trailer'
+               for index in range(60) if site.submission(index)['hash'] in trailers)
+    others = sync(listing_client(site, state))
+    assert sorted(others) == sorted(site.submission(index)['hash'] for index in range(60)
+                                    if site.submission(index)['hash'] not in trailers)
+
+def test_iter_changed_needs_a_state(site):
+    with pytest.raises(ValueError):
+        list(listing_client(site, None).iter_changed())
+
+class MisreadCategoryEditfest(FakeEditfest):
+    """
+    An API that answers any `category=` with an empty listing.
+    """
+
+    def listing(self, page, per_page=None, category=None):
+        payload = super().listing(page, per_page)
+        if category is not None:
+            payload['data'] = []
+            payload['meta'].update(last_page=1, total=0)
+        return payload
+
+class IgnoredCategoryEditfest(FakeEditfest):
+    """
+    An API that ignores `category=`.
+    """
+
+    def listing(self, page, per_page=None, category=None):
+        return super().listing(page, per_page)
+
+def trailers(site):
+    return sorted(site.submission(index)['hash'] for index in range(site.total)
+                  if site.submission(index)['category'] == 'Trailer')
+
+def test_the_api_category_filter_is_used_when_it_holds(site):
+    client = listing_client(site, None, categories=['Trailer'])
+    assert sorted(submission['hash'] for submission in client.iter_submissions()) == trailers(site)
+    assert client.api_category == 'Trailer'
+    assert client.last_page() == 2
+
+@pytest.mark.parametrize('site_class', [MisreadCategoryEditfest, IgnoredCategoryEditfest])
+def test_an_unreliable_api_category_filter_is_dropped(site_class):
+    with site_class(total=60) as site:
+        client = listing_client(site, None, categories=['Trailer'])
+        assert sorted(submission['hash'] for submission in client.iter_submissions()) == trailers(site)
+        assert client.api_category is None
+        assert client.last_page() == 6
@@ -0,0 +1,111 @@
+import pytest
+from selenium.common.exceptions import TimeoutException
+
+from extractor_spec import COLLECT_SCRIPT
+from harv_titles_votes import extract_submission_details
+from network_capture import NetworkCapture, page_source
+from readiness import READY_SCRIPT, ReadinessEngine
+from tab_pool import NAVIGATED_SCRIPT, NAVIGATION_MARKER_SCRIPT
+
+URL_TEMPLATE = 'http://editfest.test/submissions/{submission_hash}'
+
+class NoneStrategyDriver:
+    """
+    Stands in for Chrome under the 'none' load strategy: `get` returns at once
+    and the new document replaces the old one only after `delay` more scripts,
+    while the old document keeps its filled-in nodes.
+    """
+
+    def __init__(self, pages, delay=3):
+        self.pages = pages
+        self.delay = delay
+        self.document = {'url': 'about:blank', 'marked': False}
+        self.pending = None
+
+    def get(self, url):
+        self.pending = [url, self.delay]
+
+    def get_log(self, log_type):
+        return []
+
+    @property
+    def page_source(self):
+        return f"<html>{self.document['url']}</html>"
+
+    def execute_script(self, script, *args):
+        if self.pending is not None:
+            self.pending[1] -= 1
+            if self.pending[1] < 0:
+                self.document = {'url': self.pending[0], 'marked': False}
+                self.pending = None
+        if script == NAVIGATION_MARKER_SCRIPT:
+            self.document['marked'] = True
+            return None
+        if script == NAVIGATED_SCRIPT:
+            return self.pending is None and not self.document['marked']
+        title, votes = self.pages.get(self.document['url'], (None, None))
+        if script == READY_SCRIPT:
+            return [title is not None for _ in args[0]]
+        if script == COLLECT_SCRIPT:
+            return {'title': [title] if title else [], 'votes': [f"{votes} Votes"] if title else []}
+        raise AssertionError(f"Unexpected script: {script}")
+
+class OneDriverPool:
+    resource_policy = None
+
+    def __init__(self, driver, network_capture=None):
+        self.driver = driver
+        self.network_capture = network_capture
+
+    def acquire(self):
+        return self.driver
+
+    def release(self, driver, discard=False):
+        pass
+
+PAGES = {URL_TEMPLATE.format(submission_hash=submission_hash): (f"Submission {submission_hash}", votes)
+         for submission_hash, votes in [('a', 10), ('b', 20), ('c', 30)]}
+
+def extract_all(pool, capture):
+    return [extract_submission_details({'hash': submission_hash}, pool, ReadinessEngine(), url_template=URL_TEMPLATE,
+                                       capture=capture)
+            for submission_hash in 'abc']
+
+@pytest.mark.parametrize('enabled', [True, False])
+def test_the_dom_fallback_waits_for_the_new_document(enabled):
+    capture = NetworkCapture(timeout=0, poll_interval=0)
+    capture.enabled = enabled
+    pool = OneDriverPool(NoneStrategyDriver(PAGES), network_capture=capture)
+    results = extract_all(pool, capture)
+    assert [(result['title'], result['votes']) for result in results] == [
+        ('Submission a', 10), ('Submission b', 20), ('Submission c', 30)]
+
+def test_page_source_waits_for_the_new_document():
+    capture = NetworkCapture(poll_interval=0)
+    driver = NoneStrategyDriver(PAGES)
+    capture.navigate(driver, 'http://editfest.test/submissions/a')
+    assert page_source(driver, 'http://editfest.test/submissions/a', capture) == \
+        '<html>http://editfest.test/submissions/a</html>'
+
+def test_wait_for_document_times_out():
+    capture = NetworkCapture(poll_interval=0, load_timeout=0.05)
+    driver = NoneStrategyDriver(PAGES, delay=10 ** 9)
+    capture.navigate(driver, 'http://editfest.test/submissions/a')
+    with pytest.raises(TimeoutException):
+        capture.wait_for_document(driver, 'http://editfest.test/submissions/a')
+
+def test_configure_remembers_the_replaced_strategy():
+    from selenium.webdriver.chrome.options import Options
+
+    options = Options()
+    options.page_load_strategy = 'eager'
+    capture = NetworkCapture()
+    capture.configure(options)
+    assert options.page_load_strategy == 'none'
+    assert capture.eager
+
+def test_a_dom_target_on_a_capture_pool_waits_for_the_new_document():
+    pool = OneDriverPool(NoneStrategyDriver(PAGES), network_capture=NetworkCapture(timeout=0, poll_interval=0))
+    results = extract_all(pool, None)
+    assert [(result['title'], result['votes']) for result in results] == [
+        ('Submission a', 10), ('Submission b', 20), ('Submission c', 30)]
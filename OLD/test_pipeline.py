@@ -0,0 +1,64 @@
+import threading
+
+import pytest
+
+from pipeline import run_pipeline
+
+def test_every_item_is_extracted_and_written():
+    written = []
+    count = run_pipeline(range(100), lambda item: item * 2, written.append, workers=4)
+    assert count == 100
+    assert sorted(written) == [item * 2 for item in range(100)]
+
+def test_write_runs_on_the_calling_thread():
+    threads = set()
+    run_pipeline(range(20), lambda item: item, lambda result: threads.add(threading.current_thread()), workers=3)
+    assert threads == {threading.current_thread()}
+
+def test_failed_items_go_to_on_error():
+    def extract(item):
+        if item % 10 == 0:
+            raise RuntimeError(f"boom {item}")
+        return item
+
+    errors = []
+    def on_error(item, error):
+        errors.append((item, str(error)))
+        return -item
+
+    written = []
+    count = run_pipeline(range(30), extract, written.append, workers=2, on_error=on_error)
+    assert count == 30
+    assert sorted(errors) == [(0, "boom 0"), (10, "boom 10"), (20, "boom 20")]
+    assert sorted(written) == sorted([-0, -10, -20] + [item for item in range(30) if item % 10])
+
+def test_failed_items_are_dropped_without_on_error():
+    def extract(item):
+        if item == 3:
+            raise RuntimeError("boom")
+        return item
+
+    written = []
+    assert run_pipeline(range(5), extract, written.append, workers=2) == 4
+    assert sorted(written) == [0, 1, 2, 4]
+
+def test_none_results_are_not_written():
+    written = []
+    assert run_pipeline(range(10), lambda item: item if item % 2 else None, written.append) == 5
+    assert sorted(written) == [1, 3, 5, 7, 9]
+
+def test_progress_bar():
+    written = []
+    assert run_pipeline(range(10), lambda item: item, written.append, progress_desc="Items") == 10
+    assert sorted(written) == list(range(10))
+
+def test_source_errors_are_raised_after_the_produced_items():
+    def source():
+        yield 1
+        yield 2
+        raise RuntimeError("listing failed")
+
+    written = []
+    with pytest.raises(RuntimeError, match="listing failed"):
+        run_pipeline(source(), lambda item: item, written.append)
+    assert sorted(written) == [1, 2]
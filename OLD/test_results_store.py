@@ -0,0 +1,102 @@
+import pytest
+
+from results_store import ResultsStore
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultsStore(str(tmp_path / 'results.db'))
+    yield store
+    store.close()
+
+def record_run(store, votes, category='Trailer'):
+    run_id = store.begin_run()
+    for submission_hash, count in votes.items():
+        store.record(run_id, {'hash': submission_hash, 'category': category, 'title': submission_hash.upper(),
+                              'votes': count})
+    store.end_run(run_id)
+    return run_id
+
+def test_top_and_rank(store):
+    record_run(store, {'a': 10, 'b': 30, 'c': 20}, category='Trailer')
+    record_run(store, {'d': 25, 'e': None}, category='Short')
+
+    assert [row[0] for row in store.top(k=3)] == ['b', 'd', 'c']
+    assert [row[0] for row in store.top(category='Trailer')] == ['b', 'c', 'a']
+    assert store.categories() == ['Short', 'Trailer']
+
+    rank = store.rank('c')
+    assert (rank['rank'], rank['total'], rank['overall_rank'], rank['overall_total']) == (2, 3, 3, 4)
+    assert store.rank('e')['rank'] is None
+    assert store.rank('missing') is None
+
+def test_ties_share_a_rank(store):
+    record_run(store, {'a': 10, 'b': 10, 'c': 5})
+    assert [store.rank(submission_hash)['rank'] for submission_hash in 'abc'] == [1, 1, 3]
+
+def test_a_result_without_votes_keeps_the_known_count(store):
+    record_run(store, {'a': 10})
+    record_run(store, {'a': None})
+    assert store.rank('a')['votes'] == 10
+
+def test_diff_between_consecutive_runs(store):
+    record_run(store, {'a': 10, 'b': 30, 'c': 20})
+    record_run(store, {'a': 40, 'b': 31, 'c': 20, 'd': 5})
+
+    movers = store.diff(k=10)
+    assert [row[0] for row in movers] == ['a', 'd', 'b', 'c']
+    assert movers[0] == ('a', 'Trailer', 'A', 10, 40, 30, 3, 1)
+    assert movers[1][3] is None and movers[1][6] is None
+
+    climbers = store.diff(by='rank', k=1)
+    assert climbers[0][0] == 'a'
+
+def test_diff_between_any_two_runs(store):
+    first = record_run(store, {'a': 10, 'b': 30})
+    record_run(store, {'a': 20, 'b': 35})
+    last = record_run(store, {'a': 50, 'b': 36})
+
+    movers = store.diff(from_run=first, to_run=last)
+    assert [(row[0], row[5]) for row in movers] == [('a', 40), ('b', 6)]
+    # The default is the run before `to_run`
+    assert [(row[0], row[5]) for row in store.diff(to_run=last)] == [('a', 30), ('b', 1)]
+
+def test_diff_by_category(store):
+    record_run(store, {'a': 10}, category='Trailer')
+    run_id = store.begin_run()
+    store.record(run_id, {'hash': 'a', 'category': 'Trailer', 'votes': 11})
+    store.record(run_id, {'hash': 'x', 'category': 'Short', 'votes': 90})
+    store.end_run(run_id)
+
+    assert [row[0] for row in store.diff(category='Trailer')] == ['a']
+    assert [row[0] for row in store.diff()] == ['x', 'a']
+
+def test_diff_skips_runs_that_never_ended(store):
+    first = record_run(store, {'a': 10})
+    crashed = store.begin_run()
+    store.record(crashed, {'hash': 'a', 'category': 'Trailer', 'votes': 500})
+    store.flush()
+    last = record_run(store, {'a': 12})
+
+    assert store.diff()[0][3:6] == (10, 12, 2)
+    assert [run[0] for run in store.runs() if run[3] is None] == [crashed]
+    with pytest.raises(ValueError):
+        store.diff(from_run=crashed, to_run=last)
+    with pytest.raises(ValueError):
+        store.diff(from_run=first, to_run=999)
+    with pytest.raises(ValueError):
+        store.diff(by='title')
+
+def test_diff_needs_two_runs(store):
+    assert store.diff() == []
+    record_run(store, {'a': 10})
+    assert store.diff() == []
+
+def test_import_csv(store, tmp_path):
+    path = tmp_path / 'titles_votes.csv'
+    path.write_text('title,name,category,url,votes\n'
+                    'A,Ann,Trailer,https://editfest.filmsupply.com/submissions/aaa,1234\n'
+                    'B,Bob,Trailer,https://editfest.filmsupply.com/submissions/bbb,\n', encoding='utf-8')
+    run_id, count = store.import_csv(str(path))
+    assert count == 2
+    assert store.top() == [('aaa', 'Trailer', 'A', 'Ann', 1234)]
+    assert store.runs()[0][0] == run_id and store.runs()[0][3] is not None
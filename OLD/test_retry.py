@@ -0,0 +1,71 @@
+import requests
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from errors import (CACHE_MISS, HTTP_STATUS, NETWORK, OTHER, SELECTOR_MISS, WEBDRIVER_INIT, CacheMissError,
+                    DriverInitError, HttpStatusError, NetworkError, SelectorMissError, classify)
+from retry import NO_RETRY, RetryLane, RetryPolicy
+
+def test_classify():
+    assert classify(NetworkError("reset")) == NETWORK
+    assert classify(requests.ConnectionError("refused")) == NETWORK
+    assert classify(TimeoutException("slow")) == NETWORK
+    assert classify(WebDriverException("unknown error: net::ERR_CONNECTION_RESET")) == NETWORK
+    assert classify(HttpStatusError('http://editfest.test/', 503)) == HTTP_STATUS
+    assert classify(requests.HTTPError("500")) == HTTP_STATUS
+    assert classify(DriverInitError("no chrome")) == WEBDRIVER_INIT
+    assert classify(SelectorMissError('http://editfest.test/', {'title': 'empty'})) == SELECTOR_MISS
+    assert classify(CacheMissError('http://editfest.test/')) == CACHE_MISS
+    assert classify(WebDriverException("tab crashed")) == OTHER
+    assert classify(ValueError("bad")) == OTHER
+
+def test_delay_is_capped_full_jitter():
+    policy = RetryPolicy(5, base_delay=1.0, max_delay=3.0)
+    for attempt in range(1, 6):
+        assert 0 <= policy.delay(attempt) <= min(3.0, 2 ** (attempt - 1))
+
+def run_lane(attempt, items, policies):
+    succeeded, failed = [], []
+    lane = RetryLane('test', policies=policies, workers=2, describe=str)
+    lane.start(attempt, lambda item, result: succeeded.append((item, result)),
+               on_failure=lambda item, error: failed.append(item))
+    for item in items:
+        try:
+            succeeded.append((item, attempt(item)))
+        except Exception as e:
+            lane.submit(item, e)
+    lane.close()
+    lane.join(timeout=10)
+    return lane, succeeded, failed
+
+def test_lane_retries_until_success():
+    calls = {}
+
+    def attempt(item):
+        calls[item] = calls.get(item, 0) + 1
+        if calls[item] < 3:
+            raise NetworkError("reset")
+        return item * 10
+
+    lane, succeeded, failed = run_lane(attempt, [1, 2], {NETWORK: RetryPolicy(3, base_delay=0.01)})
+    assert sorted(succeeded) == [(1, 10), (2, 20)]
+    assert failed == [] and lane.failures == []
+    assert calls == {1: 3, 2: 3}
+
+def test_lane_records_permanent_failures():
+    calls = {}
+
+    def attempt(item):
+        calls[item] = calls.get(item, 0) + 1
+        raise HttpStatusError(f"http://editfest.test/{item}", 503)
+
+    lane, succeeded, failed = run_lane(attempt, ['a'], {HTTP_STATUS: RetryPolicy(2, base_delay=0.01)})
+    assert succeeded == [] and failed == ['a']
+    assert calls == {'a': 2}
+    assert lane.failures == [{'item': 'a', 'kind': HTTP_STATUS, 'attempts': 2,
+                              'error': str(HttpStatusError('http://editfest.test/a', 503))}]
+
+def test_kinds_without_a_policy_are_not_retried():
+    lane = RetryLane('test', policies={NETWORK: RetryPolicy(3)}, describe=str)
+    assert lane.policies.get(SELECTOR_MISS, NO_RETRY) is NO_RETRY
+    assert not lane.submit('a', SelectorMissError('http://editfest.test/a', {'title': 'empty'}))
+    assert [failure['kind'] for failure in lane.failures] == [SELECTOR_MISS]
@@ -0,0 +1,78 @@
+import csv
+
+import pytest
+
+from sinks import SINK_BACKENDS, open_sink
+
+FIELDNAMES = ['hash', 'title', 'votes', 'url']
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+@pytest.fixture(params=sorted(SINK_BACKENDS))
+def backend(request):
+    return request.param
+
+def test_finalize_writes_one_row_per_key(tmp_path, backend):
+    output_path = str(tmp_path / 'titles_votes.csv')
+    urls_path = str(tmp_path / 'urls.txt')
+    with open_sink(backend, str(tmp_path / 'titles_votes'), FIELDNAMES) as sink:
+        sink.write({'hash': 'a', 'title': 'A', 'votes': None, 'url': 'https://example.com/a'})
+        sink.write({'hash': 'b', 'title': 'B', 'votes': 5, 'url': None})
+        sink.write({'hash': 'a', 'title': 'A', 'votes': 3, 'url': 'https://example.com/a'})
+        assert sink.finalize(output_path, urls_path) == 2
+
+    rows = read_csv(output_path)
+    assert sorted((row['hash'], row['votes'], row['url']) for row in rows) == [
+        ('a', '3', 'https://example.com/a'), ('b', '5', '')]
+    with open(urls_path, encoding='utf-8') as f:
+        assert sorted(f.read().splitlines()) == ['No URL', 'https://example.com/a']
+    assert not (tmp_path / 'titles_votes.csv.tmp').exists()
+
+def test_incomplete_rows_never_replace_complete_ones(tmp_path, backend):
+    with open_sink(backend, str(tmp_path / 'titles_votes'), FIELDNAMES) as sink:
+        assert sink.write({'hash': 'a', 'title': 'A', 'votes': 3})
+        assert not sink.write({'hash': 'a', 'title': 'A', 'votes': None})
+        assert not sink.write({'hash': 'a', 'title': 'A', 'votes': 4})
+        assert sink.write({'hash': 'a', 'title': 'A2', 'votes': 4}, replace=True)
+        assert sink.write({'hash': 'b', 'title': 'B', 'votes': None})
+        assert not sink.write({'hash': 'b', 'title': 'B', 'votes': ''})
+        assert len(sink) == 2
+        rows = {row['hash']: row for row in sink.rows()}
+    assert str(rows['a']['votes']) == '4' and rows['a']['title'] == 'A2'
+    assert rows['b']['votes'] in (None, '')
+
+def test_resume_keeps_earlier_rows(tmp_path, backend):
+    base_path = str(tmp_path / 'titles_votes')
+    with open_sink(backend, base_path, FIELDNAMES) as sink:
+        sink.write({'hash': 'a', 'title': 'A', 'votes': 3})
+        sink.write({'hash': 'b', 'title': 'B', 'votes': None})
+
+    with open_sink(backend, base_path, FIELDNAMES, resume=True) as sink:
+        assert not sink.write({'hash': 'a', 'title': 'A', 'votes': None})
+        assert sink.write({'hash': 'b', 'title': 'B', 'votes': 7})
+        assert sink.finalize(str(tmp_path / 'out.csv')) == 2
+
+    rows = read_csv(str(tmp_path / 'out.csv'))
+    assert {row['hash']: row['votes'] for row in rows} == {'a': '3', 'b': '7'}
+
+def test_without_resume_a_run_starts_empty(tmp_path, backend):
+    base_path = str(tmp_path / 'titles_votes')
+    with open_sink(backend, base_path, FIELDNAMES) as sink:
+        sink.write({'hash': 'a', 'title': 'A', 'votes': 3})
+
+    with open_sink(backend, base_path, FIELDNAMES) as sink:
+        assert len(sink) == 0
+        assert sink.finalize(str(tmp_path / 'out.csv')) == 0
+    assert read_csv(str(tmp_path / 'out.csv')) == []
+
+def test_failed_finalize_leaves_the_output_untouched(tmp_path, backend):
+    output_path = tmp_path / 'out.csv'
+    output_path.write_text('previous\n', encoding='utf-8')
+    with open_sink(backend, str(tmp_path / 'titles_votes'), FIELDNAMES) as sink:
+        sink.write({'hash': 'a', 'title': 'A', 'votes': 3})
+        with pytest.raises(OSError):
+            sink.finalize(str(output_path), str(tmp_path / 'missing' / 'urls.txt'))
+    assert output_path.read_text(encoding='utf-8') == 'previous\n'
+    assert not (tmp_path / 'out.csv.tmp').exists()
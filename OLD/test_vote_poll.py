@@ -0,0 +1,61 @@
+import itertools
+
+import pytest
+
+from vote_poll import PollScheduler, VoteSeriesStore, poll_votes
+
+@pytest.fixture
+def store(tmp_path):
+    store = VoteSeriesStore(str(tmp_path / 'votes.db'))
+    yield store
+    store.close()
+
+def test_only_changed_counts_are_stored(store):
+    assert store.record('a', 1, ts=1.0)
+    assert not store.record('a', 1, ts=2.0)
+    assert store.record('a', 3, ts=3.0)
+    assert store.series('a') == [(1.0, 1), (3.0, 3)]
+    assert store.last_votes() == {'a': 3}
+
+def test_unchanged_submissions_back_off():
+    scheduler = PollScheduler(min_interval=10, max_interval=40, backoff=2.0, top_n=0)
+    scheduler.add({'hash': 'a'}, now=0)
+    assert [submission['hash'] for submission in scheduler.due(now=0)] == ['a']
+    intervals = []
+    now = 0
+    for _ in range(4):
+        scheduler.reschedule('a', 5, changed=False, now=now)
+        intervals.append(scheduler.next_due() - now)
+        now = scheduler.next_due()
+        scheduler.due(now)
+    assert intervals == [20, 40, 40, 40]
+    scheduler.reschedule('a', 6, changed=True, now=now)
+    assert scheduler.next_due() - now == 10
+
+def test_leaders_stay_at_the_shortest_interval():
+    scheduler = PollScheduler(min_interval=10, max_interval=100, top_n=1)
+    scheduler.add({'hash': 'a'}, votes=50, now=0)
+    scheduler.add({'hash': 'b'}, votes=5, now=0)
+    scheduler.due(now=0)
+    scheduler.reschedule('a', 50, changed=False, now=0)
+    scheduler.reschedule('b', 5, changed=False, now=0)
+    assert [submission['hash'] for submission in scheduler.due(now=10)] == ['a']
+
+def test_a_failed_listing_refresh_keeps_polling(store):
+    calls = itertools.count(1)
+
+    def discover():
+        call = next(calls)
+        if call == 2:
+            raise RuntimeError("listing unavailable")
+        return [{'hash': 'a'}] if call == 1 else [{'hash': 'a'}, {'hash': 'b'}]
+
+    counts = itertools.count(1)
+    def extract(submission):
+        return dict(submission, votes=next(counts))
+
+    scheduler = PollScheduler(min_interval=0, max_interval=0, top_n=0)
+    poll_votes(discover, extract, store, scheduler, workers=1, relist_interval=0, max_cycles=3)
+    assert len(scheduler) == 2
+    assert [votes for _, votes in store.series('a')] == [1, 2, 3]
+    assert [votes for _, votes in store.series('b')] == [4]
@@ -0,0 +1,65 @@
+import time
+
+from work_queue import DONE, FAILED, LEASED, QUEUED, LeaseQueue
+
+def submissions(*hashes):
+    return [{'hash': submission_hash} for submission_hash in hashes]
+
+def test_workers_share_the_queue(tmp_path):
+    path = str(tmp_path / 'queue.db')
+    producer, first, second = LeaseQueue(path), LeaseQueue(path), LeaseQueue(path)
+    assert producer.enqueue(submissions('a', 'b', 'c')) == 3
+    assert producer.enqueue(submissions('a', 'd')) == 1
+    producer.seal()
+
+    assert first.lease('first', 2) == submissions('a', 'b')
+    assert second.lease('second', 5) == submissions('c', 'd')
+    assert first.lease('first', 5) == []
+    for submission_hash in 'ab':
+        first.complete('first', submission_hash)
+    second.complete('second', 'c')
+    assert not producer.finished()
+    second.complete('second', 'd', ok=False, error="no votes")
+    assert producer.finished()
+    assert producer.done_hashes() == {'a', 'b', 'c'}
+    assert producer.counts() == {DONE: 3, FAILED: 1}
+    for queue in (producer, first, second):
+        queue.close()
+
+def test_an_expired_lease_goes_to_another_worker(tmp_path):
+    queue = LeaseQueue(str(tmp_path / 'queue.db'), lease_seconds=0.01)
+    queue.enqueue(submissions('a'))
+    assert queue.lease('crashed', 1) == submissions('a')
+    time.sleep(0.02)
+    assert queue.lease('healthy', 1) == submissions('a')
+    # The first worker's late completion is ignored; the task belongs to the new owner
+    queue.complete('crashed', 'a', ok=False)
+    assert queue.counts() == {LEASED: 1}
+    queue.complete('healthy', 'a')
+    assert queue.done_hashes() == {'a'}
+    queue.close()
+
+def test_renew_keeps_a_lease(tmp_path):
+    queue = LeaseQueue(str(tmp_path / 'queue.db'), lease_seconds=0.05)
+    queue.enqueue(submissions('a'))
+    queue.lease('worker', 1)
+    time.sleep(0.03)
+    queue.renew('worker')
+    time.sleep(0.03)
+    assert queue.lease('other', 1) == []
+    queue.close()
+
+def test_a_task_that_keeps_losing_its_worker_fails(tmp_path):
+    queue = LeaseQueue(str(tmp_path / 'queue.db'), lease_seconds=0.01, max_attempts=2)
+    queue.enqueue(submissions('a', 'b'))
+    queue.seal()
+    for worker in ('first', 'second'):
+        assert [submission['hash'] for submission in queue.lease(worker, 1)] == ['a']
+        time.sleep(0.02)
+    assert queue.lease('third', 5) == submissions('b')
+    assert queue.counts() == {FAILED: 1, LEASED: 1}
+
+    queue.requeue_failed()
+    assert queue.counts() == {QUEUED: 1, LEASED: 1}
+    assert queue.lease('fourth', 5) == submissions('a')
+    queue.close()
@@ -0,0 +1,119 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from readiness import percentile
+
+class Tracer:
+    """
+    Collects wall-clock spans around the stages of a run (driver launch, page
+    load, readiness wait, extraction, listing fetch, CSV write, ...).
+
+    Every span adds its duration to its stage, which `report` reduces to
+    count / p50 / p95 / max. With `keep_events` set, spans are also kept with
+    their thread so `write_chrome_trace` can show per-thread occupancy in
+    chrome://tracing or Perfetto.
+    """
+
+    def __init__(self, keep_events=False, max_events=500000):
+        """
+        Args:
+            keep_events (bool): Keep individual spans for a Chrome trace.
+            max_events (int): Cap on kept spans; later ones only count towards the report.
+        """
+        self.keep_events = keep_events
+        self.max_events = max_events
+        self._durations = defaultdict(list)
+        self._events = []
+        self._threads = {}
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name):
+        """
+        Times the enclosed block as one occurrence of stage `name`. The span is
+        recorded whether or not the block raises.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter())
+
+    def record(self, name, start, end):
+        """
+        Records one span measured with `time.perf_counter()`.
+        """
+        with self._lock:
+            self._durations[name].append(end - start)
+            if self.keep_events and len(self._events) < self.max_events:
+                thread = threading.current_thread()
+                self._threads.setdefault(thread.ident, thread.name)
+                self._events.append((name, thread.ident, start, end))
+
+    def report(self):
+        """
+        Returns:
+            dict: Stage -> dict with count, total, p50, p95 and max, in seconds.
+        """
+        with self._lock:
+            durations = {name: list(samples) for name, samples in self._durations.items()}
+        return {
+            name: {
+                'count': len(samples),
+                'total': sum(samples),
+                'p50': percentile(samples, 0.5),
+                'p95': percentile(samples, 0.95),
+                'max': max(samples),
+            }
+            for name, samples in durations.items()
+        }
+
+    def log_report(self):
+        """
+        Logs one line per stage, slowest total first.
+        """
+        report = self.report()
+        for name, stats in sorted(report.items(), key=lambda item: item[1]['total'], reverse=True):
+            logging.info(
+                "Stage %-22s n=%-6d total %8.1fs  p50 %7.3fs  p95 %7.3fs  max %7.3fs",
+                name, stats['count'], stats['total'], stats['p50'], stats['p95'], stats['max'],
+                extra={'fields': {'stage': name, **stats}},
+            )
+
+    def write_chrome_trace(self, path):
+        """
+        Writes the kept spans in the Chrome trace event format.
+
+        Args:
+            path (str): Output JSON file, loadable in chrome://tracing or Perfetto.
+        """
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+        pid = os.getpid()
+        trace = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+            for tid, name in threads.items()
+        ]
+        for name, tid, start, end in events:
+            trace.append({
+                'name': name, 'cat': name.split('.')[0], 'ph': 'X', 'pid': pid, 'tid': tid,
+                'ts': round((start - self._origin) * 1e6), 'dur': round((end - start) * 1e6),
+            })
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+        logging.info("Wrote %d spans to Chrome trace '%s'.", len(events), path)
+
+# Process-wide tracer used by the scrapers and their helper modules
+tracer = Tracer()
+
+def span(name):
+    """
+    Shorthand for `tracer.span(name)` on the process-wide tracer.
+    """
+    return tracer.span(name)
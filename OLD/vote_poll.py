@@ -0,0 +1,222 @@
+import heapq
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class VoteSeriesStore:
+    """
+    Compact vote time series in SQLite: one (hash, timestamp, votes) point is
+    stored only when a submission's count differs from its previous point.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): SQLite database file; created if missing.
+        """
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS vote_points (
+                hash TEXT NOT NULL,
+                ts REAL NOT NULL,
+                votes INTEGER NOT NULL,
+                PRIMARY KEY (hash, ts)
+            ) WITHOUT ROWID
+        ''')
+        self._last = dict(self._conn.execute('''
+            SELECT hash, votes FROM vote_points AS p
+            WHERE ts = (SELECT MAX(ts) FROM vote_points WHERE hash = p.hash)
+        ''').fetchall())
+
+    def last_votes(self):
+        """
+        Returns:
+            dict: Hash -> most recent vote count.
+        """
+        return dict(self._last)
+
+    def record(self, submission_hash, votes, ts=None):
+        """
+        Adds a point if the vote count changed since the previous one.
+
+        Args:
+            submission_hash (str): The submission hash.
+            votes (int): The observed vote count.
+            ts (float): Observation time; defaults to now.
+
+        Returns:
+            bool: True if the count changed (or is the first observation).
+        """
+        if self._last.get(submission_hash) == votes:
+            return False
+        self._conn.execute(
+            'INSERT OR REPLACE INTO vote_points (hash, ts, votes) VALUES (?, ?, ?)',
+            (submission_hash, ts if ts is not None else time.time(), votes),
+        )
+        self._last[submission_hash] = votes
+        return True
+
+    def series(self, submission_hash):
+        """
+        Returns:
+            list: (timestamp, votes) points for one submission, oldest first.
+        """
+        return self._conn.execute(
+            'SELECT ts, votes FROM vote_points WHERE hash = ? ORDER BY ts', (submission_hash,)
+        ).fetchall()
+
+    def close(self):
+        self._conn.close()
+
+class PollScheduler:
+    """
+    Decides when each submission is checked next.
+
+    A submission whose count just changed, or that sits in the top `top_n`, is
+    checked every `min_interval` seconds. Each unchanged check multiplies its
+    interval by `backoff`, up to `max_interval`, so static entries cost little.
+    """
+
+    def __init__(self, min_interval=60, max_interval=3600, backoff=2.0, top_n=20):
+        """
+        Args:
+            min_interval (float): Shortest time between checks of one submission.
+            max_interval (float): Longest time between checks of one submission.
+            backoff (float): Interval multiplier after an unchanged check.
+            top_n (int): Leaders that are always checked at `min_interval`.
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.top_n = top_n
+        self._heap = []
+        self._submissions = {}
+        self._intervals = {}
+        self._votes = {}
+        self._leader_threshold = None
+
+    def __len__(self):
+        return len(self._submissions)
+
+    def add(self, submission, votes=None, now=None):
+        """
+        Starts tracking a submission; it is due immediately. Known submissions are ignored.
+        """
+        submission_hash = submission['hash']
+        if submission_hash in self._submissions:
+            return
+        self._submissions[submission_hash] = submission
+        self._intervals[submission_hash] = self.min_interval
+        if votes is not None:
+            self._votes[submission_hash] = votes
+        heapq.heappush(self._heap, (now if now is not None else time.time(), submission_hash))
+
+    def due(self, now=None):
+        """
+        Removes and returns every submission whose check is due.
+        """
+        now = now if now is not None else time.time()
+        # Leaders are ranked once per batch rather than on every reschedule
+        leaders = heapq.nlargest(self.top_n, self._votes.values()) if self.top_n else []
+        self._leader_threshold = leaders[-1] if leaders else None
+        ready = []
+        while self._heap and self._heap[0][0] <= now:
+            _, submission_hash = heapq.heappop(self._heap)
+            ready.append(self._submissions[submission_hash])
+        return ready
+
+    def next_due(self):
+        """
+        Returns the time of the next scheduled check, or None if nothing is tracked.
+        """
+        return self._heap[0][0] if self._heap else None
+
+    def reschedule(self, submission_hash, votes, changed, now=None):
+        """
+        Schedules the next check of a submission after it has been polled.
+
+        Args:
+            submission_hash (str): The submission just checked.
+            votes (int): Its vote count, or None if the check failed.
+            changed (bool): Whether the count moved since the previous check.
+        """
+        now = now if now is not None else time.time()
+        if votes is not None:
+            self._votes[submission_hash] = votes
+        if changed or self._is_leader(submission_hash):
+            interval = self.min_interval
+        else:
+            interval = min(self.max_interval, self._intervals[submission_hash] * self.backoff)
+        self._intervals[submission_hash] = interval
+        heapq.heappush(self._heap, (now + interval, submission_hash))
+
+    def _is_leader(self, submission_hash):
+        votes = self._votes.get(submission_hash)
+        if votes is None or self._leader_threshold is None:
+            return False
+        return votes >= self._leader_threshold
+
+def poll_votes(discover, extract, store, scheduler, workers=8, relist_interval=900, max_cycles=None,
+               on_change=None):
+    """
+    Polls vote counts until interrupted (or for `max_cycles` cycles).
+
+    Args:
+        discover (callable): Returns the submissions to track; called at start and
+            every `relist_interval` seconds to pick up new entries. If it fails,
+            the submissions found so far are kept and it is tried again after
+            another `relist_interval`.
+        extract (callable): Submission -> submission with 'votes' set.
+        store (VoteSeriesStore): Where changed counts are recorded.
+        scheduler (PollScheduler): Decides which submissions are due.
+        workers (int): Number of concurrent checks.
+        relist_interval (float): Seconds between listing refreshes.
+        max_cycles (int): Stop after this many polling cycles; None polls forever.
+        on_change (callable): Called with each submission whose count changed.
+    """
+    last_votes = store.last_votes()
+    last_listed = None
+    cycles = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while max_cycles is None or cycles < max_cycles:
+            now = time.time()
+            if last_listed is None or now - last_listed >= relist_interval:
+                try:
+                    for submission in discover():
+                        scheduler.add(submission, votes=last_votes.get(submission['hash']), now=now)
+                except Exception as e:
+                    logging.error("Error refreshing the polled submissions: %s", e)
+                last_listed = now
+                logging.info("Tracking %s submissions.", len(scheduler))
+
+            batch = scheduler.due(now)
+            if not batch:
+                next_due = scheduler.next_due()
+                wake_at = min(next_due, last_listed + relist_interval) if next_due else last_listed + relist_interval
+                time.sleep(max(0.0, min(wake_at - time.time(), relist_interval)))
+                continue
+
+            cycles += 1
+            changed_count = 0
+            for submission in executor.map(_safe_extract(extract), batch):
+                votes = submission.get('votes')
+                checked_at = time.time()
+                changed = votes is not None and store.record(submission['hash'], votes, checked_at)
+                changed_count += changed
+                if changed and on_change:
+                    on_change(submission)
+                scheduler.reschedule(submission['hash'], votes, changed, checked_at)
+            logging.info("Poll cycle %s: checked %s submissions, %s changed.", cycles, len(batch), changed_count)
+
+def _safe_extract(extract):
+    def run(submission):
+        try:
+            return extract(submission)
+        except Exception as e:
+            logging.error("Error polling votes for %s: %s", submission.get('hash'), e)
+            submission['votes'] = None
+            return submission
+    return run
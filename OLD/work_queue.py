@@ -0,0 +1,198 @@
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+QUEUED = 'queued'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+class LeaseQueue:
+    """
+    A work queue shared by several processes through one SQLite file.
+
+    Workers `lease` a batch of tasks for `lease_seconds` and keep the lease
+    alive with `renew` while they work. A task whose lease runs out (its worker
+    crashed or hung) becomes available to every other worker again; one that
+    has been leased `max_attempts` times without finishing is marked failed
+    instead, so a submission that kills its worker cannot take the whole crawl
+    down with it.
+
+    The producer adds tasks with `enqueue` and calls `seal` once the listing is
+    complete; `finished` is True when the queue is sealed and nothing is queued
+    or leased.
+    """
+
+    def __init__(self, path, lease_seconds=120, max_attempts=3):
+        """
+        Args:
+            path (str): SQLite database file; created if missing.
+            lease_seconds (float): How long a lease lasts without renewal.
+            max_attempts (int): Leases a task gets before it is marked failed.
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # Each process opens its own connection; writers wait for each other.
+        # Threads of one process share it under a lock.
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS tasks (
+                hash TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                state TEXT NOT NULL,
+                owner TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, lease_expires)')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS queue_meta (key TEXT PRIMARY KEY, value TEXT)')
+
+    def reset(self):
+        """
+        Drops every task and unseals the queue, for a fresh run.
+        """
+        with self._transaction():
+            self._conn.execute('DELETE FROM tasks')
+            self._conn.execute('DELETE FROM queue_meta')
+
+    def enqueue(self, submissions):
+        """
+        Adds submissions not already in the queue (in any state).
+
+        Args:
+            submissions (iterable): Submission dicts with a 'hash'.
+
+        Returns:
+            int: The number of new tasks.
+        """
+        now = time.time()
+        rows = [(submission['hash'], json.dumps(submission), QUEUED, now) for submission in submissions]
+        with self._transaction():
+            before = self._conn.total_changes
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO tasks (hash, payload, state, updated_at) VALUES (?, ?, ?, ?)', rows)
+            return self._conn.total_changes - before
+
+    def requeue_failed(self):
+        """
+        Gives failed tasks a fresh set of attempts, e.g. when resuming.
+        """
+        with self._transaction():
+            self._conn.execute(
+                'UPDATE tasks SET state = ?, attempts = 0, owner = NULL, error = NULL WHERE state = ?', (QUEUED, FAILED))
+
+    def seal(self):
+        """
+        Marks the task list complete; workers stop once it has drained.
+        """
+        with self._transaction():
+            self._conn.execute("INSERT OR REPLACE INTO queue_meta (key, value) VALUES ('sealed', '1')")
+
+    def lease(self, owner, count):
+        """
+        Claims up to `count` tasks that are queued or whose lease has expired.
+
+        Args:
+            owner (str): Identifies the worker taking the lease.
+            count (int): Maximum number of tasks.
+
+        Returns:
+            list: The leased submissions, oldest first.
+        """
+        now = time.time()
+        with self._transaction():
+            # Tasks that keep losing their worker are given up on rather than leased forever
+            self._conn.execute('''
+                UPDATE tasks SET state = ?, error = 'lease expired too often', updated_at = ?
+                WHERE state = ? AND lease_expires < ? AND attempts >= ?
+            ''', (FAILED, now, LEASED, now, self.max_attempts))
+            rows = self._conn.execute('''
+                SELECT hash, payload FROM tasks
+                WHERE state = ? OR (state = ? AND lease_expires < ?)
+                ORDER BY rowid LIMIT ?
+            ''', (QUEUED, LEASED, now, count)).fetchall()
+            self._conn.executemany('''
+                UPDATE tasks SET state = ?, owner = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ?
+                WHERE hash = ?
+            ''', [(LEASED, owner, now + self.lease_seconds, now, row[0]) for row in rows])
+        return [json.loads(payload) for _, payload in rows]
+
+    def renew(self, owner):
+        """
+        Extends every lease held by `owner`.
+        """
+        with self._transaction():
+            self._conn.execute(
+                'UPDATE tasks SET lease_expires = ? WHERE state = ? AND owner = ?',
+                (time.time() + self.lease_seconds, LEASED, owner))
+
+    def complete(self, owner, submission_hash, ok=True, error=None):
+        """
+        Finishes a leased task. A task re-leased by another worker in the
+        meantime is left to that worker.
+
+        Args:
+            owner (str): The worker holding the lease.
+            submission_hash (str): The task's hash.
+            ok (bool): False records the task as failed.
+            error (str): Failure description.
+        """
+        with self._transaction():
+            self._conn.execute(
+                'UPDATE tasks SET state = ?, error = ?, updated_at = ? WHERE hash = ? AND owner = ? AND state = ?',
+                (DONE if ok else FAILED, error, time.time(), submission_hash, owner, LEASED))
+
+    def finished(self):
+        """
+        Returns:
+            bool: True once the queue is sealed and no task is queued or leased.
+        """
+        with self._lock:
+            sealed = self._conn.execute("SELECT 1 FROM queue_meta WHERE key = 'sealed'").fetchone()
+            if not sealed:
+                return False
+            remaining = self._conn.execute(
+                'SELECT COUNT(*) FROM tasks WHERE state IN (?, ?)', (QUEUED, LEASED)).fetchone()[0]
+        return remaining == 0
+
+    def done_hashes(self):
+        """
+        Returns:
+            set: Hashes of the tasks finished successfully.
+        """
+        with self._lock:
+            return {row[0] for row in self._conn.execute('SELECT hash FROM tasks WHERE state = ?', (DONE,))}
+
+    def counts(self):
+        """
+        Returns:
+            dict: State -> number of tasks in that state.
+        """
+        with self._lock:
+            return dict(self._conn.execute('SELECT state, COUNT(*) FROM tasks GROUP BY state').fetchall())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers can never
+        # select the same queued rows before one of them marks them leased
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')